@@ -0,0 +1,222 @@
+"""Benchmark suite for the Cleaner and the Populator
+
+Every case builds a fixture with the Populator (flat, or a nested tree) and then measures a Cleaner run:
+
+    populate    creating the fixture
+    scan        streaming the files of the folder (Cleaner.iter_files), consumed without keeping them
+    clean       the streaming pipeline of a real run, Cleaner.execute(Cleaner.plan()), wall time
+    classify    time the pipeline spent turning scanned files into operations, as recorded by its stats
+    move        time the pipeline spent applying operations, as recorded by its stats (summed over the
+                threads when workers > 1)
+
+The pipeline never holds the scanned files or the plan in memory, and neither does the benchmark, so the
+peak RSS of a case is the one of a real run.
+
+Cases run in a fresh process by default, so the peak RSS reported for a case is not inflated by the cases
+that ran before it. Results are plain JSON, meant to be stored and compared across releases.
+"""
+
+# Standard library imports
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Union
+
+# Local application imports
+from folderlib.__version__ import __version__
+from folderlib.utilities.config import cache_home
+from folderlib.utilities.logging import get_console_logger
+from folderlib.workers import Cleaner, Populator
+from folderlib.workers import cleaner as cleaner_module
+from folderlib.workers import populator as populator_module
+
+logger = get_console_logger(name="Bench")
+
+BENCH_VERSION = 2
+
+SCALES = {"1k": 1000, "100k": 100000, "1m": 1000000}
+LAYOUTS = {"flat": (0, 1), "nested": (3, 4)}  # (depth, fanout) of the fixture tree
+
+# the default supported categories the fixtures are made of, one file per category at every position
+CATEGORIES = ["audio", "image", "text", "video"]
+
+
+def peak_rss() -> Optional[int]:
+    """Peak resident set size of this process in bytes, None where it cannot be measured"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _phase(started: float, files: int) -> Dict[str, float]:
+    seconds = time.perf_counter() - started
+    return {
+        "seconds": round(seconds, 6),
+        "files": files,
+        "files_per_second": round(files / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def _recorded(stats: Dict[str, Dict[str, Union[int, float]]], name: str) -> Dict[str, float]:
+    """Time and amount of operations a worker recorded for one of its phases"""
+    phase = stats.get(name, {"seconds": 0.0, "count": 0})
+    seconds = phase["seconds"]
+    return {
+        "seconds": round(seconds, 6),
+        "files": phase["count"],
+        "files_per_second": round(phase["count"] / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def run_case(
+    scale: Union[str, int],
+    layout: str,
+    directory: Union[str, Path],
+    workers: int = 1,
+    seed: int = 0,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """Build one fixture and measure a Cleaner run on it
+
+    :param scale: one of [SCALES] or an amount of files
+    :param layout: one of [LAYOUTS]
+    :param directory: empty folder the fixture is built in, it is not removed. The workers keep their cache
+                      in it too, so the pools of the user do not change the fixture
+    :param workers: threads used by both the Populator and the Cleaner
+    :param seed: seed of the fixture, the same seed builds the same files
+    :param verbose: keep the INFO messages of the workers
+    :return: the measurements of the case
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"{layout} is not a benchmark layout. Try one of [{','.join(LAYOUTS)}]")
+    files = SCALES[scale] if scale in SCALES else int(scale)
+    depth, fanout = LAYOUTS[layout]
+    if not verbose:
+        populator_module.logger.setLevel(logging.WARNING)
+        cleaner_module.logger.setLevel(logging.WARNING)
+
+    directory = Path(directory)
+    fixture = directory.joinpath("fixture")
+    amount = -(-files // len(CATEGORIES))
+    phases = dict()
+
+    with cache_home(directory.joinpath("cache")):
+        started = time.perf_counter()
+        population = Populator(path=fixture, amount=amount, filters=CATEGORIES, workers=workers, seed=seed,
+                               depth=depth, fanout=fanout)
+        population()
+        phases["populate"] = _phase(started, population.created)
+
+        worker = Cleaner(path=fixture, save_to=directory.joinpath("clean"), max_depth=None if depth else 0,
+                         workers=workers)
+        started = time.perf_counter()
+        scanned = sum(1 for _ in worker.iter_files())
+        phases["scan"] = _phase(started, scanned)
+
+        started = time.perf_counter()
+        moved = worker.execute(worker.plan())
+        phases["clean"] = _phase(started, moved)
+    recorded = worker.stats.as_dict()
+    phases["classify"] = _recorded(recorded, "classify")
+    phases["move"] = _recorded(recorded, "move")
+
+    return {
+        "scale": str(scale),
+        "layout": layout,
+        "files": population.created,
+        "depth": depth,
+        "fanout": fanout,
+        "workers": workers,
+        "index": worker.index.fingerprint(),
+        "phases": phases,
+        "stats": {"populator": population.stats.as_dict(), "cleaner": worker.stats.as_dict()},
+        "peak_rss_bytes": peak_rss(),
+    }
+
+
+def _run_isolated(scale: Union[str, int], layout: str, directory: str, workers: int, seed: int,
+                  verbose: bool) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(run_case, scale, layout, directory, workers, seed, verbose).result()
+
+
+def run_suite(
+    scales: Optional[Iterable[Union[str, int]]] = None,
+    layouts: Optional[Iterable[str]] = None,
+    directory: Optional[Union[str, Path]] = None,
+    workers: int = 1,
+    seed: int = 0,
+    isolate: bool = True,
+    verbose: bool = False,
+) -> Dict[str, Any]:
+    """Run every (scale, layout) case of the suite
+
+    :param scales: scales to run. Default: every one of [SCALES]
+    :param layouts: layouts to run. Default: every one of [LAYOUTS]
+    :param directory: folder the fixtures are built in. Default: a temporary folder
+    :param workers: threads used by both the Populator and the Cleaner
+    :param seed: seed of the fixtures
+    :param isolate: run every case in a fresh process, so peak RSS is measured per case. Default: True
+    :param verbose: keep the INFO messages of the workers
+    :return: the environment and the results of every case, ready to be dumped as JSON
+    """
+    scales = list(scales or SCALES)
+    layouts = list(layouts or LAYOUTS)
+    for layout in layouts:
+        if layout not in LAYOUTS:
+            raise ValueError(f"{layout} is not a benchmark layout. Try one of [{','.join(LAYOUTS)}]")
+
+    root = Path(tempfile.mkdtemp(prefix="folderlib-bench-", dir=directory))
+    results: List[Dict[str, Any]] = list()
+    try:
+        for scale in scales:
+            for layout in layouts:
+                case = root.joinpath(f"{scale}-{layout}")
+                case.mkdir()
+                logger.info(f"Running case {scale} {layout}")
+                if isolate:
+                    result = _run_isolated(scale, layout, os.fspath(case), workers, seed, verbose)
+                else:
+                    result = run_case(scale, layout, case, workers=workers, seed=seed, verbose=verbose)
+                results.append(result)
+                summary = ", ".join(f"{name} {phase['files_per_second']} files/sec"
+                                    for name, phase in result["phases"].items())
+                logger.info(f"Case {scale} {layout}: {summary}")
+                shutil.rmtree(case, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "version": BENCH_VERSION,
+        "folderlib": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def write_results(results: Dict[str, Any], file: Union[str, Path, IO[str]]) -> None:
+    """Dump the results of run_suite as JSON to a path or an open text stream"""
+    if hasattr(file, "write"):
+        json.dump(results, file, indent=2)
+        file.write("\n")
+        return
+    with Path(file).expanduser().open("w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
@@ -6,15 +6,40 @@ import logging
 
 # Third party imports
 import click
-import click_help_colors
 
-# Local application imports
-from .workers import Populator, Cleaner
+
+class HelpColorsMixin(object):
+    """Colored help pages like click_help_colors, which is only imported when a help page is printed"""
+
+    def __init__(self, *args, help_headers_color=None, help_options_color=None, **kwargs):
+        self.help_headers_color = help_headers_color
+        self.help_options_color = help_options_color
+        super().__init__(*args, **kwargs)
+
+    def get_help(self, ctx):
+        from click_help_colors import HelpColorsFormatter
+
+        formatter = HelpColorsFormatter(
+            width=ctx.terminal_width,
+            max_width=ctx.max_content_width,
+            headers_color=self.help_headers_color,
+            options_color=self.help_options_color,
+        )
+        self.format_help(ctx, formatter)
+        return formatter.getvalue().rstrip("\n")
+
+
+class HelpColorsGroup(HelpColorsMixin, click.Group):
+    pass
+
+
+class HelpColorsCommand(HelpColorsMixin, click.Command):
+    pass
 
 
 @click.group(
 
-    cls=click_help_colors.HelpColorsGroup,
+    cls=HelpColorsGroup,
     help_headers_color='yellow',
     help_options_color='green',
     name="Populator",
@@ -29,6 +54,25 @@ def main():
     pass
 
 
+def verbose_logging(*loggers):
+    """Log DEBUG messages until the command returns, written by a background thread so workers never wait on I/O"""
+    from .utilities.logging import queued_logging
+
+    for logger in loggers:
+        logger.setLevel(logging.DEBUG)
+        for handler in logger.handlers:
+            handler.setLevel(logging.DEBUG)
+    click.get_current_context().with_resource(queued_logging(*loggers))
+
+
+def report_stats(worker, stats, stats_file):
+    """Print the stats of a worker to stderr (the standard output may carry a plan) and/or write them for Prometheus"""
+    if stats:
+        click.echo(worker.stats.format_table(), err=True)
+    if stats_file:
+        worker.stats.write_prometheus(stats_file)
+
+
 class ConvertStrToList(click.Option):
 
     def type_cast_value(self, ctx, value):
@@ -47,7 +91,7 @@ class ConvertStrToList(click.Option):
 # region Click Options
 # region command settings
 @main.command(
-    cls=click_help_colors.HelpColorsCommand,
+    cls=HelpColorsCommand,
     help_headers_color='green',
     help_options_color='red',
     name="populator",
@@ -100,22 +144,116 @@ class ConvertStrToList(click.Option):
     help="Comma separated List of filters to be applied in the files supported e.g [audio, video, ...]"
 )
 # endregion
-def populator_cli(amount, folder, supported, verbose, filters):
+# region workers option
+@click.option(
+    "-w",
+    "--workers",
+    default=1,
+    metavar="<integer>",
+    type=click.IntRange(min=1),
+    help="Amount of threads (or processes) creating files in parallel"
+)
+@click.option(
+    "--process-pool",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Use a process pool instead of a thread pool for the workers"
+)
+# endregion
+# region size options
+@click.option(
+    "--size",
+    metavar="<spec>",
+    help="File sizes e.g 4k, uniform:1k:1M or lognormal:10:2 (mu and sigma of ln(bytes)). Default: empty files"
+)
+@click.option(
+    "--content",
+    default="sparse",
+    metavar="<sparse|allocate|header>",
+    type=click.Choice(["sparse", "allocate", "header"]),
+    help="Sparse files, preallocated files or files with a valid header followed by data (needs --size)"
+)
+# endregion
+# region seed option
+@click.option(
+    "--seed",
+    metavar="<integer>",
+    type=click.INT,
+    help="Seed of the file names, types and sizes, the same seed produces the same files"
+)
+# endregion
+# region tree options
+@click.option(
+    "-d",
+    "--depth",
+    default=0,
+    metavar="<integer>",
+    type=click.IntRange(min=0),
+    help="Levels of sub-folders to generate, 0 for a flat folder"
+)
+@click.option(
+    "--fanout",
+    default=2,
+    metavar="<integer>",
+    type=click.IntRange(min=1),
+    help="Sub-folders of every folder of the tree"
+)
+@click.option(
+    "--files-per-directory",
+    default="even",
+    metavar="<even|zipf|hot>",
+    type=click.Choice(["even", "zipf", "hot"]),
+    help="How files are spread over the tree: evenly, zipf skewed or half of them in one hot folder"
+)
+# endregion
+# region stats options
+@click.option(
+    "--stats",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Print the count, bytes, errors, time and p50/p99 latency of every phase when done"
+)
+@click.option(
+    "--stats-file",
+    metavar="<Path>",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+    help="Write the stats of every phase to a Prometheus textfile collector file"
+)
+# endregion
+def populator_cli(amount, folder, supported, verbose, filters, workers, process_pool, size, content, seed, depth,
+                  fanout, files_per_directory, stats, stats_file):
+    from .workers import Populator
+
     if verbose:
-        import workers.populator
-        workers.populator.logger.setLevel(logging.DEBUG)
-        for handler in workers.populator.logger.handlers:
-            handler.setLevel(logging.DEBUG)
+        from .workers import populator as populator_module
+        verbose_logging(populator_module.logger)
+
+    if content == "header" and not size:
+        raise click.UsageError("--content header needs --size, empty files have no content")
 
     folder = pathlib.Path(folder)
-    populator = Populator(path=folder, amount=amount, supported_files=supported, filters=filters)
+    populator = Populator(
+        path=folder,
+        amount=amount,
+        supported_files=supported,
+        filters=filters,
+        workers=workers,
+        executor="process" if process_pool else "thread",
+        size=size,
+        content=content,
+        seed=seed,
+        depth=depth,
+        fanout=fanout,
+        files_per_directory=files_per_directory,
+    )
     populator()
+    report_stats(populator, stats, stats_file)
 
 
 # region Click Options
 # region command settings
 @main.command(
-    cls=click_help_colors.HelpColorsCommand,
+    cls=HelpColorsCommand,
     help_headers_color='green',
     help_options_color='red',
     name="cleaner",
@@ -136,6 +274,38 @@ def populator_cli(amount, folder, supported, verbose, filters):
     help="Folder path where the files will be processed for cleaning"
 )
 # endregion
+# region roots options
+@click.argument(
+    "roots",
+    nargs=-1,
+    metavar="[ROOTS]...",
+    type=click.Path(dir_okay=True, file_okay=False),
+)
+@click.option(
+    "--glob",
+    "pattern",
+    metavar="<pattern>",
+    help="Glob pattern of folders to clean, e.g '/home/*/inbox' ('**' matches any amount of sub-folders)"
+)
+@click.option(
+    "--roots-file",
+    metavar="<Path>",
+    type=click.Path(exists=True, dir_okay=False, file_okay=True, allow_dash=False),
+    help="Text file listing the folders to clean, one per line"
+)
+@click.option(
+    "--processes",
+    metavar="<integer>",
+    type=click.IntRange(min=1),
+    help="Processes cleaning many folders in parallel. Default: the amount of CPUs"
+)
+@click.option(
+    "--report",
+    metavar="<Path>",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+    help="Write the results of every folder and the stats of the run to a JSON file"
+)
+# endregion
 # region save option
 @click.option(
     "-s",
@@ -158,20 +328,445 @@ def populator_cli(amount, folder, supported, verbose, filters):
     "-p",
     "--pool",
     metavar="<Path>",
-    type=click.Path(dir_okay=False, file_okay=True),
-    help="JSON file with file types to produce"
+    type=click.Path(exists=True, dir_okay=False, file_okay=True),
+    help="JSON file with file types to clean, and an optional \"rules\" section. It is merged into the cached "
+         "supported pool"
+)
+# region depth option
+@click.option(
+    "-d",
+    "--depth",
+    default=0,
+    metavar="<integer>",
+    type=click.INT,
+    help="How many levels of sub-folders to clean, 0 for the top level only and -1 for no limit"
+)
+# endregion
+# region follow symlinks option
+@click.option(
+    "--follow-symlinks",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Descend into symbolic links to folders"
+)
+# endregion
+# region workers option
+@click.option(
+    "-w",
+    "--workers",
+    default=1,
+    metavar="<integer>",
+    type=click.IntRange(min=1),
+    help="Amount of threads moving files concurrently"
+)
+@click.option(
+    "--read-workers",
+    default=None,
+    metavar="<integer>",
+    type=click.IntRange(min=1),
+    help="Amount of threads reading files to --sniff their content or hash --duplicates, independent of --workers. "
+         "Default: the number of CPUs, at most 32"
+)
+# endregion
+# region verify option
+@click.option(
+    "--verify",
+    metavar="<size|checksum>",
+    type=click.Choice(["size", "checksum"]),
+    help="Verify files copied to another device before removing the originals"
+)
+# endregion
+# region dry run option
+@click.option(
+    "--dry-run",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Only print the move plan, nothing is moved"
+)
+# endregion
+# region plan option
+@click.option(
+    "--plan",
+    metavar="<Path>",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+    help="Write the move plan to a JSON lines file instead of applying it"
+)
+# endregion
+# region apply option
+@click.option(
+    "--apply",
+    metavar="<Path>",
+    type=click.Path(exists=True, dir_okay=False, file_okay=True),
+    help="Apply a move plan previously written with --plan"
+)
+# endregion
+# region incremental option
+@click.option(
+    "-i",
+    "--incremental",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Skip the files that previous runs already decided to leave in place"
+)
+# endregion
+# region sniff option
+@click.option(
+    "--sniff",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Recognize files by their content, for files without an extension or with a wrong one"
 )
 # endregion
-def cleaner_cli(folder, save, verbose, pool):
+# region duplicates option
+@click.option(
+    "--duplicates",
+    metavar="<skip|hardlink|move>",
+    type=click.Choice(["skip", "hardlink", "move"]),
+    help="Find identical files and skip them, replace them with hard links or move them to 'duplicates'"
+)
+# endregion
+# region collisions option
+@click.option(
+    "--collisions",
+    default="suffix",
+    metavar="<suffix|hash|skip|overwrite-if-newer>",
+    type=click.Choice(["suffix", "hash", "skip", "overwrite-if-newer"]),
+    help="What to do with a file whose name is taken in its destination folder. Default: add a counter suffix"
+)
+# endregion
+# region layout options
+@click.option(
+    "--layout",
+    metavar="<flat|date|TEMPLATE>",
+    help="Split the category folders by the date of the files: 'date' for <category>/YYYY/MM or a strftime "
+         "template like '%Y/%m/%d'. Default: flat"
+)
+@click.option(
+    "--timestamp",
+    default="mtime",
+    metavar="<mtime|ctime>",
+    type=click.Choice(["mtime", "ctime"]),
+    help="Date of the files used by --layout. Default: mtime"
+)
+# endregion
+# region watch options
+@click.option(
+    "--watch",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Keep running and clean new files as they show up"
+)
+@click.option(
+    "--interval",
+    default=1.0,
+    metavar="<float>",
+    type=click.FloatRange(min=0.01),
+    help="Seconds between checks of new files in --watch mode"
+)
+@click.option(
+    "--polling",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Watch by polling the folder instead of using inotify"
+)
+# endregion
+# region stats options
+@click.option(
+    "--stats",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Print the count, bytes, errors, time and p50/p99 latency of every phase when done"
+)
+@click.option(
+    "--stats-file",
+    metavar="<Path>",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+    help="Write the stats of every phase to a Prometheus textfile collector file"
+)
+# endregion
+# region journal options
+@click.option(
+    "--journal/--no-journal",
+    default=False,
+    help="Journal the moves in the cache folder, so the run can be resumed or undone. The whole folder is "
+         "scanned before the first move. Default: off"
+)
+@click.option(
+    "--resume",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Finish the latest interrupted run of the folder from its journal, without scanning it again"
+)
+# endregion
+# region log every option
+@click.option(
+    "--log-every",
+    default=1000,
+    metavar="<integer>",
+    type=click.IntRange(min=0),
+    help="With --verbose, sum the per-file messages up every N files, 0 for one message per file"
+)
+# endregion
+def cleaner_cli(folder, roots, pattern, roots_file, processes, report, save, verbose, pool, depth, follow_symlinks,
+                workers, read_workers, verify, dry_run, plan, apply, incremental, sniff, duplicates, collisions, layout,
+                timestamp, watch, interval, polling, stats, stats_file, journal, resume, log_every):
+    from .workers import Cleaner
+    from .workers import cleaner as cleaner_module
+    from .utilities.plan import read_plan, write_plan
+
+    if dry_run and not (roots or pattern or roots_file):
+        # the standard output carries the plan, it has to stay readable by --apply
+        from .utilities.logging import logging_to
+        click.get_current_context().with_resource(logging_to(sys.stderr, cleaner_module.logger))
     if verbose:
-        import workers.cleaner
-        workers.cleaner.logger.setLevel(logging.DEBUG)
-        for handler in workers.cleaner.logger.handlers:
-            handler.setLevel(logging.DEBUG)
+        verbose_logging(cleaner_module.logger)
 
-    folder = pathlib.Path(folder)
-    cleaner = Cleaner(path=folder, save_to=save)
-    cleaner()
+    if roots or pattern or roots_file:
+        if apply or plan or dry_run or watch or resume or journal:
+            raise click.UsageError(
+                "--apply, --plan, --dry-run, --watch, --journal and --resume clean a single --folder"
+            )
+        batch_cleaner_cli(
+            roots=list(roots) + ([folder] if folder else []),
+            pattern=pattern,
+            roots_file=roots_file,
+            processes=processes,
+            report=report,
+            files_supported=pool,
+            save_to=save,
+            max_depth=depth,
+            follow_symlinks=follow_symlinks,
+            workers=workers,
+            read_workers=read_workers,
+            verify=verify,
+            incremental=incremental,
+            sniff=sniff,
+            duplicates=duplicates,
+            collisions=collisions,
+            layout=layout,
+            timestamp=timestamp,
+            log_every=log_every,
+            stats=stats,
+            stats_file=stats_file,
+        )
+        return
+
+    folder = pathlib.Path(folder) if folder else pathlib.Path.cwd()
+    cleaner = Cleaner(
+        path=folder,
+        files_supported=pool,
+        save_to=save,
+        max_depth=depth,
+        follow_symlinks=follow_symlinks,
+        workers=workers,
+        read_workers=read_workers,
+        verify=verify,
+        incremental=incremental,
+        sniff=sniff,
+        duplicates=duplicates,
+        collisions=collisions,
+        layout=layout,
+        timestamp=timestamp,
+        log_every=log_every,
+        journal=journal,
+    )
+    try:
+        if resume:
+            cleaner.resume()
+        elif apply:
+            if journal:
+                cleaner.execute_journaled(read_plan(apply))
+            else:
+                cleaner.execute(read_plan(apply), sort=True)
+        elif plan:
+            write_plan(cleaner.plan(), plan)
+        elif dry_run:
+            write_plan(cleaner.plan(), sys.stdout)
+        elif watch:
+            try:
+                cleaner.watch(interval=interval, debounce=min(interval, 0.5), polling=polling)
+            except KeyboardInterrupt:
+                pass
+        else:
+            cleaner()
+    finally:
+        # failed runs are the ones worth looking at
+        report_stats(cleaner, stats, stats_file)
+
+
+def batch_cleaner_cli(roots, pattern, roots_file, processes, report, stats, stats_file, **options):
+    """Clean every root given to the cleaner command, with one report for the whole run"""
+    import json
+    from .workers.batch import BatchCleaner, resolve_roots
+
+    roots = resolve_roots(roots, pattern=pattern, roots_file=roots_file)
+    if not roots:
+        raise click.UsageError("No folder to clean")
+    batch = BatchCleaner(roots=roots, processes=processes, **options)
+    try:
+        batch()
+    finally:
+        click.echo(batch.format_report(), err=True)
+        report_stats(batch, stats, stats_file)
+        if report:
+            with pathlib.Path(report).expanduser().open("w", encoding="utf-8") as f:
+                json.dump(batch.report(), f, indent=2)
+                f.write("\n")
+    if any(result.error for result in batch.results.values()):
+        sys.exit(1)
+
+
+# region Click Options
+# region command settings
+@main.command(
+    cls=HelpColorsCommand,
+    help_headers_color='green',
+    help_options_color='red',
+    name="undo",
+    context_settings={
+        "help_option_names":      ['-h', '--help'],
+        "ignore_unknown_options": True
+    },
+    options_metavar="<options>"
+)
+# endregion
+# region run argument
+@click.argument(
+    "run",
+    required=False,
+    metavar="[RUN]",
+)
+# endregion
+# region folder option
+@click.option(
+    "-f",
+    "--folder",
+    metavar="<Path>",
+    type=click.Path(dir_okay=True, file_okay=False),
+    help="Undo the latest run that cleaned this folder"
+)
+# endregion
+# region list option
+@click.option(
+    "--list",
+    "list_runs",
+    metavar="<boolean>",
+    is_flag=True,
+    help="List the journaled runs instead of undoing one"
+)
+# endregion
+def undo_cli(run, folder, list_runs):
+    """Move the files of a journaled cleaner run back. Default: the latest run"""
+    from .workers import BaseWorker
+    from .utilities import journal
+
+    root = BaseWorker(path=folder or pathlib.Path.cwd()).journal_dir
+    if list_runs:
+        for found in journal.list_runs(root, path=folder):
+            info = found.info
+            click.echo(f"{found.run}  {info['state']:<8}  {info['operations']:>8} operations  {info['path']}")
+        return
+
+    found = journal.find_run(root, run=run, path=folder)
+    if found is None or found.state == journal.UNDONE:
+        raise click.ClickException(f"No run to undo{f' for {folder}' if folder else ''}")
+    restored, failed = journal.undo(found)
+    click.echo(f"Run {found.run}: {restored} files moved back, {failed} files left in place")
+
+
+# region Click Options
+# region command settings
+@main.command(
+    cls=HelpColorsCommand,
+    help_headers_color='green',
+    help_options_color='red',
+    name="bench",
+    context_settings={
+        "help_option_names":      ['-h', '--help'],
+        "ignore_unknown_options": True
+    },
+    options_metavar="<options>"
+)
+# endregion
+# region scale option
+@click.option(
+    "--scale",
+    multiple=True,
+    metavar="<1k|100k|1m>",
+    type=click.Choice(["1k", "100k", "1m"], case_sensitive=False),
+    help="Fixture sizes to run, can be repeated. Default: all of them"
+)
+# endregion
+# region layout option
+@click.option(
+    "--layout",
+    multiple=True,
+    metavar="<flat|nested>",
+    type=click.Choice(["flat", "nested"]),
+    help="Fixture layouts to run, can be repeated. Default: all of them"
+)
+# endregion
+# region output option
+@click.option(
+    "-o",
+    "--output",
+    default="-",
+    metavar="<Path>",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True, allow_dash=True),
+    help="JSON file the results are written to. Default: the standard output"
+)
+# endregion
+# region folder option
+@click.option(
+    "-f",
+    "--folder",
+    metavar="<Path>",
+    type=click.Path(exists=True, dir_okay=True, file_okay=False),
+    help="Folder the fixtures are built in. Default: the temporary folder"
+)
+# endregion
+# region workers option
+@click.option(
+    "-w",
+    "--workers",
+    default=1,
+    metavar="<integer>",
+    type=click.IntRange(min=1),
+    help="Amount of threads used by the Populator and the Cleaner"
+)
+# endregion
+# region seed option
+@click.option(
+    "--seed",
+    default=0,
+    metavar="<integer>",
+    type=click.INT,
+    help="Seed of the fixtures"
+)
+# endregion
+# region verbose option
+@click.option(
+    "--verbose",
+    metavar="<boolean>",
+    is_flag=True,
+    help="Enables verbose logging messages"
+)
+# endregion
+def bench_cli(scale, layout, output, folder, workers, seed, verbose):
+    from . import bench
+
+    if output == "-":
+        # the results go to the standard output, keep the progress messages out of it
+        bench.logger.setLevel(logging.WARNING)
+    results = bench.run_suite(
+        scales=[value.lower() for value in scale],
+        layouts=layout,
+        directory=folder,
+        workers=workers,
+        seed=seed,
+        verbose=verbose,
+    )
+    bench.write_results(results, sys.stdout if output == "-" else output)
 
 
 if __name__ == '__main__':
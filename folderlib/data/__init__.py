@@ -1,5 +1,6 @@
 
 __all__ = [
     "supported",
-    "excluded"
+    "excluded",
+    "magic",
 ]
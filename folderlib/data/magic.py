@@ -0,0 +1,77 @@
+"""Magic numbers of the file types found in the supported (and excluded) pools
+
+    Every signature is an (extension, parts) tuple where parts is a tuple of (offset, bytes) pairs that must
+    all match the header of a file. Signatures are checked in order, so more specific signatures come before
+    the generic ones they share a prefix with (e.g. OpenDocument before ZIP).
+"""
+
+__all__ = [
+    "signatures",
+    "containers",
+]
+
+RIFF = (0, b"RIFF")
+ZIP = (0, b"PK\x03\x04")
+
+signatures = [
+    # audio
+    ("aif", ((0, b"FORM"), (8, b"AIFF"))),
+    ("cda", (RIFF, (8, b"CDDA"))),
+    ("mid", ((0, b"MThd"),)),
+    ("mp3", ((0, b"ID3"),)),
+    ("mp3", ((0, b"\xff\xfb"),)),
+    ("mp3", ((0, b"\xff\xf3"),)),
+    ("mp3", ((0, b"\xff\xf2"),)),
+    ("ogg", ((0, b"OggS"),)),
+    ("wav", (RIFF, (8, b"WAVE"))),
+    ("wma", ((0, b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"),)),
+    ("wpl", ((0, b"<?wpl"),)),
+    # compressed
+    ("odt", (ZIP, (30, b"mimetypeapplication/vnd.oasis.opendocument.text"))),
+    ("ods", (ZIP, (30, b"mimetypeapplication/vnd.oasis.opendocument.spreadsheet"))),
+    ("zip", (ZIP,)),
+    ("zip", ((0, b"PK\x05\x06"),)),
+    ("arj", ((0, b"\x60\xea"),)),
+    ("deb", ((0, b"!<arch>\ndebian-binary"),)),
+    ("gz", ((0, b"\x1f\x8b"),)),
+    ("pkg", ((0, b"xar!"),)),
+    ("rar", ((0, b"Rar!\x1a\x07"),)),
+    ("rpm", ((0, b"\xed\xab\xee\xdb"),)),
+    ("tar", ((257, b"ustar"),)),
+    ("z", ((0, b"\x1f\x9d"),)),
+    # image
+    ("bmp", ((0, b"BM"),)),
+    ("gif", ((0, b"GIF87a"),)),
+    ("gif", ((0, b"GIF89a"),)),
+    ("ico", ((0, b"\x00\x00\x01\x00"),)),
+    ("jpg", ((0, b"\xff\xd8\xff"),)),
+    ("png", ((0, b"\x89PNG\r\n\x1a\n"),)),
+    ("ps", ((0, b"%!PS"),)),
+    ("psd", ((0, b"8BPS"),)),
+    ("svg", ((0, b"<svg"),)),
+    ("tif", ((0, b"II*\x00"),)),
+    ("tif", ((0, b"MM\x00*"),)),
+    ("webp", (RIFF, (8, b"WEBP"))),
+    # text
+    ("doc", ((0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),)),
+    ("pdf", ((0, b"%PDF-"),)),
+    ("rtf", ((0, b"{\\rtf"),)),
+    ("wpd", ((0, b"\xffWPC"),)),
+    # video
+    ("avi", (RIFF, (8, b"AVI "))),
+    ("mp4", ((4, b"ftyp"),)),
+    # excluded
+    ("exe", ((0, b"MZ"),)),
+    ("out", ((0, b"\x7fELF"),)),
+]
+
+# Container formats: a file whose content matches the key but whose extension is one of the values is a
+# specialisation of the container (e.g. a .docx file is a ZIP archive) and keeps the type of its extension
+containers = {
+    "zip": ["docx", "xlsx", "odt", "ods", "jar", "apk", "epub"],
+    "doc": ["xls", "xlr", "wps", "ppt", "msi"],
+    "pdf": ["ai"],
+    "gz": ["tgz"],
+    "mp4": ["m4a", "mov", "3gp"],
+    "ps": ["eps"],
+}
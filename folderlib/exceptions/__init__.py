@@ -6,6 +6,8 @@ __all__ = [
     "InvalidJsonFile",
     "MissingCacheFile",
     "CleanedMatch",
+    "TransferVerificationError",
+    "MissingJournal",
 ]
 
 from pathlib import Path
@@ -72,3 +74,17 @@ class CleanedMatch(_Error):
 
     def __init__(self):
         super().__init__()
+
+
+class TransferVerificationError(_Error):
+    """Raised when a copied file does not match its source"""
+
+    def __init__(self, source: Union[str, Path], destination: Union[str, Path], msg: str = ""):
+        super().__init__(msg=f"Copy of {source} to {destination} could not be verified. {msg}")
+
+
+class MissingJournal(_Error):
+    """Raised when there is no journaled run to resume or undo"""
+
+    def __init__(self, path: Union[str, Path] = "", msg: str = ""):
+        super().__init__(msg=f"No journaled run of {path} found. {msg}")
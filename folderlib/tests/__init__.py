@@ -1 +1,20 @@
 # -*- coding: utf-8 -*-
+
+import tempfile
+import unittest
+from contextlib import ExitStack
+from pathlib import Path
+
+from folderlib.utilities.config import cache_home
+
+
+class CacheTestCase(unittest.TestCase):
+    """Keeps the pools, snapshots and journals of the workers of a test out of the user's cache directory"""
+
+    def setUp(self) -> None:
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.cache_dir = Path(temp_dir.name)
+        with ExitStack() as stack:
+            stack.enter_context(cache_home(self.cache_dir))
+            self.addCleanup(stack.pop_all().close)
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from folderlib.utilities import journal
+from folderlib.utilities.aio import bounded_map
+from folderlib.workers import Cleaner, Populator
+from folderlib.tests import CacheTestCase
+
+
+class TestBoundedMap(unittest.TestCase):
+
+    def test_limit_and_errors(self):
+        running = list()
+        peak = list()
+
+        def work(item):
+            running.append(item)
+            peak.append(len(running))
+            try:
+                if item == 7:
+                    raise ValueError(item)
+                return item * 2
+            finally:
+                running.remove(item)
+
+        async def consume(items):
+            return sorted([result async for _, result in bounded_map(work, items, limit=3)])
+
+        self.assertEqual(asyncio.run(consume(range(5))), [0, 2, 4, 6, 8])
+        self.assertLessEqual(max(peak), 3)
+        with self.assertRaises(ValueError):
+            asyncio.run(consume(range(10)))
+
+
+class TestAsyncWorkers(CacheTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.folders = [self.root.joinpath(f"folder{i}") for i in range(3)]
+
+        async def populate():
+            populators = [Populator(path=folder, amount=20, filters=["audio", "image"], seed=i, workers=2,
+                                    shard_size=5) for i, folder in enumerate(self.folders)]
+            return await asyncio.gather(*(populator.arun() for populator in populators))
+
+        self.assertEqual(asyncio.run(populate()), [40, 40, 40])
+
+    def test_concurrent_folders(self):
+        async def clean():
+            cleaners = [Cleaner(folder, workers=2) for folder in self.folders]
+            return await asyncio.gather(*(cleaner.arun() for cleaner in cleaners))
+
+        self.assertEqual(asyncio.run(clean()), [40, 40, 40])
+        for folder in self.folders:
+            self.assertEqual(sorted(os.listdir(folder.joinpath("clean-folder"))), ["audio", "image"])
+
+    def test_journaled_run(self):
+        cleaner = Cleaner(self.folders[0], workers=2, journal=True)
+        self.assertEqual(asyncio.run(cleaner.arun()), 40)
+        run = journal.find_run(cleaner.journal_dir, path=self.folders[0])
+        self.assertEqual((run.state, run.info["moved"], len(run.applied())), ("finished", 40, 40))
+
+    def test_progress_and_cancellation(self):
+        cleaner = Cleaner(self.folders[0], workers=2)
+
+        async def first_events():
+            events = list()
+            async for event in cleaner.aiter_moves(chunk_size=1):
+                events.append(event)
+                if len(events) == 3:
+                    # the consumer is slow, nothing more is moved while it does not ask for more
+                    await asyncio.sleep(0.2)
+                    moved = self.moved()
+                    break
+            return events, moved
+
+        events, moved = asyncio.run(first_events())
+        self.assertEqual([event.moved for event in events], [1, 2, 3])
+        self.assertLessEqual(moved, 3 + cleaner.workers)
+        # leaving the loop cancels the rest of the plan
+        self.assertEqual(self.moved(), moved)
+
+    def test_cancel_task(self):
+        cleaner = Cleaner(self.folders[0])
+
+        async def cancel():
+            task = asyncio.ensure_future(cleaner.arun())
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel())
+        self.assertLess(self.moved(), 40)
+
+    def moved(self) -> int:
+        save_to = self.folders[0].joinpath("clean-folder")
+        return sum(len(files) for _, _, files in os.walk(save_to))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.workers import BatchCleaner
+from folderlib.workers.batch import resolve_roots
+from folderlib.tests import CacheTestCase
+
+
+class TestBatchCleaner(CacheTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.base = Path(self.temp_dir.name).joinpath("inboxes")
+        self.roots = list()
+        for user, amount in [("alice", 2), ("bob", 30), ("carol", 0)]:
+            root = self.base.joinpath(user, "inbox")
+            root.mkdir(parents=True)
+            for i in range(amount):
+                for extension in ["mp3", "png", "exe"]:
+                    root.joinpath(f"file_{i}.{extension}").touch()
+            self.roots.append(root)
+
+    def test_resolve_roots(self):
+        listing = Path(self.temp_dir.name, "roots.txt")
+        listing.write_text(f"# inboxes\n{self.roots[0]}\n\n{self.base.joinpath('nobody')}\n")
+        roots = resolve_roots([self.roots[1]], pattern=str(self.base.joinpath("*", "inbox")), roots_file=listing)
+        self.assertEqual(roots, [self.roots[1], self.roots[0], self.roots[2]])
+
+    def test_chunked_roots(self):
+        for processes in [1, 2]:
+            with self.subTest(processes=processes):
+                batch = BatchCleaner(self.roots, processes=processes, chunk_size=7)
+                self.assertEqual(batch(), 64)
+                self.assertEqual([(result.scanned, result.moved, result.error) for result in batch.results.values()],
+                                 [(6, 4, ""), (90, 60, ""), (0, 0, "")])
+                self.assertEqual(len(os.listdir(self.roots[1].joinpath("clean-folder", "audio"))), 30)
+                report = batch.report()
+                self.assertEqual((report["moved"], report["failed"]), (64, 0))
+                self.assertEqual(report["stats"]["move"]["count"], 64)
+                for root in self.roots:
+                    for path in root.joinpath("clean-folder").rglob("*.*"):
+                        path.rename(root.joinpath(path.name))
+
+    def test_journal_is_rejected(self):
+        with self.assertRaises(ValueError):
+            BatchCleaner(self.roots, journal=True)
+
+    def test_failed_root(self):
+        batch = BatchCleaner(self.roots, processes=1, verify="size")
+        with mock.patch("folderlib.workers.cleaner.move_file", side_effect=OSError("read-only")):
+            self.assertEqual(batch(), 0)
+        self.assertEqual(batch.report()["failed"], 2)
+        with self.assertRaises(ValueError):
+            BatchCleaner(self.roots, verify="twice")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
@@ -1,42 +1,124 @@
+import os
 import unittest
 import pytest
 import tempfile
+import time
+from pathlib import Path
+from unittest import mock
 
-import os
-import random
-import shutil
-from pathlib2 import Path
-
-from folder_wonder.cleaner import Cleaner, EmptyFilesList
+from folderlib.utilities import journal
+from folderlib.utilities.executor import BoundedExecutor
+from folderlib.utilities.naming import bucket_template, date_bucket
+from folderlib.workers import Cleaner
+from folderlib.exceptions import EmptyDirectory
+from folderlib.tests import CacheTestCase
 
 
-class TestCleanerBasic(unittest.TestCase):
+class TestCleanerBasic(CacheTestCase):
 
     def setUp(self) -> None:
+        super().setUp()
         self.temp_dir = tempfile.TemporaryDirectory()
-        self.temp_dirpath = Path(self.temp_dir.name)
-        for i in range(16):
-            with tempfile.NamedTemporaryFile(dir=self.temp_dirpath, delete=False):
-                pass
-
-    def test_cascades(self):
-        """
-        Instead of writing methods without return values, make them return self
-        This allows cascading of methods
-        """
+        self.temp_dirpath = Path(self.temp_dir.name).joinpath("folder")
+        self.temp_dirpath.mkdir()
+        for extension in ["mp3", "png", "pdf", "exe", "unknown"]:
+            for i in range(4):
+                self.temp_dirpath.joinpath(f"file_{i}.{extension}").touch()
+
+    def test_cleanup(self):
+        cleaner = Cleaner(self.temp_dirpath)
+        with self.assertLogs("Cleaner", level="INFO") as logs:
+            self.assertEqual(cleaner(), 12)
+        self.assertEqual(cleaner.extensions, {"mp3": 4, "png": 4, "pdf": 4, "exe": 4, "unknown": 4})
+        self.assertIn("INFO:Cleaner:Found 5 unique extensions", logs.output)
+        self.assertIn("INFO:Cleaner:mp3: 4", logs.output)
+        save_to = self.temp_dirpath.joinpath("clean-folder")
+        self.assertEqual(sorted(os.listdir(save_to)), ["audio", "image", "text"])
+        self.assertEqual(len(os.listdir(save_to.joinpath("audio"))), 4)
+        self.assertEqual(sorted(entry.name for entry in os.scandir(self.temp_dirpath) if entry.is_file()),
+                         sorted(f"file_{i}.{extension}" for extension in ["exe", "unknown"] for i in range(4)))
+
+    def test_group_unknowns(self):
+        cleaner = Cleaner(self.temp_dirpath, group_unknowns=True)
+        categories = {operation.category for operation in cleaner.plan()}
+        self.assertEqual(categories, {"audio", "image", "text", "unknowns"})
+
+    def test_threaded_execute(self):
+        names = [f"many_{i}.{extension}" for i in range(100) for extension in ["mp3", "png", "pdf"]]
+        for name in names:
+            self.temp_dirpath.joinpath(name).write_text(name)
+        cleaner = Cleaner(self.temp_dirpath, workers=4)
+        with mock.patch("folderlib.workers.cleaner.BoundedExecutor", wraps=BoundedExecutor) as executor:
+            self.assertEqual(cleaner(), 312)
+        executor.assert_called_once_with(max_workers=4, name="Cleaner")
+
+        save_to = self.temp_dirpath.joinpath("clean-folder")
+        landed = [path.name for path in save_to.rglob("*") if path.is_file()]
+        expected = names + [f"file_{i}.{extension}" for i in range(4) for extension in ["mp3", "png", "pdf"]]
+        self.assertEqual(sorted(landed), sorted(expected))
+        for path in save_to.rglob("many_*"):
+            self.assertEqual(path.read_text(), path.name)
+        self.assertFalse(any(self.temp_dirpath.glob("many_*")))
+
+    def test_name_collisions(self):
+        nested = self.temp_dirpath.joinpath("nested")
+        nested.mkdir()
+        nested.joinpath("file_0.mp3").write_text("nested")
+        audio = self.temp_dirpath.joinpath("clean-folder", "audio")
+        audio.mkdir(parents=True)
+        audio.joinpath("file_1.mp3").write_text("kept")
+
+        cleaner = Cleaner(self.temp_dirpath, max_depth=None)
+        self.assertEqual(cleaner(), 13)
+        self.assertEqual(sorted(os.listdir(audio)),
+                         ["file_0.mp3", "file_0_1.mp3", "file_1.mp3", "file_1_1.mp3", "file_2.mp3", "file_3.mp3"])
+        self.assertEqual(audio.joinpath("file_1.mp3").read_text(), "kept")
+
+    def test_stale_plan_keeps_destination(self):
         cleaner = Cleaner(self.temp_dirpath)
-        is_enabled = cleaner.analyze_path().cleanup().is_file_enabled("midi")
-        self.assertEqual(is_enabled, False)
+        operations = list(cleaner.plan())
+        audio = self.temp_dirpath.joinpath("clean-folder", "audio")
+        audio.mkdir(parents=True)
+        audio.joinpath("file_0.mp3").write_text("kept")
+        with self.assertRaises(FileExistsError):
+            cleaner.execute(operations)
+        self.assertEqual(audio.joinpath("file_0.mp3").read_text(), "kept")
+        self.assertTrue(self.temp_dirpath.joinpath("file_0.mp3").exists())
+
+        # overwrite-if-newer replaces an older file that took the name since the plan was made
+        self.temp_dirpath.joinpath("late.mp3").write_text("new")
+        cleaner = Cleaner(self.temp_dirpath, collisions="overwrite-if-newer")
+        operations = [operation for operation in cleaner.plan() if operation.source.endswith("late.mp3")]
+        audio.joinpath("late.mp3").write_text("old")
+        os.utime(audio.joinpath("late.mp3"), ns=(0, 0))
+        self.assertEqual(cleaner.execute(operations), 1)
+        self.assertEqual(audio.joinpath("late.mp3").read_text(), "new")
+
+    def test_date_layout(self):
+        # local noon, so the buckets do not depend on the timezone
+        for i, month in enumerate([1, 1, 5, 12]):
+            stamp = time.mktime((2023, month, 15, 12, 0, 0, 0, 0, -1))
+            os.utime(self.temp_dirpath.joinpath(f"file_{i}.mp3"), (stamp, stamp))
+        with self.assertRaises(ValueError):
+            Cleaner(self.temp_dirpath, layout="../%Y")
+
+        cleaner = Cleaner(self.temp_dirpath, layout="date", journal=True)
+        self.assertEqual(cleaner(), 12)
+        audio = self.temp_dirpath.joinpath("clean-folder", "audio")
+        self.assertEqual(sorted(str(path.relative_to(audio)) for path in audio.rglob("*.mp3")),
+                         ["2023/01/file_0.mp3", "2023/01/file_1.mp3", "2023/05/file_2.mp3", "2023/12/file_3.mp3"])
+        stat = audio.joinpath("2023", "05", "file_2.mp3").stat()
+        self.assertEqual(date_bucket(bucket_template("%Y-%m//%d"), stat), os.path.join("2023-05", "15"))
 
-        cleaner = Cleaner(self.temp_dirpath, files_supported={"audio": {"midi": "on"}})
-        is_enabled = cleaner.analyze_path().cleanup().is_file_enabled("midi")
-        self.assertNotEqual(is_enabled, False)
+        run = journal.find_run(cleaner.journal_dir, path=self.temp_dirpath)
+        self.assertEqual(journal.undo(run), (12, 0))
+        self.assertFalse(self.temp_dirpath.joinpath("clean-folder").exists())
 
-    def test_EmptyFilesList_error(self):
+    def test_EmptyDirectory_error(self):
         with tempfile.TemporaryDirectory() as d:
             cleaner = Cleaner(d)
-            with pytest.raises(EmptyFilesList):
-                cleaner.analyze_path().cleanup()
+            with pytest.raises(EmptyDirectory):
+                cleaner()
 
     def tearDown(self) -> None:
         self.temp_dir.cleanup()
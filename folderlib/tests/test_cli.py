@@ -1,18 +1,116 @@
 # -*- coding: utf-8 -*-
 
-"""Tests for folder_wonder package."""
+"""Tests for folderlib package."""
+
+import json
+import os
+import tempfile
+from pathlib import Path
 
 from click.testing import CliRunner
 
-from folder_wonder import cli
+from folderlib import cli
+from folderlib.utilities.config import cache_home
 
 
 def test_command_line_interface():
     """Test the CLI."""
     runner = CliRunner()
-    result = runner.invoke(cli.main)
-    assert result.exit_code == 0
-    assert 'folder_wonder.cli.main' in result.output
     help_result = runner.invoke(cli.main, ['--help'])
     assert help_result.exit_code == 0
-    assert '--help  Show this message and exit.' in help_result.output
+    assert '--help' in help_result.output
+    for command in ["bench", "cleaner", "populator"]:
+        assert command in help_result.output
+
+
+def test_populate_and_clean():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as d, cache_home(d):
+        folder = Path(d, "folder")
+        result = runner.invoke(cli.main, ["populator", "-f", str(folder), "-a", "3", "--filters", "[audio, image]"])
+        assert result.exit_code == 0, result.output
+        assert len(os.listdir(folder)) == 6
+
+        result = runner.invoke(cli.main, ["cleaner", "-f", str(folder), "--journal"])
+        assert result.exit_code == 0, result.output
+        assert sorted(os.listdir(folder.joinpath("clean-folder"))) == ["audio", "image"]
+
+        result = runner.invoke(cli.main, ["undo", "-f", str(folder)])
+        assert result.exit_code == 0, result.output
+        assert "6 files moved back" in result.output
+        assert len(os.listdir(folder)) == 6
+
+        # a plan applied with --journal can be undone as well
+        plan_file = Path(d, "plan.jsonl")
+        result = runner.invoke(cli.main, ["cleaner", "-f", str(folder), "--plan", str(plan_file)])
+        assert result.exit_code == 0, result.output
+        result = runner.invoke(cli.main, ["cleaner", "-f", str(folder), "--apply", str(plan_file), "--journal"])
+        assert result.exit_code == 0, result.output
+        assert len(os.listdir(folder)) == 1
+        result = runner.invoke(cli.main, ["undo", "-f", str(folder)])
+        assert result.exit_code == 0, result.output
+        assert len(os.listdir(folder)) == 6
+
+
+def test_dry_run_plan():
+    from folderlib.utilities.plan import read_plan
+
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as d, cache_home(d):
+        folder = Path(d, "folder")
+        folder.mkdir()
+        for name in ["a.mp3", "b.mp3", "c.png"]:
+            folder.joinpath(name).write_text("same" if name != "c.png" else "image")
+        result = runner.invoke(cli.main, ["cleaner", "-f", str(folder), "--dry-run", "--duplicates", "skip"])
+        assert result.exit_code == 0, result.output
+        assert "Found 1 duplicate files" in result.stderr
+        plan_file = Path(d, "plan.jsonl")
+        plan_file.write_text(result.stdout)
+        assert sorted(operation.category for operation in read_plan(plan_file)) == ["audio", "image"]
+
+        result = runner.invoke(cli.main, ["cleaner", "-f", str(folder), "--apply", str(plan_file)])
+        assert result.exit_code == 0, result.output
+        assert sorted(os.listdir(folder.joinpath("clean-folder"))) == ["audio", "image"]
+
+
+def test_pool_rules():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as d, cache_home(d):
+        folder = Path(d, "folder")
+        folder.mkdir()
+        for name in ["Screenshot 1.png", "photo.png"]:
+            folder.joinpath(name).write_text(name)
+        pool = Path(d, "pool.json")
+        pool.write_text(json.dumps({"image": ["png"], "rules": [{"category": "screenshots", "glob": "Screenshot*"}]}))
+        result = runner.invoke(cli.main, ["cleaner", "-f", str(folder), "--pool", str(pool)])
+        assert result.exit_code == 0, result.output
+        assert os.listdir(folder.joinpath("clean-folder", "screenshots")) == ["Screenshot 1.png"]
+        assert os.listdir(folder.joinpath("clean-folder", "image")) == ["photo.png"]
+
+
+def test_bench():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as d, cache_home(d):
+        output = Path(d, "bench.json")
+        result = runner.invoke(cli.main, ["bench", "--scale", "1k", "--layout", "flat", "-f", d, "-o", str(output)])
+        assert result.exit_code == 0, result.output
+        results = json.loads(output.read_text())
+        assert [case["files"] for case in results["results"]] == [1000]
+        assert set(results["results"][0]["phases"]) == {"populate", "scan", "clean", "classify", "move"}
+
+
+def test_clean_many_roots():
+    runner = CliRunner()
+    with tempfile.TemporaryDirectory() as d, cache_home(d):
+        for user, pool in [("alice", ["--process-pool"]), ("bob", [])]:
+            result = runner.invoke(cli.main, ["populator", "-f", str(Path(d, user, "inbox")), "-a", "2",
+                                              "--filters", "[audio]", "-w", "2"] + pool)
+            assert result.exit_code == 0, result.output
+
+        report = Path(d, "report.json")
+        result = runner.invoke(cli.main, ["cleaner", "--glob", str(Path(d, "*", "inbox")), "--processes", "2",
+                                          "--report", str(report)])
+        assert result.exit_code == 0, result.output
+        results = json.loads(report.read_text())
+        assert [root["moved"] for root in results["roots"]] == [2, 2]
+        assert results["stats"]["move"]["count"] == 4
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.exceptions import InvalidJsonFile, MissingJsonFile
+from folderlib.utilities import config
+from folderlib.workers import Cleaner
+
+
+class TestConfigCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.file = self.root.joinpath("pool.json")
+        config.clear_cache()
+
+    def test_cached_until_changed(self):
+        config.write_json(self.file, {"audio": ["mp3"]})
+        with mock.patch("builtins.open", side_effect=AssertionError("read from disk")):
+            data = config.load_json(self.file)
+        self.assertEqual(data, {"audio": ["mp3"]})
+        data["audio"].append("wav")
+        self.assertEqual(config.load_json(self.file), {"audio": ["mp3"]})
+
+        # another process rewrites the file
+        self.file.write_text('{"audio": ["mp3", "ogg"]}')
+        os.utime(self.file, ns=(1, 1))
+        self.assertEqual(config.load_json(self.file), {"audio": ["mp3", "ogg"]})
+
+    def test_errors(self):
+        with self.assertRaises(MissingJsonFile):
+            config.load_json(self.root.joinpath("missing.json"))
+        self.file.write_text("{")
+        with self.assertRaises(InvalidJsonFile):
+            config.load_json(self.file)
+
+    def test_atomic_write(self):
+        config.write_json(self.file, {"a": [1]})
+        with mock.patch("folderlib.utilities.config.os.replace", side_effect=RuntimeError("disk full")):
+            with self.assertRaises(RuntimeError):
+                config.write_json(self.file, {"a": [2]})
+        self.assertEqual(os.listdir(self.root), ["pool.json"])
+        config.clear_cache()
+        self.assertEqual(config.load_json(self.file), {"a": [1]})
+
+    def test_merge_pools(self):
+        merged, changed = config.merge_pools({"audio": ["mp3"]}, {"audio": ["mp3", "wav"], "text": ["txt"]})
+        self.assertTrue(changed)
+        self.assertEqual(merged, {"audio": ["mp3", "wav"], "text": ["txt"]})
+        self.assertFalse(config.merge_pools(merged, {"audio": ("wav",)})[1])
+
+    def test_workers_share_the_cache(self):
+        with config.cache_home(str(self.root)):
+            first = Cleaner(self.root, files_supported={"audio": ["mp3"], "custom": ["abc"]})
+            modified = os.stat(first.cached_supported).st_mtime_ns
+            with mock.patch("builtins.open", side_effect=AssertionError("read from disk")):
+                second = Cleaner(self.root, files_supported={"custom": ["abc"]})
+            self.assertEqual(second.files_supported, first.files_supported)
+            self.assertEqual(os.stat(first.cached_supported).st_mtime_ns, modified)
+
+    def tearDown(self) -> None:
+        config.clear_cache()
+        self.temp_dir.cleanup()
@@ -0,0 +1,102 @@
+import errno
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.utilities import dedup
+from folderlib.workers import Cleaner
+from folderlib.tests import CacheTestCase
+
+
+class TestFindDuplicates(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        large = os.urandom(dedup.HEAD_SIZE + 10)
+        files = {
+            "a": b"same content",
+            "b": b"same content",
+            "c": b"same length!",
+            "d": large,
+            "e": large[:-1] + bytes([large[-1] ^ 1]),  # same size and head, different tail
+            "f": large,
+            "empty1": b"",
+            "empty2": b"",
+        }
+        for name, content in files.items():
+            self.root.joinpath(name).write_bytes(content)
+        os.link(self.root / "a", self.root / "a-link")
+
+    def groups(self, workers: int):
+        entries = list(os.scandir(self.root))
+        return sorted(sorted(entry.name for entry in group) for group in dedup.find_duplicates(entries, workers))
+
+    def test_groups(self):
+        expected = [["a", "a-link", "b"], ["d", "f"]]
+        self.assertEqual(self.groups(workers=1), expected)
+        self.assertEqual(self.groups(workers=4), expected)
+
+    def test_original_is_oldest(self):
+        os.utime(self.root / "f", ns=(0, 0))
+        groups = dedup.find_duplicates(list(os.scandir(self.root)), workers=1)
+        group = next(group for group in groups if len(group) == 2)
+        self.assertEqual(group[0].name, "f")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+
+class TestCleanerDuplicates(CacheTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name).joinpath("folder")
+        self.root.mkdir()
+        for name, content in {"a.mp3": "same", "b.mp3": "same", "c.mp3": "other"}.items():
+            self.root.joinpath(name).write_text(content)
+        # the oldest copy is the original
+        os.utime(self.root.joinpath("a.mp3"), ns=(0, 0))
+        self.save_to = self.root.joinpath("clean-folder")
+        self.audio = self.save_to.joinpath("audio")
+
+    def test_skip(self):
+        self.assertEqual(Cleaner(self.root, duplicates="skip")(), 2)
+        self.assertEqual(sorted(os.listdir(self.audio)), ["a.mp3", "c.mp3"])
+        self.assertTrue(self.root.joinpath("b.mp3").exists())
+
+    def test_read_workers(self):
+        # the contents are hashed in parallel even when the moves are not
+        cleaner = Cleaner(self.root, duplicates="skip")
+        self.assertEqual(cleaner.read_workers, min(32, os.cpu_count() or 1))
+        cleaner = Cleaner(self.root, duplicates="skip", read_workers=3)
+        with mock.patch("folderlib.workers.cleaner.find_duplicates", wraps=dedup.find_duplicates) as find:
+            self.assertEqual(cleaner(), 2)
+        self.assertEqual(find.call_args.kwargs["workers"], 3)
+
+    def test_move(self):
+        self.assertEqual(Cleaner(self.root, duplicates="move")(), 3)
+        self.assertEqual(sorted(os.listdir(self.audio)), ["a.mp3", "c.mp3"])
+        self.assertEqual(os.listdir(self.save_to.joinpath("duplicates")), ["b.mp3"])
+
+    def test_hardlink(self):
+        self.assertEqual(Cleaner(self.root, duplicates="hardlink")(), 3)
+        self.assertEqual(sorted(os.listdir(self.audio)), ["a.mp3", "b.mp3", "c.mp3"])
+        self.assertTrue(self.audio.joinpath("a.mp3").samefile(self.audio.joinpath("b.mp3")))
+        self.assertFalse(self.root.joinpath("b.mp3").exists())
+
+    def test_hardlink_fallback(self):
+        cleaner = Cleaner(self.root, duplicates="hardlink")
+        # e.g. a filesystem without hard links, the duplicate is moved as a file of its own
+        with mock.patch("os.link", side_effect=OSError(errno.EPERM, "Operation not permitted")):
+            self.assertEqual(cleaner(), 3)
+        self.assertEqual(sorted(os.listdir(self.audio)), ["a.mp3", "b.mp3", "c.mp3"])
+        self.assertFalse(self.audio.joinpath("a.mp3").samefile(self.audio.joinpath("b.mp3")))
+        self.assertEqual(self.audio.joinpath("b.mp3").read_text(), "same")
+        self.assertFalse(self.root.joinpath("b.mp3").exists())
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
@@ -0,0 +1,39 @@
+import threading
+import time
+import unittest
+
+from folderlib.utilities.executor import BoundedExecutor
+
+
+class TestBoundedExecutor(unittest.TestCase):
+
+    def test_pending_is_bounded(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def task():
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.001)
+            with lock:
+                state["running"] -= 1
+
+        with BoundedExecutor(max_workers=2, max_pending=3) as executor:
+            for _ in range(50):
+                executor.submit(task)
+                self.assertLessEqual(executor.max_pending - executor._semaphore._value, 3)
+        self.assertLessEqual(state["peak"], 2)
+        self.assertEqual(executor.errors, [])
+
+    def test_errors_stop_submissions(self):
+        def fail():
+            raise OSError("boom")
+
+        executor = BoundedExecutor(max_workers=1)
+        executor.submit(fail)
+        executor.shutdown()
+        with self.assertRaises(OSError):
+            executor.raise_errors()
+        with self.assertRaises(OSError):
+            executor.submit(fail)
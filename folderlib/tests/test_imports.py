@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).absolute().parents[2]
+
+# modules a cleaner run or a help page must not pay for
+HEAVY = ["numpy", "coloredlogs", "click_help_colors", "distutils", "setuptools", "asyncio"]
+
+# generous budget for the cumulative import time of folderlib.cli, well above a local run (~75ms), it only
+# catches a heavy import sneaking back in
+BUDGET_US = 400000
+
+
+def import_times(statement: str) -> dict:
+    """Cumulative import time in microseconds of every module imported by a statement in a fresh interpreter"""
+    environ = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), os.environ.get("PYTHONPATH", "")]))
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=environ,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    times = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestImportTime(unittest.TestCase):
+
+    def assertNotImported(self, times: dict, statement: str) -> None:
+        loaded = [name for name in times if name.split(".")[0] in HEAVY]
+        self.assertEqual(loaded, [], f"'{statement}' imports heavy modules")
+
+    def test_cli(self):
+        statement = "import folderlib.cli"
+        times = import_times(statement)
+        self.assertNotImported(times, statement)
+        self.assertNotIn("folderlib.workers.cleaner", times)
+        self.assertLess(times["folderlib.cli"], BUDGET_US)
+
+    def test_cleaner(self):
+        statement = "from folderlib.workers import Cleaner"
+        times = import_times(statement)
+        self.assertNotImported(times, statement)
+        self.assertNotIn("folderlib.workers.populator", times)
+
+    def test_help(self):
+        environ = dict(os.environ, PYTHONPATH=str(ROOT))
+        result = subprocess.run([sys.executable, "-m", "folderlib.cli", "cleaner", "--help"], env=environ,
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True)
+        self.assertIn("--workers", result.stdout)
@@ -0,0 +1,112 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.data import supported as supported_module
+from folderlib.utilities import config, index as index_module
+from folderlib.utilities.index import ExtensionIndex, SUPPORTED, EXCLUDED
+from folderlib.workers import Cleaner
+
+
+class TestExtensionIndex(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.index = ExtensionIndex(
+            supported={"compressed": ["gz", "tar.gz", "zip"], "image": ["PNG", "jpg"], "other": ["zip"]},
+            excluded={"binaries": ["exe"], "archives": ["zip"]},
+        )
+
+    def test_lookup(self):
+        self.assertEqual(self.index.lookup("photo.jpg"), (SUPPORTED, "image"))
+        self.assertEqual(self.index.lookup("setup.exe"), (EXCLUDED, "binaries"))
+        self.assertIsNone(self.index.lookup("notes.md"))
+        self.assertIsNone(self.index.lookup("Makefile"))
+
+    def test_case_normalised(self):
+        self.assertEqual(self.index.lookup("PHOTO.JpG"), (SUPPORTED, "image"))
+        self.assertEqual(self.index.lookup("photo.png"), (SUPPORTED, "image"))
+        self.assertIn(".Tar.GZ", self.index)
+
+    def test_longest_match(self):
+        self.assertEqual(self.index.max_parts, 2)
+        self.assertEqual(self.index.lookup("backup.tar.gz"), (SUPPORTED, "compressed"))
+        self.assertEqual(self.index.lookup("backup.gz"), (SUPPORTED, "compressed"))
+        self.assertEqual(list(self.index.suffixes("a.b.tar.gz")), ["tar.gz", "gz"])
+
+    def test_dotfiles_have_no_suffix(self):
+        self.assertEqual(list(self.index.suffixes(".png")), [])
+        self.assertIsNone(self.index.lookup(".png"))
+
+    def test_precedence(self):
+        # excluded pool always wins and the first supported category wins
+        self.assertEqual(self.index.lookup("a.zip"), (EXCLUDED, "archives"))
+        index = ExtensionIndex(supported={"compressed": ["zip"], "other": ["zip"]})
+        self.assertEqual(index.lookup("a.zip"), (SUPPORTED, "compressed"))
+
+
+class TestIndexSnapshot(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.file = self.root.joinpath(".fw_index")
+        self.pools = ({"image": ["png"]}, {"binaries": ["exe"]})
+        index_module._snapshots.clear()
+
+    def test_round_trip(self):
+        index = ExtensionIndex(*self.pools)
+        index_module.write_snapshot(self.file, "source", *self.pools, index)
+        index_module._snapshots.clear()
+        supported, excluded, loaded = index_module.read_snapshot(self.file, "source")
+        self.assertEqual((supported, excluded), self.pools)
+        self.assertEqual(loaded.fingerprint(), index.fingerprint())
+        self.assertEqual(loaded.lookup("a.png"), (SUPPORTED, "image"))
+        self.assertIsNone(index_module.read_snapshot(self.file, "other source"))
+        # data only, nothing in a snapshot is executed when it is loaded
+        header, payload = self.file.read_bytes().split(b"\n", 1)
+        self.assertEqual(json.loads(payload)["table"], {"png": ["supported", "image"], "exe": ["excluded", "binaries"]})
+
+    def test_corrupted(self):
+        index_module.write_snapshot(self.file, "source", *self.pools, ExtensionIndex(*self.pools))
+        index_module._snapshots.clear()
+        content = self.file.read_bytes()
+        self.file.write_bytes(content[:-1] + bytes([content[-1] ^ 1]))
+        self.assertIsNone(index_module.read_snapshot(self.file, "source"))
+        self.assertIsNone(index_module.read_snapshot(self.root.joinpath("missing"), "source"))
+
+    def test_workers_load_the_snapshot(self):
+        with config.cache_home(str(self.root)):
+            first = Cleaner(self.root, files_supported={"custom": ["abc"]})
+            self.assertTrue(first.cached_index.exists())
+            index_module._snapshots.clear()
+            config.clear_cache()
+            with mock.patch.object(ExtensionIndex, "_insert", side_effect=AssertionError("compiled")), \
+                    mock.patch.object(config, "load_json", side_effect=AssertionError("parsed")):
+                second = Cleaner(self.root)
+            self.assertEqual(second.index.lookup("a.abc"), (SUPPORTED, "custom"))
+            self.assertEqual(second.files_supported, first.files_supported)
+
+            # the JSON pools changed, the snapshot is rebuilt
+            config.write_json(first.cached_supported, {"custom": ["xyz"]})
+            third = Cleaner(self.root)
+            self.assertIsNone(third.index.lookup("a.abc"))
+            self.assertEqual(third.index.lookup("a.xyz"), (SUPPORTED, "custom"))
+
+    def test_default_pools_changed(self):
+        # an editable install changes the default pools without a new version
+        module = self.root.joinpath("supported.py")
+        module.write_text("FILES_SUPPORTED = {}")
+        with config.cache_home(str(self.root)), \
+                mock.patch.object(supported_module, "__file__", str(module)):
+            cleaner = Cleaner(self.root)
+            source = cleaner.config_source()
+            self.assertEqual(cleaner.config_source(), source)
+            module.write_text("FILES_SUPPORTED = {'custom': []}")
+            self.assertNotEqual(cleaner.config_source(), source)
+
+    def tearDown(self) -> None:
+        index_module._snapshots.clear()
+        config.clear_cache()
+        self.temp_dir.cleanup()
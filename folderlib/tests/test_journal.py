@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.exceptions import MissingJournal
+from folderlib.utilities import journal
+from folderlib.utilities.plan import Operation
+from folderlib.workers import Cleaner
+from folderlib.tests import CacheTestCase
+
+
+class TestJournal(CacheTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name).joinpath("folder")
+        self.root.mkdir()
+        self.files = sorted(f"file_{i}.{extension}" for i in range(10) for extension in ["mp3", "png", "exe"])
+        for name in self.files:
+            self.root.joinpath(name).write_text(name)
+
+    def listing(self):
+        return sorted(str(path.relative_to(self.root)) for path in self.root.rglob("*") if path.is_file())
+
+    def test_group_commit(self):
+        run = journal.Journal.create(Path(self.temp_dir.name, "journal"), self.root, self.root.joinpath("clean"),
+                                     group_size=4, interval=3600)
+        run.record_plan(Operation(f"/a/{i}", "audio", f"/b/{i}") for i in range(10))
+        with mock.patch("folderlib.utilities.journal.os.fsync") as fsync:
+            with run:
+                for operation in run.pending(resuming=False):
+                    run.mark(operation)
+        self.assertEqual(fsync.call_count, 3)
+        self.assertEqual(len(run.applied()), 10)
+        with run.folder.joinpath("done.log").open("a") as f:
+            f.write('"/a/torn')
+        self.assertEqual(len(run.applied()), 10)
+
+    def test_resume_and_undo(self):
+        cleaner = Cleaner(self.root, journal=True)
+        moved = list()
+
+        def crash(operation, same_device=True):
+            if len(moved) == 12:
+                raise KeyboardInterrupt()
+            moved.append(operation)
+            return original(operation, same_device)
+
+        original = cleaner.apply
+        with mock.patch.object(cleaner, "apply", side_effect=crash):
+            with self.assertRaises(KeyboardInterrupt):
+                cleaner()
+        run = journal.find_run(cleaner.journal_dir, path=self.root)
+        self.assertEqual((run.state, run.info["operations"], len(run.applied())), ("planned", 20, 12))
+
+        # the scan is not repeated: a file created since the crash is left alone
+        self.root.joinpath("late.mp3").touch()
+        self.assertEqual(Cleaner(self.root).resume(), 8)
+        self.assertEqual(len(os.listdir(self.root.joinpath("clean-folder", "audio"))), 10)
+        self.assertTrue(self.root.joinpath("late.mp3").exists())
+        with self.assertRaises(MissingJournal):
+            Cleaner(self.root).resume()
+
+        run = journal.find_run(cleaner.journal_dir, path=self.root)
+        self.assertEqual((run.state, run.info["moved"]), ("finished", 20))
+        self.assertEqual(journal.undo(run), (20, 0))
+        self.assertEqual(self.listing(), sorted(self.files + ["late.mp3"]))
+        self.assertEqual(journal.find_run(cleaner.journal_dir, path=self.root, states=["undone"]).run, run.run)
+
+    @unittest.skipUnless(os.name == "posix", "file names are bytes on POSIX only")
+    def test_names_not_utf8(self):
+        name = os.fsdecode(b"caf\xe9.mp3")
+        self.root.joinpath(name).write_text("song")
+        cleaner = Cleaner(self.root, journal=True)
+        self.assertEqual(cleaner(), 21)
+        self.assertTrue(self.root.joinpath("clean-folder", "audio", name).exists())
+        run = journal.find_run(cleaner.journal_dir, path=self.root)
+        self.assertIn(os.fspath(self.root.joinpath(name)), run.applied())
+        self.assertEqual(journal.undo(run), (21, 0))
+        self.assertEqual(self.listing(), sorted(self.files + [name]))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
@@ -0,0 +1,60 @@
+import logging
+import threading
+import unittest
+
+from folderlib.utilities.logging import EventLog, LazyQueueHandler, queued_logging
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages = list()
+        self.threads = set()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(self.format(record))
+        self.threads.add(threading.current_thread().name)
+
+
+class TestQueuedLogging(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.logger = logging.getLogger("folderlib.tests.logging")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.DEBUG)
+        self.handler = ListHandler()
+        self.handler.setLevel(logging.INFO)
+        self.logger.addHandler(self.handler)
+
+    def test_queued(self):
+        items = ["a"]
+        with queued_logging(self.logger):
+            self.assertNotIn(self.handler, self.logger.handlers)
+            self.logger.debug("dropped by the level of the handler")
+            self.logger.info("file %s moved", "x.mp3")
+            self.logger.info("items %s", items)
+            items.append("b")  # mutable arguments are formatted when the record is emitted
+        self.assertIn(self.handler, self.logger.handlers)
+        self.assertFalse(any(isinstance(handler, LazyQueueHandler) for handler in self.logger.handlers))
+        self.assertEqual(self.handler.messages, ["file x.mp3 moved", "items ['a']"])
+        self.assertNotIn(threading.current_thread().name, self.handler.threads)
+
+    def test_events(self):
+        events = EventLog(self.logger, "classify", every=4, sample=3, level=logging.INFO)
+        for key in ["audio", "audio", "image", "audio", "text"]:
+            events(key, "'%s' recognized", key)
+        events.flush()
+        self.assertEqual(self.handler.messages, [
+            "'image' recognized",
+            "classify: 4 files so far, last 4: audio 3, image 1",
+            "classify: 5 files so far, last 1: text 1",
+        ])
+
+        self.logger.setLevel(logging.WARNING)
+        quiet = EventLog(self.logger, "classify", every=1, level=logging.INFO)
+        quiet("audio", "'%s' recognized", "audio")
+        self.assertEqual(quiet.total, 0)
+
+    def tearDown(self) -> None:
+        self.logger.removeHandler(self.handler)
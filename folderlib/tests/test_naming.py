@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.utilities.naming import DestinationNames
+from folderlib.utilities.scanner import PathEntry
+
+
+class TestDestinationNames(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.directory = self.root.joinpath("audio")
+        self.directory.mkdir()
+        for name in ["song.mp3", "song_1.mp3", "old.mp3", "new.mp3"]:
+            self.directory.joinpath(name).touch()
+        for name in ["song.mp3", "old.mp3"]:
+            os.utime(self.directory.joinpath(name), ns=(0, 0))
+        self.source = self.root.joinpath("source")
+        self.source.mkdir()
+        for name in ["song.mp3", "old.mp3", "new.mp3", "other.mp3"]:
+            self.source.joinpath(name).touch()
+        os.utime(self.source.joinpath("new.mp3"), ns=(0, 0))
+
+    def resolve(self, names: DestinationNames, name: str):
+        destination = names.resolve(str(self.directory), name, PathEntry(self.source.joinpath(name)))
+        return None if destination is None else os.path.basename(destination)
+
+    def test_policies(self):
+        expected = {
+            "suffix": ["song_2.mp3", "song_3.mp3", "old_1.mp3", "new_1.mp3", "other.mp3", "other_1.mp3"],
+            "skip": [None, None, None, None, "other.mp3", None],
+            "overwrite-if-newer": ["song.mp3", "song_2.mp3", "old.mp3", None, "other.mp3", "other_1.mp3"],
+        }
+        for policy, names in expected.items():
+            with self.subTest(policy=policy):
+                resolver = DestinationNames(policy)
+                resolved = [self.resolve(resolver, name)
+                            for name in ["song.mp3", "song.mp3", "old.mp3", "new.mp3", "other.mp3", "other.mp3"]]
+                self.assertEqual(resolved, names)
+                self.assertEqual(len(resolver.taken), 1)
+
+        hashed = self.resolve(DestinationNames("hash"), "song.mp3")
+        self.assertRegex(hashed, r"^song_[0-9a-f]{8}\.mp3$")
+        self.assertEqual(hashed, self.resolve(DestinationNames("hash"), "song.mp3"))
+        with self.assertRaises(ValueError):
+            DestinationNames("rename")
+
+    def test_refresh(self):
+        resolver = DestinationNames("suffix")
+        self.assertEqual(self.resolve(resolver, "other.mp3"), "other.mp3")
+        # a new plan releases the names reserved by the previous one and reuses the listing of the folder
+        resolver.refresh()
+        with mock.patch("folderlib.utilities.naming.os.scandir", wraps=os.scandir) as scandir:
+            self.assertEqual(self.resolve(resolver, "other.mp3"), "other.mp3")
+        scandir.assert_not_called()
+
+        # the folder is listed again once its mtime changed
+        self.directory.joinpath("other.mp3").touch()
+        os.utime(self.directory, ns=(0, 0))
+        resolver.refresh()
+        with mock.patch("folderlib.utilities.naming.os.scandir", wraps=os.scandir) as scandir:
+            self.assertEqual(self.resolve(resolver, "other.mp3"), "other_1.mp3")
+        scandir.assert_called_once()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
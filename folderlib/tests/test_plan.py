@@ -0,0 +1,50 @@
+import io
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from folderlib.utilities.plan import Operation, read_plan, write_plan, batch_by_directory
+
+
+class TestPlan(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.operations = [
+            Operation("/in/b.mp3", "audio", "/out/audio/b.mp3"),
+            Operation("/in/a.txt", "text", "/out/text/a.txt"),
+            Operation("/in/a.mp3", "audio", "/out/audio/a.mp3"),
+        ]
+
+    def test_round_trip(self):
+        stream = io.StringIO()
+        self.assertEqual(write_plan(self.operations, stream), 3)
+        stream.seek(0)
+        self.assertEqual(list(read_plan(stream)), self.operations)
+
+        with tempfile.TemporaryDirectory() as d:
+            file = Path(d).joinpath("plan.jsonl")
+            write_plan(iter(self.operations), file)
+            self.assertEqual(list(read_plan(file)), self.operations)
+
+    @unittest.skipUnless(os.name == "posix", "file names are bytes on POSIX only")
+    def test_names_not_utf8(self):
+        with tempfile.TemporaryDirectory() as d:
+            root = Path(d)
+            name = os.fsdecode(b"caf\xe9.mp3")
+            root.joinpath(name).write_text("song")
+            operations = [Operation(str(root.joinpath(name)), "audio", str(root.joinpath("audio", name)))]
+            file = root.joinpath("plan.jsonl")
+            write_plan(operations, file)
+            self.assertEqual(list(read_plan(file)), operations)
+            self.assertTrue(os.path.exists(next(read_plan(file)).source))
+
+    def test_unknown_version(self):
+        with self.assertRaises(ValueError):
+            list(read_plan(io.StringIO('{"version": 0}\n')))
+
+    def test_batch_by_directory(self):
+        batches = list(batch_by_directory(self.operations))
+        self.assertEqual([[op.source for op in batch] for batch in batches],
+                         [["/in/a.mp3", "/in/b.mp3"], ["/in/a.txt"]])
+        self.assertEqual(len(list(batch_by_directory(self.operations, sort=False))), 3)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy
+
+from folderlib.workers import Populator
+from folderlib.utilities.sniffer import Sniffer
+from folderlib.utilities.sizes import SizeDistribution, parse_size
+from folderlib.tests import CacheTestCase
+
+
+class TestPopulator(CacheTestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name).joinpath("population")
+        self.pool = {"audio": ["mp3", "wav"], "image": ["png"]}
+
+    def test_parallel_generation(self):
+        for executor in ["thread", "process"]:
+            with self.subTest(executor=executor):
+                root = self.root.joinpath(executor)
+                populator = Populator(path=root, amount=25, supported_files=self.pool, workers=3,
+                                      executor=executor, shard_size=7)
+                populator()
+                self.assertEqual(populator.created, 50)
+                self.assertEqual(len(list(root.glob("audio_*"))), 25)
+                self.assertEqual(len(list(root.glob("image_*.png"))), 25)
+
+    def test_seeded_manifest(self):
+        first = Populator(path=self.root, amount=1000, supported_files=self.pool, size="lognormal:8:1", seed=42)
+        second = Populator(path=self.root, amount=1000, supported_files=self.pool, size="lognormal:8:1", seed=42,
+                           shard_size=64, workers=4)
+        names = list(first.file_names())
+        self.assertEqual(len(names), 2000)
+        self.assertEqual(names, list(second.file_names()))
+        self.assertTrue((first.manifest()["audio"].sizes == second.manifest()["audio"].sizes).all())
+
+        second()
+        self.assertEqual(sorted(names), sorted(os.listdir(self.root)))
+        other = Populator(path=self.root, amount=1000, supported_files=self.pool, seed=43)
+        self.assertNotEqual(names, list(other.file_names()))
+
+    def test_sized_content(self):
+        pool = {"image": ["png"], "text": ["pdf"]}
+        populator = Populator(path=self.root, amount=5, supported_files=pool, size="uniform:10:2k", content="header")
+        populator()
+        sniffer = Sniffer()
+        files = list(os.scandir(self.root))
+        self.assertEqual(sum(entry.stat().st_size for entry in files), populator.created_size)
+        for entry in files:
+            self.assertEqual(sniffer.sniff(entry), os.path.splitext(entry.name)[1][1:])
+        with self.assertRaises(ValueError):
+            Populator(path=self.root, amount=5, supported_files=pool, content="header")
+
+        sparse = self.root.joinpath("sparse")
+        Populator(path=sparse, amount=3, supported_files=pool, size="1M")()
+        self.assertTrue(all(entry.stat().st_size == 1024 ** 2 for entry in os.scandir(sparse)))
+
+    def test_nested_tree(self):
+        self.assertEqual(len(Populator(path=self.root, amount=1, supported_files=self.pool, depth=2,
+                                       fanout=3).folders()), 13)
+        for spread in ["even", "zipf", "hot"]:
+            with self.subTest(spread=spread):
+                root = self.root.joinpath(spread)
+                populator = Populator(path=root, amount=200, supported_files=self.pool, depth=2, fanout=2,
+                                      files_per_directory=spread, seed=7, workers=2, shard_size=50)
+                populator()
+                files = sorted(str(path.relative_to(root)) for path in root.rglob("*") if path.is_file())
+                self.assertEqual(files, sorted(populator.file_names()))
+                self.assertEqual(sum(1 for path in root.rglob("*") if path.is_dir()), 6)
+        with self.assertRaises(ValueError):
+            Populator(path=self.root, amount=1, supported_files=self.pool, files_per_directory="random")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+
+class TestSizeDistribution(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse_size("1.5k"), 1536)
+        self.assertEqual(parse_size("2MiB"), 2 * 1024 ** 2)
+        rng = numpy.random.default_rng(0)
+        self.assertEqual(SizeDistribution.parse("4k").sample_many(3, rng).tolist(), [4096] * 3)
+        uniform = SizeDistribution.parse("uniform:1k:2k").sample_many(100, rng)
+        self.assertTrue(((1024 <= uniform) & (uniform <= 2048)).all())
+        self.assertEqual(SizeDistribution.parse("lognormal:10:2").kind, "lognormal")
+        for spec in ["uniform:1k", "lots", "uniform:2k:1k"]:
+            with self.assertRaises(ValueError):
+                SizeDistribution.parse(spec)
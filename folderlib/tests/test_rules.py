@@ -0,0 +1,95 @@
+import json
+import os
+import pickle
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from folderlib.utilities.config import merge_pools
+from folderlib.utilities.index import ExtensionIndex
+from folderlib.utilities.rules import RuleSet, parse_age
+from folderlib.workers import Cleaner
+from folderlib.utilities.config import cache_home
+
+
+class FakeEntry(object):
+
+    def __init__(self, name: str, size: int = 0, age: float = 0, uid: int = 0) -> None:
+        self.name = name
+        self.stats = 0
+        self.result = os.stat_result((0o100644, 0, 0, 1, uid, 0, size, 0, time.time() - age, 0))
+
+    def stat(self) -> os.stat_result:
+        self.stats += 1
+        return self.result
+
+
+class TestRuleSet(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.rules = RuleSet(
+            supported=[
+                {"category": "screenshots", "glob": "screenshot*.png"},
+                {"category": "recent-camera", "regex": r"^(IMG|DSC)_\d+", "max_age": "30d"},
+                {"category": "camera", "regex": r"^(IMG|DSC)_\d+"},
+                {"category": "large", "min_size": "1M", "owner": 1000},
+            ],
+            excluded=[{"glob": "*.part"}],
+        )
+
+    def test_match(self):
+        self.assertEqual(self.rules.match(FakeEntry("Screenshot 1.PNG")), (False, "screenshots"))
+        self.assertEqual(self.rules.match(FakeEntry("img_0001.jpg", age=3600)), (False, "recent-camera"))
+        self.assertEqual(self.rules.match(FakeEntry("DSC_0001.jpg", age=parse_age("1y"))), (False, "camera"))
+        self.assertEqual(self.rules.match(FakeEntry("movie.mkv", size=2 ** 30, uid=1000)), (False, "large"))
+        self.assertIsNone(self.rules.match(FakeEntry("movie.mkv", size=2 ** 30, uid=0)))
+        self.assertEqual(self.rules.match(FakeEntry("IMG_1.jpg.part")), (True, "rules"))
+
+    def test_stat_once(self):
+        entry = FakeEntry("notes.txt")
+        self.rules.match(entry)
+        self.assertEqual(entry.stats, 1)
+        entry = FakeEntry("screenshot.png")
+        self.rules.match(entry)
+        self.assertEqual(entry.stats, 0)
+
+    def test_invalid(self):
+        for rule in [{"glob": "*.png"}, {"category": "a", "size": 1}, {"category": "a", "regex": "("},
+                     {"category": "a", "min_age": "soon"}]:
+            with self.subTest(rule=rule), self.assertRaises(Exception):
+                RuleSet(supported=[rule])
+
+    def test_index(self):
+        index = ExtensionIndex(supported={"image": ["png"], "rules": [{"category": "shots", "glob": "shot*"}]})
+        self.assertEqual(len(index.rules), 1)
+        self.assertEqual(index.lookup("shot.png"), ("supported", "image"))
+        restored = pickle.loads(pickle.dumps(index.rules))
+        self.assertEqual(restored.match(FakeEntry("shot.png")), (False, "shots"))
+        self.assertNotEqual(index.fingerprint(), ExtensionIndex(supported={"image": ["png"]}).fingerprint())
+
+        rule = {"category": "shots", "glob": "shot*"}
+        merged, changed = merge_pools({"rules": [rule]}, {"rules": [dict(rule), {"category": "b", "glob": "b*"}]})
+        self.assertTrue(changed)
+        self.assertEqual(len(merged["rules"]), 2)
+
+
+class TestCleanerRules(unittest.TestCase):
+
+    def test_rules_from_pool(self):
+        with tempfile.TemporaryDirectory() as d, cache_home(d):
+            root = Path(d, "folder")
+            root.mkdir()
+            for name in ["Screenshot 1.png", "photo.png", "huge.bin", "setup.exe"]:
+                root.joinpath(name).write_bytes(b"x" * (2048 if name == "huge.bin" else 1))
+            pool = Path(d, "pool.json")
+            pool.write_text(json.dumps({"image": ["png"], "rules": [
+                {"category": "screenshots", "glob": "Screenshot*"},
+                {"category": "large", "min_size": "1k"},
+            ]}))
+            cleaner = Cleaner(root, files_supported=str(pool))
+            self.assertEqual(sorted((os.path.basename(operation.source), operation.category)
+                                    for operation in cleaner.plan()),
+                             [("Screenshot 1.png", "screenshots"), ("huge.bin", "large"), ("photo.png", "image")])
+            # the rules were merged into the cache file and are loaded back from the snapshot
+            self.assertEqual(len(Cleaner(root).index.rules), 2)
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from folderlib.utilities.scanner import scan_tree
+
+
+class TestScanTree(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        for relative in ["a.txt", "sub/b.txt", "sub/deep/c.txt", "skip/d.txt"]:
+            file = self.root.joinpath(relative)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.touch()
+
+    def names(self, **kwargs):
+        return sorted(entry.name for entry in scan_tree(self.root, **kwargs))
+
+    def test_depth_limits(self):
+        self.assertEqual(self.names(), ["a.txt"])
+        self.assertEqual(self.names(max_depth=1), ["a.txt", "b.txt", "d.txt"])
+        self.assertEqual(self.names(max_depth=None), ["a.txt", "b.txt", "c.txt", "d.txt"])
+
+    def test_exclude(self):
+        self.assertEqual(self.names(max_depth=None, exclude=[self.root / "skip"]), ["a.txt", "b.txt", "c.txt"])
+
+    def test_is_streaming(self):
+        iterator = scan_tree(self.root, max_depth=None)
+        self.assertIsInstance(next(iterator), os.DirEntry)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "symlinks are not supported")
+    def test_symlink_loops(self):
+        os.symlink(self.root, self.root.joinpath("sub", "loop"))
+        self.assertEqual(self.names(max_depth=None), ["a.txt", "b.txt", "c.txt", "d.txt"])
+        self.assertEqual(self.names(max_depth=None, follow_symlinks=True), ["a.txt", "b.txt", "c.txt", "d.txt"])
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.utilities.scanner import PathEntry
+from folderlib.utilities.seen import SeenFiles
+from folderlib.workers import Cleaner
+from folderlib.utilities.config import cache_home
+
+
+class TestSeenFiles(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.root.joinpath("a.unk").write_text("a")
+        self.index_file = self.root.joinpath("cache", "seen")
+
+    def entry(self, name: str) -> os.DirEntry:
+        return next(entry for entry in os.scandir(self.root) if entry.name == name)
+
+    def test_round_trip_and_pruning(self):
+        seen = SeenFiles(self.index_file, fingerprint="config")
+        key = seen.key(self.entry("a.unk"))
+        self.assertNotIn(key, seen)
+        seen.add(key)
+        seen.save()
+
+        seen = SeenFiles(self.index_file, fingerprint="config")
+        self.assertIn(key, seen)
+        seen.save()  # the key was not found again during this run
+        self.assertNotIn(key, SeenFiles(self.index_file, fingerprint="config"))
+
+    def test_changes_invalidate(self):
+        seen = SeenFiles(self.index_file, fingerprint="config")
+        key = seen.key(self.entry("a.unk"))
+        seen.add(key)
+        seen.save()
+        self.assertNotIn(key, SeenFiles(self.index_file, fingerprint="other config"))
+
+        self.root.joinpath("a.unk").write_text("changed size")
+        self.assertNotEqual(seen.key(self.entry("a.unk")), key)
+
+    def test_stable_keys(self):
+        # the keys are stored on disk, they must not depend on the interpreter or the process
+        stat = mock.Mock(st_ino=12345, st_size=678, st_mtime_ns=1700000000123456789, st_ctime_ns=-1)
+        entry = mock.Mock(**{"stat.return_value": stat})
+        self.assertEqual(SeenFiles.key(entry), 8485603398420926682)
+
+    def test_partial_save_keeps_keys(self):
+        seen = SeenFiles(self.index_file, fingerprint="config")
+        seen.add(1)
+        seen.save()
+        seen = SeenFiles(self.index_file, fingerprint="config")
+        seen.add(2)
+        seen.save(complete=False)
+        self.assertEqual(SeenFiles(self.index_file, fingerprint="config").previous, {1, 2})
+
+    def test_incremental_cleaner(self):
+        folder = self.root.joinpath("folder")
+        folder.mkdir()
+        folder.joinpath("foo.zzqq").write_text("foo")
+        folder.joinpath("bar.zzqq").write_text("bar")
+        with cache_home(str(self.root.joinpath("cache"))):
+            cleaner = Cleaner(folder, incremental=True)
+            self.assertEqual(list(cleaner.plan()), [])
+            self.assertEqual(len(cleaner.seen.previous), 2)
+
+            # a renamed file is classified again, the other one is skipped
+            folder.joinpath("foo.zzqq").rename(folder.joinpath("foo.png"))
+            cleaner = Cleaner(folder, incremental=True)
+            with mock.patch.object(cleaner, "classify", wraps=cleaner.classify) as classify:
+                self.assertEqual([os.path.basename(operation.source) for operation in cleaner.plan()], ["foo.png"])
+            self.assertEqual(classify.call_count, 1)
+
+            # a batch of some files (like the watch mode) does not forget the others
+            folder.joinpath("baz.zzqq").write_text("baz")
+            cleaner = Cleaner(folder, incremental=True)
+            self.assertEqual(list(cleaner.plan(entries=[PathEntry(folder.joinpath("baz.zzqq"))])), [])
+            self.assertEqual(len(Cleaner(folder, incremental=True).seen.previous), 2)
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
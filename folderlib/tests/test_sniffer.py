@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from folderlib.utilities.sniffer import Sniffer
+from folderlib.workers import Cleaner
+from folderlib.utilities.config import cache_home
+
+
+class TestSniffer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.sniffer = Sniffer()
+
+    def write(self, name: str, content: bytes) -> os.DirEntry:
+        self.root.joinpath(name).write_bytes(content)
+        return next(entry for entry in os.scandir(self.root) if entry.name == name)
+
+    def test_match(self):
+        self.assertEqual(self.sniffer.match(b"\x89PNG\r\n\x1a\n...."), "png")
+        self.assertEqual(self.sniffer.match(b"RIFF\x00\x00\x00\x00WAVEfmt "), "wav")
+        odt = b"PK\x03\x04" + b"\x00" * 26 + b"mimetypeapplication/vnd.oasis.opendocument.text"
+        self.assertEqual(self.sniffer.match(odt), "odt")
+        self.assertEqual(self.sniffer.match(b"PK\x03\x04" + b"\x00" * 26), "zip")
+        self.assertEqual(self.sniffer.match(b"\x00" * 257 + b"ustar\x0000"), "tar")
+        self.assertIsNone(self.sniffer.match(b"just some text"))
+
+    def test_sniff_is_cached(self):
+        entry = self.write("picture", b"GIF89a....")
+        self.assertEqual(self.sniffer.sniff(entry), "gif")
+        self.sniffer.read_header = None  # a second read would fail
+        self.assertEqual(self.sniffer.sniff(entry), "gif")
+
+    def test_sniff_many_keeps_order(self):
+        entries = [self.write(f"file{n}", b"%PDF-1.7" if n % 2 else b"text") for n in range(20)]
+        results = list(self.sniffer.sniff_many(entries, workers=4, chunk_size=3, predicate=lambda e: e.name != "file1"))
+        self.assertEqual([entry.name for entry, _ in results], [entry.name for entry in entries])
+        self.assertEqual([content_type for _, content_type in results][:4], [None, None, None, "pdf"])
+
+    def test_refines(self):
+        self.assertTrue(self.sniffer.refines("zip", "report.DOCX"))
+        self.assertFalse(self.sniffer.refines("zip", "photo.jpg"))
+
+    def test_overrides(self):
+        self.assertTrue(self.sniffer.overrides("png", "photo.txt"))
+        self.assertTrue(self.sniffer.overrides("bmp", "photo"))
+        self.assertFalse(self.sniffer.overrides("bmp", "notes.txt"))
+        self.assertFalse(self.sniffer.overrides("zip", "report.docx"))
+
+    def test_cleaner_sniff(self):
+        files = {
+            "notes.txt": b"BMW service notes",
+            "plan.txt": b"MZ-2024 itinerary",
+            "photo.txt": b"\x89PNG\r\n\x1a\n" + b"\x00" * 16,
+            "scan": b"BM" + b"\x00" * 16,
+            "song.unknown": b"ID3" + b"\x00" * 16,
+        }
+        for name, content in files.items():
+            self.root.joinpath(name).write_bytes(content)
+        with cache_home(str(self.root.joinpath("cache"))):
+            cleaner = Cleaner(self.root, sniff=True)
+            categories = {os.path.basename(operation.source): operation.category for operation in cleaner.plan()}
+        self.assertEqual(categories, {"notes.txt": "text", "plan.txt": "text", "photo.txt": "image",
+                                      "scan": "image", "song.unknown": "audio"})
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from folderlib.utilities.stats import WorkerStats
+from folderlib.workers import Cleaner, Populator
+from folderlib.utilities.config import cache_home
+
+
+class TestWorkerStats(unittest.TestCase):
+
+    def test_phases(self):
+        stats = WorkerStats(worker="test", max_samples=10)
+        for latency in range(1, 101):
+            stats.record("move", latency / 1000, size=10)
+        self.assertEqual(list(stats.timed("scan", "abc")), ["a", "b", "c"])
+        with self.assertRaises(KeyError):
+            with stats.timer("classify"):
+                raise KeyError("boom")
+
+        result = stats.as_dict()
+        self.assertEqual(list(result), ["scan", "classify", "move"])
+        self.assertEqual(result["move"]["count"], 100)
+        self.assertEqual(result["move"]["bytes"], 1000)
+        self.assertAlmostEqual(result["move"]["seconds"], 5.05)
+        self.assertLessEqual(result["move"]["p50"], result["move"]["p99"])
+        self.assertEqual(len(stats.phase("move").samples), 10)
+        self.assertEqual(result["classify"]["errors"], 1)
+        self.assertEqual(result["scan"]["count"], 3)
+
+    def test_prometheus(self):
+        stats = WorkerStats(worker="cleaner")
+        stats.record("move", 0.5, size=42)
+        with tempfile.TemporaryDirectory() as d:
+            file = Path(d).joinpath("textfile", "folderlib.prom")
+            stats.write_prometheus(file)
+            lines = file.read_text().splitlines()
+            self.assertEqual(os.listdir(file.parent), ["folderlib.prom"])
+        self.assertIn('folderlib_phase_duration_seconds{worker="cleaner",phase="move",quantile="0.99"} 0.500000000',
+                      lines)
+        self.assertIn('folderlib_phase_bytes_total{worker="cleaner",phase="move"} 42', lines)
+
+
+class TestWorkerRunStats(unittest.TestCase):
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as d, cache_home(d):
+            folder = Path(d, "folder")
+            populator = Populator(path=folder, amount=10, filters=["audio", "image"], size="1k", depth=1)
+            populator()
+            self.assertEqual(populator.stats.phase("create").count, 20)
+            self.assertEqual(populator.stats.phase("create").bytes, 20 * 1024)
+
+            cleaner = Cleaner(folder, max_depth=None)
+            cleaner()
+            phases = cleaner.stats.as_dict()
+            self.assertEqual(list(phases), ["config", "scan", "classify", "mkdir", "move"])
+            self.assertEqual(phases["scan"]["count"], 20)
+            self.assertEqual(phases["move"]["bytes"], 20 * 1024)
+            self.assertEqual(phases["mkdir"]["count"], 2)
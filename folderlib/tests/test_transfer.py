@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from folderlib.utilities import transfer
+from folderlib.exceptions import TransferVerificationError
+
+
+class TestTransfer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.source = self.root.joinpath("source.bin")
+        self.source.write_bytes(os.urandom(3 * 1024 * 1024 + 17))
+        self.data = self.source.read_bytes()
+
+    def test_same_device_rename(self):
+        self.assertTrue(transfer.is_same_device(self.root, self.source))
+        destination = transfer.move_file(self.source, self.root.joinpath("moved.bin"))
+        self.assertFalse(self.source.exists())
+        self.assertEqual(Path(destination).read_bytes(), self.data)
+
+    def test_move_across_devices(self):
+        destination = str(self.root.joinpath("copied.bin"))
+        copied = transfer.move_across_devices(str(self.source), destination, verify="checksum")
+        self.assertEqual(copied, len(self.data))
+        self.assertFalse(self.source.exists())
+        self.assertEqual(Path(destination).read_bytes(), self.data)
+        self.assertFalse(os.path.exists(destination + transfer.PARTIAL_SUFFIX))
+
+    def test_never_replaces_destination(self):
+        destination = self.root.joinpath("taken.bin")
+        destination.write_bytes(b"kept")
+        with self.assertRaises(FileExistsError):
+            transfer.move_file(self.source, destination)
+        with self.assertRaises(FileExistsError):
+            transfer.move_file(self.source, destination, same_device=False)
+        self.assertEqual(destination.read_bytes(), b"kept")
+        self.assertEqual(self.source.read_bytes(), self.data)
+        self.assertFalse(os.path.exists(str(destination) + transfer.PARTIAL_SUFFIX))
+
+        transfer.move_file(self.source, destination, same_device=False, replace=True)
+        self.assertEqual(destination.read_bytes(), self.data)
+
+    def test_failed_verification_keeps_source(self):
+        destination = str(self.root.joinpath("copied.bin"))
+        original = transfer.verify_copy
+
+        def corrupt(source, partial, mode):
+            with open(partial, "ab") as f:
+                f.write(b"x")
+            original(source, partial, mode)
+
+        transfer.verify_copy = corrupt
+        try:
+            with self.assertRaises(TransferVerificationError):
+                transfer.move_across_devices(str(self.source), destination, verify="size")
+        finally:
+            transfer.verify_copy = original
+        self.assertEqual(self.source.read_bytes(), self.data)
+        self.assertFalse(os.path.exists(destination))
+        self.assertFalse(os.path.exists(destination + transfer.PARTIAL_SUFFIX))
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
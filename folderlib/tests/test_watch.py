@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from folderlib.utilities import journal
+from folderlib.utilities.config import cache_home
+from folderlib.utilities.watch import InotifyWatcher, PollingWatcher, Watcher
+from folderlib.workers import Cleaner
+
+
+class WatcherMixin(object):
+
+    watcher_class = None
+
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.root.joinpath("skip").mkdir()
+        self.watcher = self.watcher_class(self.root, max_depth=1, exclude=[self.root / "skip"])
+
+    def test_reports_new_files(self):
+        self.assertEqual(self.watcher.poll(timeout=0.01), set())
+        self.root.joinpath("a.txt").write_text("a")
+        self.root.joinpath("skip", "b.txt").write_text("b")
+        self.root.joinpath("sub").mkdir()
+        self.root.joinpath("sub", "c.txt").write_text("c")
+        changed = self.watcher.poll(timeout=0.05) | self.watcher.poll(timeout=0.05)
+        self.assertEqual(changed, {str(self.root / "a.txt"), str(self.root / "sub" / "c.txt")})
+
+    def tearDown(self) -> None:
+        self.watcher.close()
+        self.temp_dir.cleanup()
+
+
+class TestPollingWatcher(WatcherMixin, unittest.TestCase):
+
+    watcher_class = PollingWatcher
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "inotify is only available on Linux")
+class TestInotifyWatcher(WatcherMixin, unittest.TestCase):
+
+    watcher_class = InotifyWatcher
+
+
+class TestCleanerWatch(unittest.TestCase):
+
+    def test_files_created_during_the_first_pass(self):
+        with tempfile.TemporaryDirectory() as d, cache_home(d):
+            root = Path(d, "folder")
+            root.mkdir()
+            root.joinpath("first.mp3").write_text("first")
+            cleaner = Cleaner(root, journal=True)
+            execute = cleaner.execute
+
+            def first_pass(operations, *args, **kwargs):
+                moved = execute(operations, *args, **kwargs)
+                # created after the scan of the first pass, before it returns
+                if not audio.joinpath("late.mp3").exists():
+                    root.joinpath("late.mp3").write_text("late")
+                return moved
+
+            stop = threading.Event()
+            audio = root.joinpath("clean-folder", "audio")
+            with mock.patch.object(cleaner, "execute", side_effect=first_pass):
+                thread = threading.Thread(target=cleaner.watch, kwargs={"interval": 0.05, "debounce": 0.02,
+                                                                        "polling": True, "stop": stop})
+                thread.start()
+                try:
+                    deadline = time.monotonic() + 10
+                    while not audio.joinpath("late.mp3").exists() and time.monotonic() < deadline:
+                        time.sleep(0.02)
+                finally:
+                    stop.set()
+                    thread.join()
+            self.assertEqual(sorted(os.listdir(audio)), ["first.mp3", "late.mp3"])
+            # the first pass and the batch of the late file are journaled runs of their own
+            runs = journal.list_runs(cleaner.journal_dir, path=root)
+            self.assertEqual(sorted(source for run in runs for source in run.applied()),
+                             [str(root.joinpath("first.mp3")), str(root.joinpath("late.mp3"))])
+            self.assertGreaterEqual(len(runs), 2)
+
+    def test_watcher_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Watcher(".")
@@ -1,5 +1,6 @@
 
 __all__ = [
+    "index",
     "logging",
     "typing"
 ]
@@ -0,0 +1,123 @@
+"""asyncio helpers used by the async API of the workers
+
+Filesystem calls block, so the async methods of the workers run them in a concurrent.futures executor and
+only await their results. By default every worker of the process shares one thread pool (get_executor), so
+cleaning many folders from one event loop does not need a thread per job: the concurrency of each job is
+bounded by its own limit instead.
+
+Both helpers apply backpressure (nothing is read or submitted ahead of what the consumer asked for, beyond
+the limit) and clean up on cancellation: tasks that did not start are cancelled, tasks already running in
+the executor are waited for, so no thread touches the filesystem on behalf of a job after it returned.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Thread pool shared by the async API of every worker of the process"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4),
+                                           thread_name_prefix="folderlib-aio")
+        return _executor
+
+
+async def _settle(futures: Iterable[Future]) -> None:
+    """Cancel the futures that did not start and wait for the running ones"""
+    futures = list(futures)
+    for future in futures:
+        future.cancel()
+    running = [asyncio.wrap_future(future) for future in futures if not future.done()]
+    if running:
+        await asyncio.wait(running)
+
+
+async def aiter_blocking(
+    iterator: Iterator[T],
+    executor: Optional[Executor] = None,
+    chunk_size: int = 256,
+) -> AsyncIterator[T]:
+    """Consume a blocking iterator (e.g. a directory scan) from the event loop, one chunk at a time
+
+    The next chunk is only read once the previous one was consumed. On cancellation or early exit the
+    iterator is closed, after the chunk being read (if any) is done.
+    """
+    executor = executor or get_executor()
+    reading: Optional[Future] = None
+    try:
+        while True:
+            reading = executor.submit(lambda: list(islice(iterator, chunk_size)))
+            chunk = await asyncio.wrap_future(reading)
+            reading = None
+            if not chunk:
+                return
+            for item in chunk:
+                yield item
+    finally:
+        if reading is not None:
+            await _settle([reading])
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+async def bounded_map(
+    func: Callable[[T], R],
+    items: Union[Iterable[T], AsyncIterator[T]],
+    limit: int = 1,
+    executor: Optional[Executor] = None,
+) -> AsyncIterator[Tuple[T, R]]:
+    """Run func on every item in an executor, with at most limit calls in flight
+
+    Results are yielded in completion order, as (item, result) tuples. The first exception raised by func
+    stops the map and is raised to the consumer.
+    """
+    executor = executor or get_executor()
+    limit = max(1, int(limit))
+    if hasattr(items, "__aiter__"):
+        source = items.__aiter__()
+    else:
+        async def iterate():
+            for item in items:
+                yield item
+        source = iterate()
+
+    pending: Dict[asyncio.Future, Tuple[T, Future]] = dict()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < limit:
+                try:
+                    item = await source.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                future = executor.submit(func, item)
+                pending[asyncio.wrap_future(future)] = (item, future)
+            if not pending:
+                return
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for wrapped in done:
+                item, _ = pending.pop(wrapped)
+                yield item, wrapped.result()
+    finally:
+        await _settle(future for _, future in pending.values())
+        for wrapped in pending:
+            if wrapped.done() and not wrapped.cancelled():
+                wrapped.exception()  # retrieved, so asyncio does not log it as never retrieved
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,152 @@
+"""Process-wide cache of the JSON configuration files (pools of supported and excluded files)
+
+Workers read their pools every time they are created. load_json keeps the parsed content of every file it
+read, keyed on the path and validated by (mtime, size, inode) of the file, so creating many workers in a
+long-lived process costs a single stat per file and the JSON is only parsed again when the file changed.
+
+write_json replaces a file atomically (temporary file in the same folder, then rename), so concurrent
+writers never leave a truncated file behind and readers see either the old or the new content. The other
+files of the cache directory (index snapshots, seen-files indexes, stats) are written the same way with
+atomic_write.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Tuple, Union
+
+from folderlib.exceptions import InvalidJsonFile, MissingJsonFile
+from folderlib.utilities.rules import RULES_KEY
+
+_cache: Dict[str, Tuple[Tuple[int, int, int], Any]] = dict()
+_lock = threading.Lock()
+
+
+def _stat_key(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def _copy(data: Any) -> Any:
+    """Copy the containers of a pool, so callers can change them without touching the cached data"""
+    if isinstance(data, dict):
+        return {key: list(value) if isinstance(value, (list, tuple)) else value for key, value in data.items()}
+    if isinstance(data, list):
+        return list(data)
+    return data
+
+
+def load_json(file: Union[str, Path]) -> Any:
+    """Read a JSON file, from the cache if it did not change since it was last read
+
+    :raises MissingJsonFile: if the file does not exist
+    :raises InvalidJsonFile: if the file is not valid JSON
+    """
+    path = os.fspath(Path(file).expanduser())
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise MissingJsonFile(path)
+
+    key = _stat_key(stat)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == key:
+        return _copy(cached[1])
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        raise MissingJsonFile(path)
+    except json.decoder.JSONDecodeError:
+        raise InvalidJsonFile(path)
+    with _lock:
+        _cache[path] = (key, data)
+    return _copy(data)
+
+
+def atomic_write(file: Union[str, Path], data: bytes, mode: int = 0o644) -> Path:
+    """Replace a file with new content, readers see either the old or the new file and never a partial one
+
+    :param data: the whole content of the file
+    :param mode: permission bits of the new file. Default: 0o644
+    :return: path of the file
+    """
+    file = Path(file).expanduser()
+    file.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=str(file.parent), prefix=f".{file.name}.")
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(data)
+        os.chmod(temporary, mode)
+        os.replace(temporary, str(file))
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+    return file
+
+
+def write_json(file: Union[str, Path], data: Any) -> None:
+    """Atomically replace a JSON file and remember its new content"""
+    file = atomic_write(file, json.dumps(obj=data, sort_keys=True, indent=4).encode("utf-8"))
+    path = os.fspath(file)
+    data = json.loads(json.dumps(data, sort_keys=True))  # what a later read of the file would return
+    with _lock:
+        _cache[path] = (_stat_key(os.stat(path)), data)
+
+
+def merge_pools(pool: Dict[str, Iterable[str]], update: Dict[str, Iterable[str]]) -> Tuple[Dict[str, list], bool]:
+    """Add the categories and file types of update to pool, keeping the order of both
+
+    :return: the merged pool and whether anything was added
+    """
+    merged = {category: list(types) for category, types in pool.items()}
+    changed = False
+    for category, types in update.items():
+        if category not in merged:
+            merged[category] = list(types)
+            changed = True
+            continue
+        if category == RULES_KEY:
+            # rules are objects, the same rule is only added once
+            for rule in types:
+                if rule not in merged[category]:
+                    merged[category].append(rule)
+                    changed = True
+            continue
+        known = set(merged[category])
+        for filetype in types:
+            if filetype not in known:
+                known.add(filetype)
+                merged[category].append(filetype)
+                changed = True
+    return merged, changed
+
+
+def clear_cache() -> None:
+    with _lock:
+        _cache.clear()
+
+
+@contextmanager
+def cache_home(directory: Union[str, Path]) -> Iterator[Path]:
+    """Point the cache directory of the workers created inside the block (pools, index snapshots, journals,
+    seen files) at another folder, e.g. a temporary one. Worker processes started inside it inherit it too.
+
+    It sets XDG_CACHE_HOME, so it has no effect where the cache directory does not follow the XDG layout
+    (macOS and Windows)
+    """
+    previous = os.environ.get("XDG_CACHE_HOME")
+    os.environ["XDG_CACHE_HOME"] = os.fspath(directory)
+    try:
+        yield Path(directory)
+    finally:
+        if previous is None:
+            os.environ.pop("XDG_CACHE_HOME", None)
+        else:
+            os.environ["XDG_CACHE_HOME"] = previous
@@ -0,0 +1,117 @@
+"""Duplicate file detection
+
+    Files are compared in three rounds, each one only looking at the files that still collide after the
+    previous one:
+
+        1. group by size, which costs nothing since the scan already has the stat results
+        2. hash the first HEAD_SIZE bytes of every file of a group
+        3. hash the whole content, streamed, of the files that share size and head hash
+
+    Hashing runs in a thread pool since it is dominated by I/O (hashlib releases the GIL for large buffers).
+    Hard links to the same inode are duplicates by definition and are never read.
+"""
+
+import hashlib
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+from folderlib.utilities.transfer import file_checksum
+
+HEAD_SIZE = 64 * 1024
+
+DUPLICATES_POLICIES = ["skip", "hardlink", "move"]
+
+
+def head_checksum(path: str, size: int = HEAD_SIZE) -> str:
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(size)).hexdigest()
+
+
+def _split(
+    groups: Iterable[List[os.DirEntry]],
+    key: Callable[[os.DirEntry], Hashable],
+    executor: Optional[ThreadPoolExecutor],
+) -> List[List[os.DirEntry]]:
+    """Split every group by key, computed in the pool, and keep the sub-groups with more than one file"""
+    groups = list(groups)
+    entries = [entry for group in groups for entry in group]
+    keys = list(executor.map(key, entries)) if executor is not None else [key(entry) for entry in entries]
+
+    result = list()
+    position = 0
+    for group in groups:
+        buckets: Dict[Hashable, List[os.DirEntry]] = defaultdict(list)
+        for entry in group:
+            buckets[keys[position]].append(entry)
+            position += 1
+        result.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return result
+
+
+def find_duplicates(entries: Iterable[os.DirEntry], workers: int = 4) -> List[List[os.DirEntry]]:
+    """Find groups of files with identical content
+
+    Empty files are ignored. In every group the original (the oldest file, then the first path) comes first.
+
+    :param entries: scanned files (os.DirEntry or PathEntry objects)
+    :param workers: amount of hashing threads
+    :return: list of groups of identical files
+    """
+    by_size: Dict[int, List[os.DirEntry]] = defaultdict(list)
+    for entry in entries:
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            continue
+        if size:
+            by_size[size].append(entry)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+    if not candidates:
+        return list()
+
+    duplicates = list()
+    groups = list()
+    for group in candidates:
+        # files that are the same inode are duplicates without reading them
+        by_inode: Dict[tuple, List[os.DirEntry]] = defaultdict(list)
+        for entry in group:
+            stat = entry.stat()
+            by_inode[(stat.st_dev, stat.st_ino)].append(entry)
+        duplicates.extend(linked for linked in by_inode.values() if len(linked) > 1)
+        if len(by_inode) > 1:
+            groups.append([linked[0] for linked in by_inode.values()])
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Dedup") if workers > 1 else None
+    try:
+        groups = _split(groups, key=lambda entry: head_checksum(entry.path), executor=executor)
+        small = [group for group in groups if group[0].stat().st_size <= HEAD_SIZE]
+        large = [group for group in groups if group[0].stat().st_size > HEAD_SIZE]
+        groups = small + _split(large, key=lambda entry: file_checksum(entry.path), executor=executor)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    duplicates = _merge_links(duplicates, groups)
+    for group in duplicates:
+        group.sort(key=lambda entry: (entry.stat().st_mtime_ns, entry.path))
+    return duplicates
+
+
+def _merge_links(linked: List[List[os.DirEntry]], groups: List[List[os.DirEntry]]) -> List[List[os.DirEntry]]:
+    """Attach the hard links that were set aside before hashing back to the group of their inode"""
+    by_inode = {}
+    for group in linked:
+        stat = group[0].stat()
+        by_inode[(stat.st_dev, stat.st_ino)] = group
+
+    merged = list()
+    for group in groups:
+        members = list()
+        for entry in group:
+            stat = entry.stat()
+            members.extend(by_inode.pop((stat.st_dev, stat.st_ino), [entry]))
+        merged.append(members)
+    merged.extend(by_inode.values())
+    return merged
@@ -0,0 +1,65 @@
+"""Bounded thread pool used by the workers for concurrent file operations
+
+    concurrent.futures.ThreadPoolExecutor accepts an unlimited amount of pending work, which means that a fast
+    producer (e.g. a directory scan) queues every task of a large folder in memory before the pool gets to
+    them. BoundedExecutor blocks the producer once max_pending tasks are in flight so the memory used stays
+    constant, and it stops accepting work after the first failure so errors surface as early as possible.
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+
+class BoundedExecutor(object):
+
+    def __init__(self, max_workers: int, max_pending: Optional[int] = None, name: str = "folderlib") -> None:
+        """
+        :param max_workers: amount of worker threads
+        :param max_pending: maximum amount of submitted tasks that are not finished yet. Default: 4 * max_workers
+        :param name: prefix of the worker thread names
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be a positive integer, not {max_workers}")
+        self.max_workers = max_workers
+        self.max_pending = max_pending if max_pending else 4 * max_workers
+        self.errors: List[BaseException] = list()
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._semaphore = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule fn(*args, **kwargs), blocking while max_pending tasks are in flight
+
+        If a previous task failed, its exception is raised instead of scheduling new work.
+        """
+        self.raise_errors()
+        self._semaphore.acquire()
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        future.add_done_callback(self._on_done)
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        self._semaphore.release()
+        if not future.cancelled() and future.exception() is not None:
+            with self._lock:
+                self.errors.append(future.exception())
+
+    def raise_errors(self) -> None:
+        """Raise the first exception raised by a task, if any"""
+        if self.errors:
+            raise self.errors[0]
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "BoundedExecutor":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown(wait=True)
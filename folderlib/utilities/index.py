@@ -0,0 +1,211 @@
+"""Extension index used by the workers to classify files
+
+    The supported and excluded pools ([SUP_EXC_TYPES]) map a category name to a list of extensions. Scanning
+    those lists for every file is linear in the size of the pools, so the workers compile them once into a
+    single hash table that maps every (lower-cased) extension to its kind and category.
+
+    Multi-part suffixes such as "tar.gz" are supported. A lookup tries the longest suffix of the file name
+    first, so "backup.tar.gz" matches "tar.gz" before "gz". The amount of work per lookup is bounded by the
+    number of parts of the longest extension found in the pools, not by the size of the pools.
+
+    Rules of the pools (see folderlib.utilities.rules) are compiled along with the extensions and kept by the
+    index as a RuleSet, consulted before the extension table.
+
+    Compiled indexes can be stored as snapshots (write_snapshot / read_snapshot) next to the JSON pools they
+    were built from, so short-lived processes load a ready-to-use index instead of parsing and compiling the
+    pools. A snapshot is a JSON header line (format version, source key, content hash) followed by the pools,
+    the table and the source of the rules as plain JSON. It is only used when its source key, which describes
+    the JSON files it was built from, matches the current one, and its payload matches the content hash. The
+    hash detects a damaged file, not a crafted one, which is why the payload is data only (no pickle): a
+    snapshot cannot do more than the JSON pools it stands for.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from folderlib.utilities.config import atomic_write
+from folderlib.utilities.rules import RuleSet, split_rules
+
+SUPPORTED = "supported"
+EXCLUDED = "excluded"
+
+SNAPSHOT_VERSION = 2
+
+MATCH_TYPE = Tuple[str, str]
+SNAPSHOT_TYPE = Tuple[Dict, Dict, "ExtensionIndex"]
+
+
+class ExtensionIndex(object):
+
+    __slots__ = ("table", "max_parts", "rules")
+
+    def __init__(self, supported: Optional[Dict] = None, excluded: Optional[Dict] = None) -> None:
+        self.table: Dict[str, MATCH_TYPE] = dict()
+        self.max_parts = 1
+
+        supported, supported_rules = split_rules(supported)
+        excluded, excluded_rules = split_rules(excluded)
+        self.rules: Optional[RuleSet] = None
+        if supported_rules or excluded_rules:
+            self.rules = RuleSet(supported=supported_rules, excluded=excluded_rules)
+
+        # excluded extensions are inserted first so they take precedence over supported ones,
+        # the same way the cleaner always checked the excluded pool before the supported pool
+        self._insert(excluded or {}, kind=EXCLUDED)
+        self._insert(supported or {}, kind=SUPPORTED)
+
+    def _insert(self, pool: Dict, kind: str) -> None:
+        for category, extensions in pool.items():
+            for extension in extensions:
+                key = self.normalize(extension)
+                if not key:
+                    continue
+                # first category wins, just like the ordered scan over the pool did
+                self.table.setdefault(key, (kind, category))
+                self.max_parts = max(self.max_parts, key.count(".") + 1)
+
+    @classmethod
+    def from_table(cls, table: Dict[str, MATCH_TYPE], max_parts: int,
+                   rules: Optional[RuleSet] = None) -> "ExtensionIndex":
+        """Rebuild an index from the table of another one, without compiling any pool"""
+        index = cls.__new__(cls)
+        index.table = table
+        index.max_parts = max_parts
+        index.rules = rules
+        return index
+
+    @staticmethod
+    def normalize(extension: str) -> str:
+        """Normalise an extension to the form used as a key e.g ".TAR.GZ" --> "tar.gz"
+
+        :param extension: extension with or without the leading '.'
+        :return: lower-cased extension without leading dots
+        """
+        return str(extension).strip().lstrip(".").lower()
+
+    def suffixes(self, name: str) -> Iterable[str]:
+        """Yield the candidate suffixes of a file name, longest first
+
+        A leading dot is not treated as an extension separator, so ".bashrc" has no suffix at all,
+        which matches the behaviour of pathlib.PurePath.suffix.
+
+        :param name: file name (not a path)
+        """
+        name = name.lower()
+        candidates = list()
+        position = len(name)
+        for _ in range(self.max_parts):
+            position = name.rfind(".", 0, position)
+            if position <= 0:
+                break
+            candidates.append(name[position + 1:])
+        return reversed(candidates)
+
+    def lookup(self, name: str) -> Optional[MATCH_TYPE]:
+        """Classify a file name
+
+        :param name: file name (not a path)
+        :return: (kind, category) tuple where kind is one of SUPPORTED or EXCLUDED, or None if unknown
+        """
+        table = self.table
+        for suffix in self.suffixes(name):
+            match = table.get(suffix)
+            if match is not None:
+                return match
+        return None
+
+    def lookup_extension(self, extension: str) -> Optional[MATCH_TYPE]:
+        """Classify a bare extension e.g. "png" or ".tar.gz"
+
+        :return: (kind, category) tuple where kind is one of SUPPORTED or EXCLUDED, or None if unknown
+        """
+        return self.table.get(self.normalize(extension))
+
+    def fingerprint(self) -> str:
+        """Stable hash of the index contents, two indexes that classify every name the same way share it"""
+        content = json.dumps(sorted(self.table.items()), separators=(",", ":"))
+        if self.rules is not None:
+            content += self.rules.fingerprint()
+        return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+    def __contains__(self, extension: str) -> bool:
+        return self.normalize(extension) in self.table
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __repr__(self) -> str:
+        rules = f", rules={len(self.rules)}" if self.rules is not None else ""
+        return f"{self.__class__.__name__}(extensions={len(self.table)}, max_parts={self.max_parts}{rules})"
+
+
+# snapshots already loaded by this process: path --> (source key, snapshot)
+_snapshots: Dict[str, Tuple[str, SNAPSHOT_TYPE]] = dict()
+_lock = threading.Lock()
+
+
+def _copy_pools(snapshot: SNAPSHOT_TYPE) -> SNAPSHOT_TYPE:
+    supported, excluded, index = snapshot
+    return ({category: list(types) for category, types in supported.items()},
+            {category: list(types) for category, types in excluded.items()},
+            index)
+
+
+def write_snapshot(file: Union[str, Path], source: str, supported: Dict, excluded: Dict,
+                   index: ExtensionIndex) -> None:
+    """Atomically store a compiled index and the pools it was built from
+
+    :param source: key of the configuration the index was built from, see read_snapshot
+    """
+    payload = json.dumps(
+        {"supported": supported, "excluded": excluded, "table": index.table, "max_parts": index.max_parts,
+         "rules": index.rules.source if index.rules is not None else None},
+        separators=(",", ":"),
+    ).encode("utf-8")
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "source": source,
+        "hash": hashlib.blake2b(payload, digest_size=16).hexdigest(),
+    }
+    file = atomic_write(file, json.dumps(header).encode("utf-8") + b"\n" + payload)
+    with _lock:
+        _snapshots[os.fspath(file)] = (source, _copy_pools((supported, excluded, index)))
+
+
+def read_snapshot(file: Union[str, Path], source: str) -> Optional[SNAPSHOT_TYPE]:
+    """Load a snapshot written by write_snapshot
+
+    :param source: key of the current configuration, e.g. built from the stat of the JSON pools
+    :return: (supported, excluded, index), or None if there is no snapshot, it was built from another
+             configuration or by another format version, or it is corrupted
+    """
+    path = os.fspath(Path(file).expanduser())
+    loaded = _snapshots.get(path)
+    if loaded is not None and loaded[0] == source:
+        return _copy_pools(loaded[1])
+
+    try:
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != SNAPSHOT_VERSION or header.get("source") != source:
+                return None
+            payload = f.read()
+    except (OSError, ValueError):
+        return None
+    if hashlib.blake2b(payload, digest_size=16).hexdigest() != header.get("hash"):
+        return None
+    try:
+        data = json.loads(payload)
+        table = {extension: tuple(match) for extension, match in data["table"].items()}
+        rules = RuleSet(**data["rules"]) if data["rules"] is not None else None
+        snapshot = (data["supported"], data["excluded"], ExtensionIndex.from_table(table, data["max_parts"], rules))
+    except Exception:
+        return None
+
+    with _lock:
+        _snapshots[path] = (source, snapshot)
+    return _copy_pools(snapshot)
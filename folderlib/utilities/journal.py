@@ -0,0 +1,293 @@
+"""Write-ahead journal of the moves of a Cleaner run
+
+    Every journaled run owns a folder in the cache directory holding:
+
+        run.json    the folder that was cleaned, the save_to folder, the amount of operations and the state of
+                    the run (planned, finished or undone)
+        plan.jsonl  the whole plan, written and fsynced before the first file is moved
+        done.log    the source of every applied operation, one JSON string per line
+
+    Applied operations are appended to done.log in groups: a group is written and fsynced once it holds
+    `group_size` operations or is `interval` seconds old, so the journal costs one fsync per group instead of
+    one per file. Losing the last group in a crash is harmless because a move can be checked on the
+    filesystem: an operation whose source is gone and whose destination exists was applied.
+
+    An interrupted run is resumed from its plan, without scanning the folder again, and a run can be undone by
+    moving the applied operations back in reverse order.
+"""
+
+import json
+import os
+import secrets
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from folderlib.utilities.config import atomic_write
+from folderlib.utilities.plan import Operation, read_plan, write_plan
+from folderlib.utilities.stats import WorkerStats
+from folderlib.utilities.transfer import move_file
+
+JOURNAL_VERSION = 1
+
+PLANNED = "planned"
+FINISHED = "finished"
+UNDONE = "undone"
+
+STATES = [PLANNED, FINISHED, UNDONE]
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Make the entries of a folder (e.g. a new file) durable, where the platform allows it"""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def _write_info(folder: Path, info: dict) -> None:
+    atomic_write(folder.joinpath("run.json"), json.dumps(info, sort_keys=True, indent=4).encode("utf-8"))
+
+
+class Journal(object):
+
+    def __init__(
+        self,
+        folder: Union[str, Path],
+        group_size: int = 1024,
+        interval: float = 1.0,
+        stats: Optional[WorkerStats] = None,
+    ) -> None:
+        """
+        :param folder: folder of the run, see create() for a new run
+        :param group_size: applied operations written with a single fsync
+        :param interval: seconds after which a group is written even if it is not full
+        :param stats: stats the commits are recorded in, as the 'journal' phase
+        :raises ValueError: if the folder does not hold a journal this version can read
+        """
+        self.folder = Path(folder)
+        self.group_size = max(1, int(group_size))
+        self.interval = interval
+        self.stats = stats
+        # plain reads, every run would otherwise add an entry to the process-wide cache of the JSON pools
+        with self.folder.joinpath("run.json").open("r", encoding="utf-8") as f:
+            self.info = json.load(f)
+        version = self.info.get("version") if isinstance(self.info, dict) else None
+        if version != JOURNAL_VERSION:
+            raise ValueError(f"Unsupported journal version --> {version}")
+
+        self.resumed = 0
+        self._pending: List[str] = list()
+        self._committed = time.monotonic()
+        self._lock = threading.Lock()
+        self._log = None
+
+    @classmethod
+    def create(cls, root: Union[str, Path], path: Union[str, Path], save_to: Union[str, Path],
+               **kwargs) -> "Journal":
+        """Start the journal of a new run in root, the journal folder of a cache directory"""
+        run = f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(3)}"
+        folder = Path(root).joinpath(run)
+        folder.mkdir(parents=True)
+        _write_info(folder, {
+            "version": JOURNAL_VERSION,
+            "run": run,
+            "path": os.path.abspath(path),
+            "save_to": os.path.abspath(save_to),
+            "created": time.time(),
+            "operations": 0,
+            "state": PLANNED,
+        })
+        return cls(folder, **kwargs)
+
+    @property
+    def run(self) -> str:
+        return self.info["run"]
+
+    @property
+    def state(self) -> str:
+        return self.info["state"]
+
+    def set_state(self, state: str, **info) -> None:
+        self.info.update(info, state=state)
+        _write_info(self.folder, self.info)
+
+    def record_plan(self, operations: Iterable[Operation]) -> int:
+        """Write the whole plan durably, before any of it is applied
+
+        :return: amount of operations in the plan
+        """
+        with self.folder.joinpath("plan.jsonl").open("w", encoding="utf-8") as f:
+            written = write_plan(operations, f)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_directory(self.folder)
+        self.set_state(PLANNED, operations=written)
+        return written
+
+    def operations(self) -> Iterator[Operation]:
+        return read_plan(self.folder.joinpath("plan.jsonl"))
+
+    def applied(self) -> Set[str]:
+        """Sources of the operations recorded as applied, a torn last line is ignored"""
+        applied = set()
+        try:
+            with self.folder.joinpath("done.log").open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        applied.add(json.loads(line))
+                    except ValueError:
+                        break
+        except FileNotFoundError:
+            pass
+        return applied
+
+    def pending(self, resuming: bool = True) -> Iterator[Operation]:
+        """Stream the operations of the plan that still have to be applied
+
+        When resuming, operations that are not recorded but were applied (their source is gone and their
+        destination exists) are recorded now and counted in `self.resumed`, operations whose source and
+        destination are both gone are dropped.
+
+        :param resuming: False for a run that did not start yet, every operation is pending without checks
+        """
+        self.resumed = 0
+        if not resuming:
+            yield from self.operations()
+            return
+        applied = self.applied()
+        for operation in self.operations():
+            if operation.source in applied:
+                self.resumed += 1
+            elif os.path.lexists(operation.source):
+                yield operation
+            elif os.path.lexists(operation.destination):
+                self.mark(operation)
+                self.resumed += 1
+
+    def mark(self, operation: Operation) -> None:
+        """Record an applied operation, the group is committed when it is full or old enough"""
+        with self._lock:
+            self._pending.append(operation.source)
+            if len(self._pending) >= self.group_size or time.monotonic() - self._committed >= self.interval:
+                self._commit()
+
+    def commit(self) -> None:
+        """Write and fsync the operations recorded since the last commit"""
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        self._committed = started = time.monotonic()
+        if not self._pending:
+            return
+        if self._log is None:
+            self._log = self.folder.joinpath("done.log").open("a", encoding="utf-8")
+        self._log.write("".join(json.dumps(source) + "\n" for source in self._pending))
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        if self.stats is not None:
+            self.stats.record("journal", time.monotonic() - started, count=len(self._pending))
+        self._pending = list()
+
+    def close(self) -> None:
+        self.commit()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def list_runs(root: Union[str, Path], path: Optional[Union[str, Path]] = None) -> List[Journal]:
+    """Journals found in root, oldest first
+
+    :param path: only the runs that cleaned this folder
+    """
+    runs = list()
+    try:
+        folders = [entry.path for entry in os.scandir(root) if entry.is_dir()]
+    except FileNotFoundError:
+        return runs
+    # run ids start with their creation time
+    for folder in sorted(folders):
+        try:
+            journal = Journal(folder)
+        except (OSError, ValueError):
+            continue
+        if path is None or journal.info["path"] == os.path.abspath(path):
+            runs.append(journal)
+    return runs
+
+
+def find_run(root: Union[str, Path], run: Optional[str] = None, path: Optional[Union[str, Path]] = None,
+             states: Iterable[str] = (PLANNED, FINISHED)) -> Optional[Journal]:
+    """The run with the given id, or the latest run in one of the states"""
+    states = set(states)
+    for journal in reversed(list_runs(root, path=path)):
+        if journal.run == run or (run is None and journal.state in states):
+            return journal
+    return None
+
+
+def prune(root: Union[str, Path], keep: int = 20) -> int:
+    """Remove the oldest runs that are finished or undone, keeping the latest `keep` of them
+
+    :return: amount of runs removed
+    """
+    closed = [journal for journal in list_runs(root) if journal.state in (FINISHED, UNDONE)]
+    removed = 0
+    for journal in closed[:max(0, len(closed) - keep)]:
+        shutil.rmtree(journal.folder, ignore_errors=True)
+        removed += 1
+    return removed
+
+
+def undo(journal: Journal) -> Tuple[int, int]:
+    """Move the files of a run back where they were, the last applied operation first
+
+    Files changed since the run are left alone: an operation is only undone if its destination still exists
+    and its source was not created again. Emptied destination folders are removed.
+
+    :return: amount of files moved back and amount of files that could not be
+    """
+    applied = journal.applied()
+    operations = [operation for operation in journal.operations()
+                  if operation.source in applied
+                  or (not os.path.lexists(operation.source) and os.path.lexists(operation.destination))]
+    restored = failed = 0
+    save_to = journal.info["save_to"]
+    directories = set()
+    for operation in reversed(operations):
+        if not os.path.lexists(operation.destination) or os.path.lexists(operation.source):
+            failed += 1
+            continue
+        os.makedirs(os.path.dirname(operation.source), exist_ok=True)
+        move_file(operation.destination, operation.source)
+        # date buckets of a layout are nested in their category folder, e.g. <category>/2024/05
+        directory = operation.directory
+        while directory not in directories and len(directory) > len(save_to) and directory.startswith(save_to):
+            directories.add(directory)
+            directory = os.path.dirname(directory)
+        restored += 1
+
+    # deepest folders first, then the save_to folder, only when they are empty
+    for directory in sorted(directories, key=len, reverse=True) + [save_to]:
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+    journal.set_state(UNDONE, restored=restored)
+    return restored, failed
@@ -1,13 +1,215 @@
 # Standard library imports
+import os
 import sys
 import logging
-import logging.handlers
 import datetime
-from typing import Union, Optional
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import IO, Iterable, Iterator, Union, Optional
 from pathlib import Path
 
-# Third party imports
-import coloredlogs
+LOG_FORMAT = "[%(asctime)s][%(name)s] %(levelname)s %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FIELD_STYLES = {
+    'asctime':   {'color': 'blue', 'bright': True},  # blue color
+    'levelname': {'color': 178, 'bold': True},  # gold color
+}
+LEVEL_STYLES = {
+    'debug':    {'color': 6},
+    'info':     {'color': 6},
+    'warning':  {'color': 'white'},
+    'error':    {'color': 'red'},
+    'critical': {'color': 'red', 'bold': True},
+}
+
+
+class LazyColoredFormatter(logging.Formatter):
+    """Formatter that imports coloredlogs on the first record it formats
+
+    Loggers are created when the modules are imported, while most runs (cron jobs, file event hooks) never
+    log anything above the logger level, so the import cost of coloredlogs is only paid when needed. Colors
+    are only used when the stream is a terminal that supports them.
+    """
+
+    def __init__(self, stream, fmt: str = LOG_FORMAT, datefmt: str = DATE_FORMAT) -> None:
+        super().__init__(fmt=fmt, datefmt=datefmt)
+        self.stream = stream
+        self.formatter: Optional[logging.Formatter] = None
+
+    def format(self, record: logging.LogRecord) -> str:
+        if self.formatter is None:
+            import coloredlogs
+            from humanfriendly.terminal import terminal_supports_colors
+
+            if terminal_supports_colors(self.stream):
+                self.formatter = coloredlogs.ColoredFormatter(
+                    fmt=self._fmt,
+                    datefmt=self.datefmt,
+                    field_styles=FIELD_STYLES,
+                    level_styles=LEVEL_STYLES,
+                )
+            else:
+                self.formatter = logging.Formatter(fmt=self._fmt, datefmt=self.datefmt)
+        return self.formatter.format(record)
+
+
+# arguments of a record that can be formatted later, by the listener thread, and still give the same message
+IMMUTABLE_ARGS = (str, int, float, bytes, bool, type(None), Path)
+
+
+class LazyQueueHandler(logging.Handler):
+    """Handler that only puts records on a queue, the handlers behind a QueueListener format and write them
+
+    Unlike logging.handlers.QueueHandler the message is not formatted when the record is emitted: records
+    whose arguments are immutable are queued as they are, so the caller pays neither for the formatting nor
+    for the I/O of the message. The listener thread does not survive a fork, so in a forked process (e.g.
+    a process pool) records go straight to the handlers instead.
+    """
+
+    def __init__(self, queue, handlers: Iterable[logging.Handler] = ()) -> None:
+        super().__init__()
+        self.queue = queue
+        self.handlers = list(handlers)
+        self.pid = os.getpid()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if os.getpid() != self.pid:
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+            return
+        try:
+            args = record.args
+            if args and not (isinstance(args, tuple) and all(isinstance(arg, IMMUTABLE_ARGS) for arg in args)):
+                # the arguments may change before the listener gets to them
+                record.msg = record.getMessage()
+                record.args = None
+            self.queue.put_nowait(record)
+        except Exception:
+            self.handleError(record)
+
+
+@contextmanager
+def queued_logging(*loggers: logging.Logger) -> Iterator[None]:
+    """Move the handlers of the loggers behind a queue for the duration of the block
+
+    Logging a message only queues the record, a listener thread formats it and writes it to the original
+    handlers (respecting their levels). Every queued message is written when the block exits.
+    """
+    import queue
+    from logging.handlers import QueueListener  # imports socket and pickle, only paid for by queued runs
+
+    # one queue and listener per logger, so the records of a logger only reach the handlers of that logger
+    moved = list()
+    try:
+        for logger in loggers:
+            handlers = list(logger.handlers)
+            if not handlers or any(isinstance(handler, LazyQueueHandler) for handler in handlers):
+                continue
+            records = queue.SimpleQueue()
+            listener = QueueListener(records, *handlers, respect_handler_level=True)
+            queue_handler = LazyQueueHandler(records, handlers)
+            listener.start()
+            for handler in handlers:
+                logger.removeHandler(handler)
+            logger.addHandler(queue_handler)
+            moved.append((logger, handlers, queue_handler, listener))
+        yield
+    finally:
+        for logger, handlers, queue_handler, listener in moved:
+            logger.removeHandler(queue_handler)
+            for handler in handlers:
+                logger.addHandler(handler)
+            listener.stop()
+
+
+@contextmanager
+def logging_to(stream: IO[str], *loggers: logging.Logger) -> Iterator[None]:
+    """Write the console messages of the loggers to another stream for the duration of the block
+
+    e.g. to stderr while the standard output carries a plan. File handlers are left alone.
+    """
+    redirected = list()
+    try:
+        for logger in loggers:
+            for handler in logger.handlers:
+                if not isinstance(handler, logging.StreamHandler) or isinstance(handler, logging.FileHandler):
+                    continue
+                formatter = handler.formatter
+                if isinstance(formatter, LazyColoredFormatter):
+                    # colors are decided again for the new stream
+                    redirected.append((handler, handler.stream, formatter, formatter.formatter))
+                    formatter.stream, formatter.formatter = stream, None
+                else:
+                    redirected.append((handler, handler.stream, None, None))
+                handler.setStream(stream)
+        yield
+    finally:
+        for handler, previous, formatter, colored in redirected:
+            handler.setStream(previous)
+            if formatter is not None:
+                formatter.stream, formatter.formatter = previous, colored
+
+
+class EventLog(object):
+    """Per-file events of a worker, aggregated into summary lines instead of one message per file
+
+    Every `every` events one line sums them up per key (e.g. per category), and every `sample`-th event is
+    also logged with its own message. Nothing is counted or formatted when the logger does not log the
+    level, so the hot path only pays for an attribute check.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        name: str,
+        every: int = 1000,
+        sample: int = 0,
+        level: int = logging.DEBUG,
+    ) -> None:
+        """
+        :param logger: logger the summaries and the sampled events are written to
+        :param name: name of the events in the summaries, e.g. 'classify'
+        :param every: events per summary line, 0 logs every event with its own message and no summary
+        :param sample: log one event out of sample with its own message as well, 0 for none
+        :param level: level of the messages
+        """
+        self.logger = logger
+        self.name = name
+        self.every = max(0, int(every))
+        self.sample = 1 if not self.every else max(0, int(sample))
+        self.level = level
+        self.enabled = logger.isEnabledFor(level)
+        self.total = 0
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, key: str, msg: Optional[str] = None, *args) -> None:
+        """Record an event, msg and args are only formatted if the event is logged on its own"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.total += 1
+            self.counts[key] += 1
+            detailed = self.sample and self.total % self.sample == 0
+            summary = self.every and self.total % self.every == 0
+        if detailed and msg is not None:
+            self.logger.log(self.level, msg, *args)
+        if summary:
+            self.flush()
+
+    def flush(self) -> None:
+        """Log the summary of the events since the previous one, if any"""
+        if not self.every:
+            return
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        if counts:
+            summary = ", ".join(f"{key} {count}" for key, count in sorted(counts.items()))
+            self.logger.log(self.level, "%s: %d files so far, last %d: %s", self.name, self.total,
+                            sum(counts.values()), summary)
 
 
 def init_logger_from_file(filepath: Union[str, Path]) -> None:
@@ -26,7 +228,7 @@ def get_console_logger(
     enable_colors: bool = True,
     terminator: Optional[str] = None,
     disable_stream: bool = False,
-    ) -> logging.Logger:
+) -> logging.Logger:
     """Utility function that creates a console logger
 
     :param level: logging level that the logger will use. Default: logging.INFO
@@ -38,26 +240,18 @@ def get_console_logger(
     """
 
     logger = logging.getLogger(__name__ if name is None else name)  # create basic logger object
-    log_format = "[%(asctime)s][%(name)s] %(levelname)s %(message)s"
+    log_format = LOG_FORMAT
     if enable_colors and not disable_stream:
-        # Auto setup the logger with coloredlogs package
-        coloredlogs.install(
-            logger=logger,
-            level=level,
-            fmt=log_format,
-            stream=sys.stdout,
-            field_styles={
-                'asctime':   {'color': 'blue', 'bright': True},  # blue color
-                'levelname': {'color': 178, 'bold': True},  # gold color
-                },
-            level_styles={
-                'debug':    {'color': 6},
-                'info':     {'color': 6},
-                'warning':  {'color': 'white'},
-                'error':    {'color': 'red'},
-                'critical': {'color': 'red', 'bold': True},
-                }
-            )
+        # Setup the logger with a coloredlogs formatter, the package is imported on the first message
+        for handler in list(logger.handlers):
+            if isinstance(handler.formatter, LazyColoredFormatter):
+                logger.removeHandler(handler)
+        stream_handler = logging.StreamHandler(stream=sys.stdout)
+        stream_handler.setFormatter(LazyColoredFormatter(stream=sys.stdout))
+        stream_handler.setLevel(level=level)
+
+        logger.setLevel(level=level)
+        logger.addHandler(stream_handler)
     else:
         # Manually setup a console handler for the logger
         stream_formatter = logging.Formatter(log_format)
@@ -82,7 +276,7 @@ def get_rotating_file_logger(
     log_file: str = None,
     log_file_size: int = 19 * 1024 * 1024,
     log_history_file_count: int = 5,
-    ):
+):
     """Utility function that creates a logger with a Rotating File Handler
 
     :param level: logging level that the logger will use. Default: logging.INFO
@@ -117,7 +311,10 @@ def get_rotating_file_logger(
             )
     )
 
-    log_file_handler = logging.handlers.RotatingFileHandler(
+    # imports socket and friends, only needed for file loggers
+    from logging.handlers import RotatingFileHandler
+
+    log_file_handler = RotatingFileHandler(
         filename=log_file,
         mode='a',
         maxBytes=log_file_size,
@@ -132,4 +329,3 @@ def get_rotating_file_logger(
     logger.addHandler(log_file_handler)
 
     return logger
-
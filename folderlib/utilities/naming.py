@@ -0,0 +1,146 @@
+"""Collision-free names in the destination folders of a plan
+
+    A file moved into a category folder that already holds a file of the same name would replace it, and so
+    would two files of a nested tree sharing a name. DestinationNames keeps, for every destination folder,
+    the set of names that are taken: the folder is listed with a single scandir the first time the plan uses
+    it and every planned name is added to the set, so conflicts are found without a syscall per file.
+    The listings are kept across plans (e.g. the batches of a watch) and a folder is listed again only when
+    its mtime changed, so a later plan costs a single stat per destination folder.
+
+    Conflicts are resolved with one of [COLLISION_POLICIES]:
+
+        suffix              file.mp3 becomes file_1.mp3, file_2.mp3, ... (the next free counter)
+        hash                file.mp3 becomes file_<8 hex digits of the hash of its source path>.mp3
+        skip                the file stays where it is
+        overwrite-if-newer  the file replaces the one in the folder if it was modified more recently, and
+                            stays where it is otherwise. Two files of the same plan never replace each other,
+                            the later one gets a suffix instead
+
+    Category folders can also be split into date buckets, e.g. <category>/2024/05, with one of [LAYOUTS] or
+    a strftime template, applied to the mtime or ctime of the file ([TIMESTAMPS]).
+"""
+
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Set, Tuple
+
+COLLISION_POLICIES = ["suffix", "hash", "skip", "overwrite-if-newer"]
+
+LAYOUTS = {"flat": None, "date": "%Y/%m"}
+TIMESTAMPS = ["mtime", "ctime"]
+
+
+def bucket_template(layout: Optional[str]) -> Optional[str]:
+    """strftime template of the buckets of a layout, None for flat category folders
+
+    :param layout: one of [LAYOUTS] or a strftime template of relative folders e.g. "%Y/%m/%d"
+    :raises ValueError: if the layout is neither
+    """
+    if not layout or layout in LAYOUTS:
+        return LAYOUTS.get(layout or "flat")
+    parts = layout.replace("\\", "/").split("/")
+    if "%" not in layout or layout.startswith("/") or ".." in parts:
+        raise ValueError(f"{layout} is not a layout. Try one of [{','.join(LAYOUTS)}] or a strftime template")
+    return "/".join(part for part in parts if part)
+
+
+def date_bucket(template: str, stat: os.stat_result, timestamp: str = "mtime") -> str:
+    """Relative bucket folder of a file, in local time
+
+    :param stat: stat of the file, e.g. the one cached by the DirEntry of the scan
+    :param timestamp: one of [TIMESTAMPS]
+    """
+    seconds = stat.st_mtime if timestamp == "mtime" else stat.st_ctime
+    return time.strftime(template, time.localtime(seconds)).replace("/", os.sep)
+
+
+class DestinationNames(object):
+
+    def __init__(self, policy: str = "suffix") -> None:
+        """
+        :param policy: how conflicts are resolved, one of [COLLISION_POLICIES]
+        :raises ValueError: for an unknown policy
+        """
+        if policy not in COLLISION_POLICIES:
+            raise ValueError(f"{policy} is not a collision policy. Try one of [{','.join(COLLISION_POLICIES)}]")
+        self.policy = policy
+        self.listings: Dict[str, Tuple[int, Set[str]]] = dict()
+        self.taken: Dict[str, Set[str]] = dict()
+        self.planned: Dict[str, Set[str]] = dict()
+        self.counters: Dict[Tuple[str, str], int] = dict()
+        self.conflicts = 0
+
+    def refresh(self) -> None:
+        """Start a new plan, the names reserved by the previous one are released"""
+        self.taken.clear()
+        self.planned.clear()
+        self.counters.clear()
+
+    def names(self, directory: str) -> Set[str]:
+        """Names taken in a folder, listed when the plan first uses it unless its mtime did not change"""
+        names = self.taken.get(directory)
+        if names is None:
+            try:
+                # stat before listing, a change made during the listing shows up as a new mtime next time
+                mtime = os.stat(directory).st_mtime_ns
+                listing = self.listings.get(directory)
+                if listing is None or listing[0] != mtime:
+                    with os.scandir(directory) as entries:
+                        listing = mtime, {entry.name for entry in entries}
+                    self.listings[directory] = listing
+                names = set(listing[1])
+            except (FileNotFoundError, NotADirectoryError):
+                self.listings.pop(directory, None)
+                names = set()
+            self.taken[directory] = names
+            self.planned[directory] = set()
+        return names
+
+    def resolve(self, directory: str, name: str, entry: Optional[os.DirEntry] = None) -> Optional[str]:
+        """Reserve a name for a file moved into a folder
+
+        :param directory: destination folder
+        :param name: name of the file
+        :param entry: the file (DirEntry or PathEntry), used by the hash and overwrite-if-newer policies
+        :return: the destination path, or None if the file has to stay where it is
+        """
+        names = self.names(directory)
+        if name not in names:
+            return self._take(directory, name)
+
+        self.conflicts += 1
+        if self.policy == "skip":
+            return None
+        if self.policy == "overwrite-if-newer" and name not in self.planned[directory]:
+            destination = os.path.join(directory, name)
+            try:
+                newer = entry.stat().st_mtime_ns > os.stat(destination).st_mtime_ns
+            except (AttributeError, OSError):
+                newer = False
+            if newer:
+                self.planned[directory].add(name)
+                return destination
+            return None
+
+        stem, extension = os.path.splitext(name)
+        if self.policy == "hash":
+            source = os.fspath(entry.path if entry is not None else name)
+            digest = hashlib.blake2b(source.encode("utf-8", "surrogateescape"), digest_size=4).hexdigest()
+            candidate = f"{stem}_{digest}{extension}"
+            if candidate not in names:
+                return self._take(directory, candidate)
+
+        # the counter of a name only grows, so finding the next free suffix is constant time on average
+        counter = self.counters.get((directory, name), 1)
+        candidate = f"{stem}_{counter}{extension}"
+        while candidate in names:
+            counter += 1
+            candidate = f"{stem}_{counter}{extension}"
+        self.counters[(directory, name)] = counter + 1
+        return self._take(directory, candidate)
+
+    def _take(self, directory: str, name: str) -> str:
+        self.taken[directory].add(name)
+        self.planned[directory].add(name)
+        return os.path.join(directory, name)
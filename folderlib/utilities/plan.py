@@ -0,0 +1,106 @@
+"""Move plans produced and applied by the Cleaner
+
+    A plan is a stream of Operation records (source, category, destination, action, target, size). The Cleaner
+    builds a plan without touching the filesystem (dry run) and applies it in a separate phase, so a plan can
+    be written to disk, reviewed, diffed and applied later, even by another process.
+
+    Plans are stored as JSON lines. The first line is a header with the format version and the field names,
+    every other line holds one operation as a JSON array in field order, which keeps large plans compact
+    while they remain readable and line-diffable.
+"""
+
+import io
+import json
+import os
+from itertools import groupby
+from typing import IO, Iterable, Iterator, List, NamedTuple, Union
+from pathlib import Path
+
+PLAN_VERSION = 1
+
+MOVE = "move"
+LINK = "link"
+
+ACTIONS = [MOVE, LINK]
+
+
+class Operation(NamedTuple):
+    """A single step of a plan
+
+    MOVE operations move source to destination. LINK operations replace source with a hard link at
+    destination to target, an identical file moved by another operation of the same plan, so they have to
+    run after the MOVE operations. size is the size of the source in bytes when it was planned.
+    """
+    source: str
+    category: str
+    destination: str
+    action: str = MOVE
+    target: str = ""
+    size: int = 0
+
+    @property
+    def directory(self) -> str:
+        """Folder that will contain the destination"""
+        return os.path.dirname(self.destination)
+
+
+def write_plan(operations: Iterable[Operation], file: Union[str, Path, IO[str]]) -> int:
+    """Write a plan as JSON lines
+
+    :param operations: the operations of the plan, they are consumed lazily
+    :param file: path of the plan file or an open text stream
+    :return: amount of operations written
+    """
+    if isinstance(file, io.TextIOBase):
+        return _write_plan(operations, file)
+    with Path(file).expanduser().open("w", encoding="utf-8") as f:
+        return _write_plan(operations, f)
+
+
+def _write_plan(operations: Iterable[Operation], stream: IO[str]) -> int:
+    header = {"version": PLAN_VERSION, "fields": list(Operation._fields)}
+    stream.write(json.dumps(header) + "\n")
+    written = 0
+    for operation in operations:
+        # names that are not valid UTF-8 (surrogate escapes) are written as \udcxx escapes and read back as they were
+        stream.write(json.dumps(list(operation)) + "\n")
+        written += 1
+    return written
+
+
+def read_plan(file: Union[str, Path, IO[str]]) -> Iterator[Operation]:
+    """Stream the operations of a plan written by write_plan
+
+    :raises ValueError: if the plan has an unknown version or action
+    """
+    if isinstance(file, io.TextIOBase):
+        yield from _read_plan(file)
+        return
+    with Path(file).expanduser().open("r", encoding="utf-8") as f:
+        yield from _read_plan(f)
+
+
+def _read_plan(stream: IO[str]) -> Iterator[Operation]:
+    header = json.loads(stream.readline() or "{}")
+    if header.get("version") != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version --> {header.get('version')}")
+    fields: List[str] = header["fields"]
+    for line in stream:
+        if not line.strip():
+            continue
+        operation = Operation(**dict(zip(fields, json.loads(line))))
+        if operation.action not in ACTIONS:
+            raise ValueError(f"Unknown plan action --> {operation.action}")
+        yield operation
+
+
+def batch_by_directory(operations: Iterable[Operation], sort: bool = True) -> Iterator[List[Operation]]:
+    """Group operations that share a destination folder
+
+    :param sort: sort the whole plan by destination first, so each folder produces exactly one batch.
+                 Without sorting only consecutive operations are grouped and the plan keeps streaming.
+    """
+    if sort:
+        operations = sorted(operations, key=lambda operation: (operation.directory, operation.source))
+    for _, batch in groupby(operations, key=lambda operation: operation.directory):
+        yield list(batch)
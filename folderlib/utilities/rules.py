@@ -0,0 +1,228 @@
+"""Classification rules beyond file extensions
+
+    The supported and excluded JSON pools may hold a "rules" list next to their categories. A rule matches
+    files by name and by stat attributes, and classifies them before the extension index is consulted:
+
+        {
+            "rules": [
+                {"category": "screenshots", "glob": "Screenshot*.png"},
+                {"category": "camera", "regex": "^(IMG|DSC)_\\\\d+", "max_age": "30d"},
+                {"category": "large", "min_size": "1G", "owner": "alice"}
+            ]
+        }
+
+    Name conditions: "glob" (on the file name) and "regex" (searched in the file name), both case-insensitive.
+    Stat conditions: "min_size"/"max_size" (e.g. "4k", "1.5G"), "min_age"/"max_age" (age of the last
+    modification, e.g. "90s", "12h", "30d", "2w", "1y") and "owner" (user name or uid). Every condition of a
+    rule must hold. Rules of the excluded pool keep the files they match in place.
+
+    Rules are compiled once: the name conditions of every rule become one alternation anchored at the start
+    of the name, so a single regex match finds the first rule whose name condition holds, and only that rule's
+    stat conditions are checked (on the cached stat of the scanned DirEntry). If they do not hold, the match
+    resumes from the next rule with the (cached) alternation of the remaining rules.
+"""
+
+import fnmatch
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from folderlib.utilities.sizes import parse_size
+
+RULES_KEY = "rules"
+
+NAME_CONDITIONS = ["glob", "regex"]
+STAT_CONDITIONS = ["min_size", "max_size", "min_age", "max_age", "owner"]
+RULE_FIELDS = ["category", "exclude"] + NAME_CONDITIONS + STAT_CONDITIONS
+
+_AGE_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400, "y": 365 * 86400}
+_AGE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([smhdwy]?)\s*$")
+
+
+def parse_age(value: Union[str, int, float]) -> float:
+    """Convert an age like "30d" or "12h" to seconds"""
+    if isinstance(value, (int, float)):
+        if value < 0:
+            raise ValueError(f"Ages cannot be negative --> '{value}'")
+        return float(value)
+    match = _AGE_PATTERN.match(str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid age --> '{value}'")
+    number, unit = match.groups()
+    return float(number) * _AGE_UNITS[unit]
+
+
+def split_rules(pool: Optional[Dict]) -> Tuple[Dict, List[Dict]]:
+    """Separate the rules of a JSON pool from its categories
+
+    :return: the pool without rules and the rules
+    """
+    if not pool or RULES_KEY not in pool:
+        return pool or dict(), list()
+    pool = dict(pool)
+    rules = pool.pop(RULES_KEY) or list()
+    if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+        raise ValueError(f"'{RULES_KEY}' must be a list of rule objects")
+    return pool, rules
+
+
+class Rule(NamedTuple):
+    """A compiled rule, sizes in bytes, ages in seconds and the owner as a uid"""
+    category: str
+    excluded: bool
+    pattern: str
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    min_age: Optional[float] = None
+    max_age: Optional[float] = None
+    owner: Optional[int] = None
+
+    @property
+    def uses_stat(self) -> bool:
+        return any(value is not None for value in self[3:])
+
+    def check_stat(self, stat: os.stat_result, now: float) -> bool:
+        if self.min_size is not None and stat.st_size < self.min_size:
+            return False
+        if self.max_size is not None and stat.st_size > self.max_size:
+            return False
+        if self.min_age is not None and now - stat.st_mtime < self.min_age:
+            return False
+        if self.max_age is not None and now - stat.st_mtime > self.max_age:
+            return False
+        if self.owner is not None and stat.st_uid != self.owner:
+            return False
+        return True
+
+
+def _owner_id(owner: Union[str, int]) -> int:
+    if isinstance(owner, int) or str(owner).isdigit():
+        return int(owner)
+    try:
+        import pwd
+    except ImportError:
+        raise ValueError(f"Owner names are not supported on this platform --> '{owner}'")
+    try:
+        return pwd.getpwnam(str(owner)).pw_uid
+    except KeyError:
+        raise ValueError(f"Unknown owner --> '{owner}'")
+
+
+def compile_rule(rule: Dict[str, Any], excluded: bool = False) -> Rule:
+    """Check a rule of a JSON pool and compile its conditions
+
+    :param excluded: the rule comes from the excluded pool
+    :raises ValueError: if the rule is not valid
+    """
+    unknown = [key for key in rule if key not in RULE_FIELDS]
+    if unknown:
+        raise ValueError(f"{','.join(unknown)} is not a rule field. Try one of [{','.join(RULE_FIELDS)}]")
+    excluded = excluded or bool(rule.get("exclude", False))
+    category = rule.get("category") or ("rules" if excluded else None)
+    if not category:
+        raise ValueError(f"Rule {json.dumps(rule)} needs a category")
+
+    patterns = list()
+    if rule.get("glob"):
+        patterns.append(fnmatch.translate(str(rule["glob"])))
+    if rule.get("regex"):
+        re.compile(rule["regex"])  # report the faulty expression itself
+        patterns.append(f".*?(?:{rule['regex']})")
+    # every condition must hold, so the name conditions are chained as lookaheads
+    pattern = "".join(f"(?={pattern})" for pattern in patterns)
+
+    return Rule(
+        category=str(category),
+        excluded=excluded,
+        pattern=pattern,
+        min_size=parse_size(rule["min_size"]) if rule.get("min_size") is not None else None,
+        max_size=parse_size(rule["max_size"]) if rule.get("max_size") is not None else None,
+        min_age=parse_age(rule["min_age"]) if rule.get("min_age") is not None else None,
+        max_age=parse_age(rule["max_age"]) if rule.get("max_age") is not None else None,
+        owner=_owner_id(rule["owner"]) if rule.get("owner") is not None else None,
+    )
+
+
+class RuleSet(object):
+
+    def __init__(self, supported: Sequence[Dict] = (), excluded: Sequence[Dict] = ()) -> None:
+        """
+        :param supported: rules of the supported pool, they move the files they match to their category
+        :param excluded: rules of the excluded pool, they keep the files they match in place. They take
+                         precedence over the supported rules, like excluded extensions do
+        :raises ValueError: if a rule is not valid
+        """
+        self.source = {"supported": list(supported), "excluded": list(excluded)}
+        self.rules: List[Rule] = [compile_rule(rule, excluded=True) for rule in excluded]
+        self.rules += [compile_rule(rule) for rule in supported]
+        self.uses_stat = any(rule.uses_stat for rule in self.rules)
+        self.uses_age = any(rule.min_age is not None or rule.max_age is not None for rule in self.rules)
+        self.matchers: Dict[int, Tuple[re.Pattern, Dict[int, int]]] = dict()
+        self.matcher(0)
+
+    def matcher(self, start: int) -> Tuple[re.Pattern, Dict[int, int]]:
+        """Single regex finding the first rule from the start-th one whose name conditions hold
+
+        Every rule is a capturing group of the alternation, mapped back to the rule by its group number.
+        The matchers of later starts are only compiled when a rule with stat conditions fails.
+        """
+        matcher = self.matchers.get(start)
+        if matcher is None:
+            alternatives = list()
+            groups: Dict[int, int] = dict()
+            group = 1
+            for position in range(start, len(self.rules)):
+                pattern = self.rules[position].pattern
+                alternatives.append(f"({pattern})")
+                groups[group] = position
+                group += 1 + re.compile(pattern).groups
+            matcher = (re.compile("|".join(alternatives), re.DOTALL | re.IGNORECASE), groups)
+            self.matchers[start] = matcher
+        return matcher
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def match(self, entry: os.DirEntry, now: Optional[float] = None) -> Optional[Tuple[bool, str]]:
+        """First rule matching a scanned file
+
+        :param entry: the file, its stat is only read when a rule with a matching name has stat conditions
+        :param now: reference time of the age conditions. Default: the current time
+        :return: (excluded, category) of the rule, or None if no rule matches
+        """
+        name = entry.name
+        start = 0
+        stat = None
+        while start < len(self.rules):
+            pattern, groups = self.matcher(start)
+            found = pattern.match(name)
+            if found is None:
+                return None
+            position = groups[found.lastindex]
+            rule = self.rules[position]
+            if not rule.uses_stat:
+                return rule.excluded, rule.category
+            if stat is None:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    return None
+            if rule.check_stat(stat, time.time() if now is None else now):
+                return rule.excluded, rule.category
+            start = position + 1
+        return None
+
+    def fingerprint(self) -> str:
+        return json.dumps(self.source, sort_keys=True, separators=(",", ":"))
+
+    def __getstate__(self) -> Dict:
+        # compiled once per process: a pickled rule set (e.g. sent to a process pool) only carries its source
+        return self.source
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__init__(supported=state["supported"], excluded=state["excluded"])
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}(rules={len(self.rules)})"
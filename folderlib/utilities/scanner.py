@@ -0,0 +1,117 @@
+"""Streaming directory scanner used by the workers
+
+    The scanner walks a directory tree with os.scandir and yields the os.DirEntry objects of the files it
+    finds, one at a time. DirEntry caches the file type (and on Windows the stat result) that the operating
+    system returned while reading the directory, so classifying an entry with is_file()/is_dir() does not
+    cost an extra system call on most platforms.
+
+    Only the directories that still have to be visited are kept in memory, never the list of files, so the
+    memory used does not grow with the amount of files in the tree and callers can start working on the first
+    file as soon as it is read.
+"""
+
+import os
+import stat
+from typing import Iterable, Iterator, Optional, Set, Tuple, Union
+from pathlib import Path
+
+
+def scan_tree(
+    path: Union[str, Path],
+    max_depth: Optional[int] = 0,
+    follow_symlinks: bool = False,
+    exclude: Optional[Iterable[Union[str, Path]]] = None,
+) -> Iterator[os.DirEntry]:
+    """Yield the files found under path
+
+    :param path: root directory of the scan
+    :param max_depth: how many levels of sub-directories to descend into. 0 only scans the root directory
+                      and None scans the whole tree. Default: 0
+    :param follow_symlinks: if True, symbolic links to directories are descended into. Directories that were
+                            already visited are never scanned twice, so symlink loops are safe. Symbolic links to
+                            files are always yielded, like pathlib.Path.is_file() does. Default: False
+    :param exclude: directories that must not be scanned e.g. the destination folder of the cleaner
+    :return: iterator of os.DirEntry objects for regular files
+    """
+    root = os.path.abspath(os.fspath(Path(path).expanduser()))
+    excluded = {os.path.abspath(os.fspath(Path(p).expanduser())) for p in exclude or ()}
+
+    visited: Set[Tuple[int, int]] = set()
+    if follow_symlinks:
+        root_stat = os.stat(root)
+        visited.add((root_stat.st_dev, root_stat.st_ino))
+
+    # depth-first walk with an explicit stack so deep trees don't hit the recursion limit
+    stack = [(root, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            iterator = os.scandir(directory)
+        except (PermissionError, FileNotFoundError, NotADirectoryError):
+            continue
+
+        with iterator:
+            for entry in iterator:
+                try:
+                    if entry.is_dir(follow_symlinks=follow_symlinks):
+                        if max_depth is not None and depth >= max_depth:
+                            continue
+                        if entry.path in excluded:
+                            continue
+                        if follow_symlinks:
+                            entry_stat = entry.stat()
+                            key = (entry_stat.st_dev, entry_stat.st_ino)
+                            if key in visited:
+                                continue
+                            visited.add(key)
+                        stack.append((entry.path, depth + 1))
+                    elif entry.is_file():
+                        yield entry
+                except OSError:
+                    # the entry vanished or cannot be inspected, nothing to do with it
+                    continue
+
+
+class PathEntry(object):
+    """Minimal os.DirEntry look-alike for a file known only by its path (e.g. reported by a watcher)
+
+    Like os.DirEntry, the stat result is cached after the first call.
+    """
+
+    __slots__ = ("path", "name", "_stat")
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = os.fspath(path)
+        self.name = os.path.basename(self.path)
+        self._stat: Optional[os.stat_result] = None
+
+    def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+        if not follow_symlinks:
+            return os.lstat(self.path)
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+        return self._stat
+
+    def inode(self) -> int:
+        return self.stat().st_ino
+
+    def is_file(self, follow_symlinks: bool = True) -> bool:
+        try:
+            return stat.S_ISREG(self.stat(follow_symlinks=follow_symlinks).st_mode)
+        except OSError:
+            return False
+
+    def is_dir(self, follow_symlinks: bool = True) -> bool:
+        try:
+            return stat.S_ISDIR(self.stat(follow_symlinks=follow_symlinks).st_mode)
+        except OSError:
+            return False
+
+    def is_symlink(self) -> bool:
+        return os.path.islink(self.path)
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__} '{self.name}'>"
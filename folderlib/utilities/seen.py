@@ -0,0 +1,92 @@
+"""Persistent index of the files a worker already decided to leave in place
+
+    Files that the cleaner does not move (excluded types and unknown files when they are not grouped) stay in
+    the cleaned folder, so without a memory of previous runs every run classifies them again. SeenFiles keeps
+    a compact set of keys built from (inode, size, mtime, ctime) of those files in the cache directory. A file
+    whose key is in the set was already decided by a previous run with the same configuration and is skipped.
+    The ctime is part of the key because a rename changes nothing else, and a renamed file (e.g. given a
+    known extension) has to be classified again.
+
+    Keys are 64-bit BLAKE2b digests of the packed stat fields, stable across interpreters and processes, stored
+    as a packed array, 8 bytes per file. The index is tied to a fingerprint of
+    the configuration that made the decisions and is discarded when the configuration changes. After a run over the
+    whole folder only the keys found again are written back, so files that disappeared are pruned
+    automatically. Runs over some of the files (e.g. a batch of the watch mode) add their keys to the index.
+"""
+
+import hashlib
+import json
+import os
+import struct
+from array import array
+from typing import Optional, Set, Union
+from pathlib import Path
+
+from folderlib.utilities.config import atomic_write
+
+SEEN_VERSION = 3
+
+_KEY_MASK = (1 << 64) - 1
+
+
+class SeenFiles(object):
+
+    def __init__(self, file: Union[str, Path], fingerprint: str = "") -> None:
+        """
+        :param file: path of the index file, it does not need to exist
+        :param fingerprint: identifies the configuration the recorded decisions were made with
+        """
+        self.file = Path(file)
+        self.fingerprint = fingerprint
+        self.previous: Set[int] = self.load()
+        self.current: Set[int] = set()
+
+    @staticmethod
+    def key(entry: os.DirEntry) -> int:
+        """Key of a scanned file. The stat result is cached by the DirEntry so later users do not stat it again"""
+        stat = entry.stat()
+        packed = struct.pack("<QQqq", stat.st_ino & _KEY_MASK, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+        return int.from_bytes(hashlib.blake2b(packed, digest_size=8).digest(), "little")
+
+    def load(self) -> Set[int]:
+        try:
+            with self.file.open("rb") as f:
+                header = json.loads(f.readline().decode("utf-8"))
+                if header.get("version") != SEEN_VERSION or header.get("fingerprint") != self.fingerprint:
+                    return set()
+                keys = array("Q")
+                keys.frombytes(f.read())
+        except (OSError, ValueError):
+            # a missing or damaged index only costs a full run
+            return set()
+        return set(keys)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.previous
+
+    def __len__(self) -> int:
+        return len(self.current)
+
+    def add(self, key: int) -> None:
+        """Record a file that stays in place, it is written back by the next save()"""
+        self.current.add(key)
+
+    def save(self, complete: bool = True) -> None:
+        """Atomically replace the index file with the keys recorded during this run
+
+        :param complete: the run scanned the whole folder, so the keys that were not found again belong to files
+                         that are gone and are dropped. Otherwise they are kept. Default: True
+        """
+        keys = self.current if complete else self.previous | self.current
+        header = {"version": SEEN_VERSION, "fingerprint": self.fingerprint, "count": len(keys)}
+        atomic_write(self.file, json.dumps(header).encode("utf-8") + b"\n" + array("Q", keys).tobytes())
+        self.previous = keys
+        self.current = set()
+
+    def clear(self) -> None:
+        self.previous = set()
+        self.current = set()
+        try:
+            self.file.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,91 @@
+"""File size distributions used by the Populator
+
+    A distribution can be given as a SizeDistribution object or as a string specification:
+
+        "4096", "4k", "1.5M"            fixed size, with optional k/M/G (binary) units
+        "uniform:<low>:<high>"          uniform size between low and high, both included
+        "lognormal:<mu>:<sigma>"        log-normal size, mu and sigma are the mean and standard deviation of
+                                        the natural logarithm of the size in bytes (e.g. "lognormal:10:2" has
+                                        a median of about 22 KiB)
+"""
+
+import math
+import re
+from typing import Optional, Union
+
+DISTRIBUTIONS = ["fixed", "uniform", "lognormal"]
+
+_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+_SIZE_PATTERN = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([kmgt]?)(?:i?b)?\s*$")
+
+
+def parse_size(value: Union[str, int, float]) -> int:
+    """Convert a size like "4k" or "1.5M" to an amount of bytes"""
+    if isinstance(value, (int, float)):
+        if value < 0:
+            raise ValueError(f"Sizes cannot be negative --> '{value}'")
+        return int(value)
+    match = _SIZE_PATTERN.match(str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid size --> '{value}'")
+    number, unit = match.groups()
+    return int(float(number) * _UNITS[unit])
+
+
+class SizeDistribution(object):
+
+    def __init__(self, kind: str = "fixed", first: float = 0, second: float = 0) -> None:
+        """
+        :param kind: one of [DISTRIBUTIONS]
+        :param first: the size for "fixed", the lower bound for "uniform" or mu for "lognormal"
+        :param second: the upper bound for "uniform" or sigma for "lognormal"
+        """
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f"{kind} is not a size distribution. Try one of [{','.join(DISTRIBUTIONS)}]")
+        if kind == "uniform" and first > second:
+            raise ValueError(f"Uniform sizes need low <= high --> {first} > {second}")
+        self.kind = kind
+        self.first = first
+        self.second = second
+
+    @classmethod
+    def parse(cls, spec: Union[str, int, "SizeDistribution", None]) -> Optional["SizeDistribution"]:
+        """Build a distribution from a specification (see the module documentation), None stays None"""
+        if spec is None or isinstance(spec, SizeDistribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", parse_size(spec))
+
+        kind, *arguments = str(spec).strip().split(":")
+        kind = kind.lower()
+        if kind not in DISTRIBUTIONS:
+            return cls("fixed", parse_size(spec))
+        if len(arguments) != (1 if kind == "fixed" else 2):
+            raise ValueError(f"Invalid size distribution --> '{spec}'")
+        if kind == "lognormal":
+            return cls(kind, float(arguments[0]), float(arguments[1]))
+        return cls(kind, *[parse_size(argument) for argument in arguments])
+
+    def sample_many(self, count: int, rng: "numpy.random.Generator") -> "numpy.ndarray":
+        """Draw count sizes in bytes at once from a numpy Generator
+
+        :return: int64 array of sizes
+        """
+        import numpy
+
+        if self.kind == "fixed":
+            return numpy.full(count, int(self.first), dtype=numpy.int64)
+        if self.kind == "uniform":
+            return rng.integers(int(self.first), int(self.second), size=count, endpoint=True, dtype=numpy.int64)
+        return rng.lognormal(self.first, self.second, size=count).astype(numpy.int64)
+
+    @property
+    def mean(self) -> float:
+        if self.kind == "fixed":
+            return float(self.first)
+        if self.kind == "uniform":
+            return (self.first + self.second) / 2
+        return math.exp(self.first + self.second ** 2 / 2)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.kind!r}, {self.first!r}, {self.second!r})"
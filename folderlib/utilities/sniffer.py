@@ -0,0 +1,149 @@
+"""Content sniffing for files without an extension or with a wrong one
+
+    The Sniffer reads only the first few hundred bytes of a file (with a single os.pread where available) and
+    matches them against the magic numbers of folderlib.data.magic. Results are cached per
+    (device, inode, mtime) so files that are seen again, e.g. by the watch mode, are not read twice, and
+    sniff_many() reads the headers of many files in parallel since the work is dominated by I/O latency.
+
+    Short magic numbers like "BM" or "MZ" also start plenty of text files, so they are only trusted for files
+    whose name says nothing. A file with a known extension is only reclassified by its content if every
+    signature of the sniffed type is at least STRONG_SIGNATURE_SIZE bytes long.
+"""
+
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from folderlib.data import magic
+from folderlib.utilities.stats import WorkerStats
+
+SIGNATURE_TYPE = Tuple[str, Tuple[Tuple[int, bytes], ...]]
+
+STRONG_SIGNATURE_SIZE = 4
+
+
+class Sniffer(object):
+
+    def __init__(
+        self,
+        signatures: Optional[Sequence[SIGNATURE_TYPE]] = None,
+        containers: Optional[Dict[str, List[str]]] = None,
+        cache_size: int = 100000,
+    ) -> None:
+        """
+        :param signatures: magic numbers to match. Default: folderlib.data.magic.signatures
+        :param containers: container formats and the extensions they contain. Default: folderlib.data.magic.containers
+        :param cache_size: maximum amount of cached results
+        """
+        self.signatures = list(magic.signatures if signatures is None else signatures)
+        self.containers = {
+            container: {extension.lower() for extension in extensions}
+            for container, extensions in (magic.containers if containers is None else containers).items()
+        }
+        weak = {extension for extension, parts in self.signatures
+                if sum(len(data) for _, data in parts) < STRONG_SIGNATURE_SIZE}
+        self.strong = {extension for extension, _ in self.signatures} - weak
+        self.header_size = max(offset + len(data) for _, parts in self.signatures for offset, data in parts)
+
+        self.cache_size = cache_size
+        self._cache: Dict[Tuple[int, int, int], Optional[str]] = dict()
+        self._lock = threading.Lock()
+
+    def match(self, header: bytes) -> Optional[str]:
+        """Return the extension of the first signature matching a file header"""
+        for extension, parts in self.signatures:
+            if all(header.startswith(data, offset) for offset, data in parts):
+                return extension
+        return None
+
+    def read_header(self, path: str) -> bytes:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            if hasattr(os, "pread"):
+                return os.pread(fd, self.header_size, 0)
+            return os.read(fd, self.header_size)
+        finally:
+            os.close(fd)
+
+    def sniff(self, entry: os.DirEntry) -> Optional[str]:
+        """Sniff the type of a scanned file
+
+        :return: the extension matching the content of the file, or None if it is not recognised
+        """
+        try:
+            stat = entry.stat()
+            key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+            if key in self._cache:
+                return self._cache[key]
+            extension = self.match(self.read_header(entry.path)) if stat.st_size else None
+        except OSError:
+            return None
+
+        with self._lock:
+            if len(self._cache) >= self.cache_size:
+                # drop the oldest result, dictionaries keep the insertion order
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = extension
+        return extension
+
+    def sniff_many(
+        self,
+        entries: Iterable[os.DirEntry],
+        workers: int = 4,
+        predicate: Optional[Callable[[os.DirEntry], bool]] = None,
+        chunk_size: int = 256,
+        stats: Optional[WorkerStats] = None,
+    ) -> Iterator[Tuple[os.DirEntry, Optional[str]]]:
+        """Sniff a stream of files in parallel, preserving their order
+
+        Files are consumed in chunks so the amount of entries held in memory stays bounded.
+
+        :param workers: amount of threads reading headers
+        :param predicate: only files for which it returns True are sniffed, the others get None
+        :param chunk_size: amount of files handed to the pool at once
+        :param stats: record every file sniffed as an operation of the "sniff" phase
+        """
+        def sniff(entry: os.DirEntry) -> Optional[str]:
+            if predicate is not None and not predicate(entry):
+                return None
+            if stats is None:
+                return self.sniff(entry)
+            with stats.timer("sniff"):
+                return self.sniff(entry)
+
+        iterator = iter(entries)
+        if workers <= 1:
+            for entry in iterator:
+                yield entry, sniff(entry)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Sniffer") as executor:
+            while True:
+                chunk = list(itertools.islice(iterator, chunk_size))
+                if not chunk:
+                    return
+                yield from zip(chunk, executor.map(sniff, chunk))
+
+    def refines(self, content_type: str, name: str) -> bool:
+        """Check if the extension of a file name is a specialisation of a sniffed container type
+
+        e.g. refines("zip", "report.docx") is True, so the file keeps the type given by its extension
+        """
+        extension = os.path.splitext(name)[1].lstrip(".").lower()
+        return extension in self.containers.get(content_type, ())
+
+    def overrides(self, content_type: str, name: str) -> bool:
+        """Check if a sniffed type is trusted over the extension of a file name
+
+        e.g. overrides("png", "photo.txt") is True but overrides("bmp", "notes.txt") is False, since a text
+        can start with "BM"
+        """
+        if not os.path.splitext(name)[1]:
+            return True
+        return content_type in self.strong and not self.refines(content_type, name)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -0,0 +1,221 @@
+"""Per-phase timings and counters of the workers
+
+Every worker owns a WorkerStats object that records, for each phase of a run (config, scan, classify,
+mkdir, move, ...), the amount of operations, the bytes they handled, the errors they raised, their total
+time and a sample of their latencies for the p50/p99 percentiles. Recording is thread safe since moves may
+run in a thread pool.
+
+Stats can be printed as a table (format_table), exported as a dictionary (as_dict) or written for the
+node_exporter textfile collector of Prometheus (write_prometheus).
+"""
+
+import random
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Sequence, TypeVar, Union
+
+from folderlib.utilities.config import atomic_write
+
+PHASES = ["config", "scan", "sniff", "classify", "dedup", "mkdir", "move", "link", "journal", "create"]
+PERCENTILES = [0.5, 0.99]
+
+T = TypeVar("T")
+
+
+def nearest_rank(ordered: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values, 0.0 if there are none"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class PhaseStats(object):
+
+    def __init__(self, name: str, max_samples: int = 100000) -> None:
+        """
+        :param name: name of the phase
+        :param max_samples: latencies kept for the percentiles, once reached the samples are a uniform
+                            random selection of every latency (reservoir sampling)
+        """
+        self.name = name
+        self.count = 0
+        self.bytes = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.max_samples = max_samples
+        self.samples = array("d")
+
+    def add(self, seconds: float, count: int = 1, size: int = 0) -> None:
+        """Record count operations that took seconds in total, sampling their average latency once"""
+        self.count += count
+        self.bytes += size
+        self.seconds += seconds
+        latency = seconds / count if count else seconds
+        if len(self.samples) < self.max_samples:
+            self.samples.append(latency)
+        else:
+            position = random.randrange(self.count)
+            if position < self.max_samples:
+                self.samples[position] = latency
+
+    def merge(self, other: "PhaseStats") -> None:
+        """Add the operations of another run of the same phase, e.g. from another process"""
+        self.count += other.count
+        self.bytes += other.bytes
+        self.errors += other.errors
+        self.seconds += other.seconds
+        self.samples.extend(other.samples)
+        if len(self.samples) > self.max_samples:
+            self.samples = array("d", random.sample(list(self.samples), self.max_samples))
+
+    def percentile(self, fraction: float) -> float:
+        return nearest_rank(sorted(self.samples), fraction)
+
+    def as_dict(self) -> Dict[str, Union[int, float]]:
+        ordered = sorted(self.samples)
+        result = {"count": self.count, "bytes": self.bytes, "errors": self.errors, "seconds": self.seconds}
+        for fraction in PERCENTILES:
+            result[f"p{fraction * 100:g}"] = nearest_rank(ordered, fraction)
+        return result
+
+
+class WorkerStats(object):
+
+    def __init__(self, worker: str = "worker", max_samples: int = 100000) -> None:
+        """
+        :param worker: name of the worker, used as a label of the Prometheus metrics
+        :param max_samples: latencies kept per phase for the percentiles
+        """
+        self.worker = worker
+        self.max_samples = max_samples
+        self.phases: Dict[str, PhaseStats] = dict()
+        self._lock = threading.Lock()
+
+    def phase(self, name: str) -> PhaseStats:
+        phase = self.phases.get(name)
+        if phase is None:
+            with self._lock:
+                phase = self.phases.setdefault(name, PhaseStats(name, max_samples=self.max_samples))
+        return phase
+
+    def record(self, name: str, seconds: float, count: int = 1, size: int = 0) -> None:
+        phase = self.phase(name)
+        with self._lock:
+            phase.add(seconds, count=count, size=size)
+
+    def record_many(self, name: str, latencies: Iterable[float], size: int = 0) -> None:
+        """Record one operation per latency, e.g. the per-file timings returned by a worker process"""
+        phase = self.phase(name)
+        with self._lock:
+            for latency in latencies:
+                phase.add(latency)
+            phase.bytes += size
+
+    def error(self, name: str) -> None:
+        phase = self.phase(name)
+        with self._lock:
+            phase.errors += 1
+
+    @contextmanager
+    def timer(self, name: str, size: int = 0) -> Iterator[None]:
+        """Time the block as one operation of a phase, an exception counts as an error of the phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(name)
+            raise
+        self.record(name, time.perf_counter() - started, size=size)
+
+    def timed(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Stream an iterable, recording the time spent producing each item as one operation of a phase"""
+        iterator = iter(iterable)
+        phase = self.phase(name)
+        perf_counter = time.perf_counter
+        while True:
+            started = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            except Exception:
+                self.error(name)
+                raise
+            elapsed = perf_counter() - started
+            with self._lock:
+                phase.add(elapsed)
+            yield item
+
+    def merge(self, other: "WorkerStats") -> "WorkerStats":
+        """Add the phases of other, e.g. the stats of a worker that ran in another process"""
+        for name, phase in other.phases.items():
+            mine = self.phase(name)
+            with self._lock:
+                mine.merge(phase)
+        return self
+
+    def clear(self) -> None:
+        with self._lock:
+            self.phases.clear()
+
+    def __getstate__(self) -> dict:
+        # stats travel back from process pools, the lock does not
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def ordered(self) -> List[PhaseStats]:
+        """Recorded phases, the known ones in run order first"""
+        return sorted(self.phases.values(),
+                      key=lambda phase: (PHASES.index(phase.name) if phase.name in PHASES else len(PHASES),
+                                         phase.name))
+
+    def as_dict(self) -> Dict[str, Dict[str, Union[int, float]]]:
+        with self._lock:
+            return {phase.name: phase.as_dict() for phase in self.ordered()}
+
+    def format_table(self) -> str:
+        """Human readable table of the phases, one line per phase"""
+        lines = [f"{'phase':<10}{'count':>10}{'bytes':>14}{'errors':>8}{'total s':>11}{'p50 ms':>10}{'p99 ms':>10}"]
+        for name, phase in self.as_dict().items():
+            lines.append(
+                f"{name:<10}{phase['count']:>10}{phase['bytes']:>14}{phase['errors']:>8}{phase['seconds']:>11.3f}"
+                f"{phase['p50'] * 1000:>10.3f}{phase['p99'] * 1000:>10.3f}"
+            )
+        return "\n".join(lines)
+
+    def write_prometheus(self, file: Union[str, Path], prefix: str = "folderlib") -> None:
+        """Write the stats in the Prometheus text format, for the textfile collector of node_exporter
+
+        The file is written next to its destination and renamed over it, so the collector never reads a
+        partially written file.
+        """
+        labels = f'worker="{self.worker}"'
+        stats = self.as_dict()
+        lines = [
+            f"# HELP {prefix}_phase_duration_seconds Latency of the operations of a worker phase",
+            f"# TYPE {prefix}_phase_duration_seconds summary",
+        ]
+        for name, phase in stats.items():
+            for fraction in PERCENTILES:
+                lines.append(f'{prefix}_phase_duration_seconds{{{labels},phase="{name}",quantile="{fraction:g}"}} '
+                             f'{phase[f"p{fraction * 100:g}"]:.9f}')
+            lines.append(f'{prefix}_phase_duration_seconds_sum{{{labels},phase="{name}"}} {phase["seconds"]:.9f}')
+            lines.append(f'{prefix}_phase_duration_seconds_count{{{labels},phase="{name}"}} {phase["count"]}')
+        for metric, key, description in [("bytes", "bytes", "Bytes handled by"), ("errors", "errors", "Errors of")]:
+            lines.append(f"# HELP {prefix}_phase_{metric}_total {description} a worker phase")
+            lines.append(f"# TYPE {prefix}_phase_{metric}_total counter")
+            for name, phase in stats.items():
+                lines.append(f'{prefix}_phase_{metric}_total{{{labels},phase="{name}"}} {phase[key]}')
+        lines.append(f"# HELP {prefix}_last_run_timestamp_seconds Time the stats were written")
+        lines.append(f"# TYPE {prefix}_last_run_timestamp_seconds gauge")
+        lines.append(f"{prefix}_last_run_timestamp_seconds{{{labels}}} {time.time():.3f}")
+
+        atomic_write(file, ("\n".join(lines) + "\n").encode("utf-8"))
@@ -0,0 +1,227 @@
+"""File transfer primitives used by the workers
+
+    Moving a file inside the same filesystem is a single rename(2) call. shutil.move() gets there only after
+    checking the destination and the source type on every call, so the workers find out once whether the
+    source and destination folders live on the same device and then call move_file(same_device=True), which
+    goes straight to the kernel and only falls back to copying when it reports EXDEV (e.g. a mount point
+    inside a scanned tree).
+
+    A move never replaces an existing file: rename(2) would, so files are moved with link(2), which fails when
+    the name is taken, followed by unlink(2) of the source. Filesystems without hard links fall back to a
+    checked rename. A taken destination raises FileExistsError unless replacing it is asked for explicitly.
+
+    Moves across devices copy the data inside the kernel with os.copy_file_range (or os.sendfile) instead of
+    reading it into Python buffers, write to a temporary name that is renamed into place once the copy is
+    complete and can verify the copy by size or by checksum before the source is removed.
+"""
+
+import errno
+import hashlib
+import os
+import shutil
+from typing import Optional, Union
+from pathlib import Path
+
+from folderlib.exceptions import TransferVerificationError
+
+VERIFY_MODES = ["size", "checksum"]
+
+CHUNK_SIZE = 8 * 1024 * 1024
+PARTIAL_SUFFIX = ".fl-partial"
+
+# errors meaning "this copy mechanism is not available here", after which the next one is tried
+_FALLBACK_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EBADF,
+    errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+}
+
+# errors meaning "this filesystem cannot hard link", after which a checked rename is used
+_NO_LINK_ERRNOS = {
+    errno.EPERM,
+    errno.EMLINK,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    getattr(errno, "ENOTSUP", errno.EOPNOTSUPP),
+}
+
+
+def is_same_device(first: Union[str, Path], second: Union[str, Path]) -> bool:
+    """Check if two existing paths are on the same device (st_dev)"""
+    return os.stat(first).st_dev == os.stat(second).st_dev
+
+
+def rename_no_replace(source: str, destination: str) -> None:
+    """Rename a file on the same device, unless the destination name is taken
+
+    :raises FileExistsError: if the destination exists
+    :raises OSError: with errno EXDEV if the destination is on another device
+    """
+    try:
+        os.link(source, destination, follow_symlinks=False)
+    except (NotImplementedError, OSError) as error:
+        if isinstance(error, OSError) and error.errno not in _NO_LINK_ERRNOS:
+            raise
+        # no hard links here (e.g. FAT), only a file created right between both calls could be replaced
+        if os.path.lexists(destination):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+        os.rename(source, destination)
+        return
+    os.unlink(source)
+
+
+def _copy_fd(source_fd: int, destination_fd: int) -> int:
+    """Copy the contents of an open file to another, preferring kernel side copies
+
+    :return: amount of bytes copied
+    """
+    offset = 0
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                copied = os.copy_file_range(source_fd, destination_fd, CHUNK_SIZE)
+                if not copied:
+                    return offset
+                offset += copied
+        except OSError as error:
+            if error.errno not in _FALLBACK_ERRNOS:
+                raise
+
+    if hasattr(os, "sendfile"):
+        try:
+            while True:
+                copied = os.sendfile(destination_fd, source_fd, offset, CHUNK_SIZE)
+                if not copied:
+                    return offset
+                offset += copied
+        except OSError as error:
+            if error.errno not in _FALLBACK_ERRNOS:
+                raise
+
+    os.lseek(source_fd, offset, os.SEEK_SET)
+    while True:
+        buffer = os.read(source_fd, CHUNK_SIZE)
+        if not buffer:
+            return offset
+        view = memoryview(buffer)
+        while view:
+            written = os.write(destination_fd, view)
+            view = view[written:]
+        offset += len(buffer)
+
+
+def copy_file(source: Union[str, Path], destination: Union[str, Path]) -> int:
+    """Copy a file with its permission bits and timestamps
+
+    :return: amount of bytes copied
+    """
+    with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+        copied = _copy_fd(source_file.fileno(), destination_file.fileno())
+    shutil.copystat(source, destination)
+    return copied
+
+
+def file_checksum(file: Union[str, Path]) -> str:
+    digest = hashlib.blake2b()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def verify_copy(source: Union[str, Path], destination: Union[str, Path], mode: Optional[str]) -> None:
+    """Compare a copy with its source
+
+    :param mode: None to skip the check, "size" to compare sizes or "checksum" to compare the contents
+    :raises TransferVerificationError: if the files differ
+    """
+    if not mode:
+        return
+    if mode not in VERIFY_MODES:
+        raise ValueError(f"{mode} is not a verification mode. Try one of [{','.join(VERIFY_MODES)}]")
+
+    source_size = os.stat(source).st_size
+    destination_size = os.stat(destination).st_size
+    if source_size != destination_size:
+        raise TransferVerificationError(source, destination, f"Size {destination_size} != {source_size}")
+    if mode == "checksum" and file_checksum(source) != file_checksum(destination):
+        raise TransferVerificationError(source, destination, "Checksums differ")
+
+
+def move_across_devices(
+    source: str,
+    destination: str,
+    verify: Optional[str] = None,
+    replace: bool = False,
+) -> int:
+    """Move a file to another device: copy, verify and only then unlink the source
+
+    :param replace: replace the destination if it exists. Default: False
+    :raises FileExistsError: if the destination exists and replace is False
+    :return: amount of bytes copied
+    """
+    if not replace and os.path.lexists(destination):
+        raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), destination)
+    if os.path.islink(source):
+        if replace:
+            partial = destination + PARTIAL_SUFFIX
+            os.symlink(os.readlink(source), partial)
+            os.replace(partial, destination)
+        else:
+            os.symlink(os.readlink(source), destination)
+        os.unlink(source)
+        return 0
+
+    partial = destination + PARTIAL_SUFFIX
+    try:
+        copied = copy_file(source, partial)
+        verify_copy(source, partial, mode=verify)
+        if replace:
+            os.replace(partial, destination)
+        else:
+            rename_no_replace(partial, destination)
+    except BaseException:
+        try:
+            os.unlink(partial)
+        except FileNotFoundError:
+            pass
+        raise
+    os.unlink(source)
+    return copied
+
+
+def move_file(
+    source: Union[str, Path],
+    destination: Union[str, Path],
+    same_device: bool = True,
+    verify: Optional[str] = None,
+    replace: bool = False,
+) -> str:
+    """Move a file to a destination file path
+
+    :param source: file to move
+    :param destination: full path of the moved file (not its folder)
+    :param same_device: if True a plain rename is attempted first. Default: True
+    :param verify: verification mode used when the data has to be copied, one of [VERIFY_MODES]. Default: None
+    :param replace: replace the destination if it exists. Default: False
+    :raises FileExistsError: if the destination exists and replace is False
+    :return: destination path
+    """
+    source = os.fspath(source)
+    destination = os.fspath(destination)
+    if same_device:
+        try:
+            if replace:
+                os.replace(source, destination)
+            else:
+                rename_no_replace(source, destination)
+            return destination
+        except OSError as error:
+            if error.errno != errno.EXDEV:
+                raise
+    move_across_devices(source, destination, verify=verify, replace=replace)
+    return destination
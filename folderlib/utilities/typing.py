@@ -2,7 +2,8 @@
 
     [BOOL_TYPES]
         Many modules in the package use boolean options and in order to extend those for developers we use
-        distutils.util.strtobool which "Converts a string representation of truth to true (1) or false (0)"
+        strtobool (a copy of distutils.util.strtobool, which takes a quarter of a second to import) which
+        "Converts a string representation of truth to true (1) or false (0)"
 
         True values are 'y', 'yes', 't', 'true', 'on', '1' and True
         False values are 'n', 'no', 'f', 'false', 'off', '0' and False
@@ -83,3 +84,15 @@ FILTER_TYPES = Union[
     Tuple[str, ...]
 ]
 
+
+def strtobool(value: str) -> int:
+    """Convert a string representation of truth to true (1) or false (0)
+
+    :raises ValueError: if value is not one of the [BOOL_TYPES] values
+    """
+    value = value.lower()
+    if value in ("y", "yes", "t", "true", "on", "1"):
+        return 1
+    if value in ("n", "no", "f", "false", "off", "0"):
+        return 0
+    raise ValueError(f"invalid truth value {value!r}")
@@ -0,0 +1,201 @@
+"""Folder watchers used by the long running (watch) mode of the workers
+
+    A watcher reports the paths of files that appeared or changed under a folder since the last call to
+    poll(). On Linux InotifyWatcher asks the kernel for events through inotify (via ctypes, no extra
+    dependency), everywhere else, or when inotify is not available, PollingWatcher compares scandir snapshots
+    of (size, mtime) every time it is polled.
+
+    Watchers only report candidates. Deciding when a file is complete (debouncing and waiting for its size to
+    settle) is left to the caller, see Cleaner.watch().
+"""
+
+import abc
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Dict, Iterable, Optional, Set, Tuple, Union
+from pathlib import Path
+
+from folderlib.utilities.scanner import scan_tree
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher(abc.ABC):
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        max_depth: Optional[int] = 0,
+        exclude: Optional[Iterable[Union[str, Path]]] = None,
+    ) -> None:
+        """
+        :param path: root folder to watch
+        :param max_depth: how many levels of sub-folders to watch, None for all of them. Default: 0
+        :param exclude: folders that must not be watched e.g. the destination folder of the cleaner
+        """
+        self.path = os.path.abspath(os.fspath(Path(path).expanduser()))
+        self.max_depth = max_depth
+        self.exclude = {os.path.abspath(os.fspath(Path(p).expanduser())) for p in exclude or ()}
+
+    def scan(self, path: Optional[str] = None, depth: int = 0) -> Set[str]:
+        """Full scan of a watched folder, used at start-up and whenever events may have been lost"""
+        max_depth = None if self.max_depth is None else self.max_depth - depth
+        return {entry.path for entry in scan_tree(path or self.path, max_depth=max_depth, exclude=self.exclude)}
+
+    @abc.abstractmethod
+    def poll(self, timeout: float) -> Set[str]:
+        """Wait up to timeout seconds and return the paths of the files that appeared or changed"""
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class PollingWatcher(Watcher):
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.snapshot: Dict[str, Tuple[int, int]] = self.take_snapshot()
+
+    def take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = dict()
+        for entry in scan_tree(self.path, max_depth=self.max_depth, exclude=self.exclude):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout: float) -> Set[str]:
+        time.sleep(timeout)
+        previous, self.snapshot = self.snapshot, self.take_snapshot()
+        return {path for path, signature in self.snapshot.items() if previous.get(path) != signature}
+
+
+class InotifyWatcher(Watcher):
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.watches: Dict[int, Tuple[str, int]] = dict()
+        self.add_tree(self.path, depth=0)
+
+    def add_tree(self, path: str, depth: int) -> None:
+        """Watch a folder and its sub-folders up to max_depth"""
+        stack = [(path, depth)]
+        while stack:
+            directory, level = stack.pop()
+            if directory in self.exclude:
+                continue
+            wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                # the folder vanished or cannot be read, it is simply not watched
+                continue
+            self.watches[wd] = (directory, level)
+            if self.max_depth is not None and level >= self.max_depth:
+                continue
+            try:
+                with os.scandir(directory) as iterator:
+                    for entry in iterator:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append((entry.path, level + 1))
+            except OSError:
+                continue
+
+    def read_events(self) -> Iterable[Tuple[int, int, str]]:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as error:
+            if error.errno == errno.EAGAIN:
+                return
+            raise
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            yield wd, mask, name
+
+    def poll(self, timeout: float) -> Set[str]:
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+
+        for wd, mask, name in self.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # the kernel dropped events, nothing but a full scan can tell what happened
+                changed.update(self.scan())
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches or not name:
+                continue
+
+            directory, level = self.watches[wd]
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and (self.max_depth is None or level < self.max_depth):
+                    if path not in self.exclude:
+                        self.add_tree(path, depth=level + 1)
+                        # files may have been written before the watch was in place
+                        changed.update(self.scan(path, depth=level + 1))
+                continue
+            changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def get_watcher(
+    path: Union[str, Path],
+    max_depth: Optional[int] = 0,
+    exclude: Optional[Iterable[Union[str, Path]]] = None,
+    polling: bool = False,
+) -> Watcher:
+    """Create the best watcher available on this platform
+
+    :param polling: always use the scandir polling watcher. Default: False
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(path, max_depth=max_depth, exclude=exclude)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(path, max_depth=max_depth, exclude=exclude)
@@ -1,9 +1,28 @@
-from .base import BaseWorker
-from .populator import Populator
-from .cleaner import Cleaner
+from importlib import import_module
 
 __all__ = [
     "BaseWorker",
+    "BatchCleaner",
     "Cleaner",
     "Populator"
 ]
+
+# workers are imported on first use, so e.g. running the Cleaner never imports numpy for the Populator
+_modules = {
+    "BaseWorker": ".base",
+    "BatchCleaner": ".batch",
+    "Cleaner":    ".cleaner",
+    "Populator":  ".populator",
+}
+
+
+def __getattr__(name):
+    if name in _modules:
+        value = getattr(import_module(_modules[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
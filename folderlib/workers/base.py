@@ -1,15 +1,25 @@
-import json
+import logging
 import os
-from typing import Union, List, Dict, Any, Optional
+from typing import Union, List, Dict, Any, Optional, Tuple
 from pathlib import Path
 
 # Third party modules
 from appdirs import AppDirs
 
-from folderlib.exceptions import EmptyPath, MissingJsonFile, InvalidJsonFile, MissingCacheFile
+from folderlib.exceptions import EmptyPath, MissingJsonFile, MissingCacheFile
 from folderlib.utilities.typing import FILTER_TYPES, SUP_EXC_TYPES
+from folderlib.utilities import config
+from folderlib.utilities import index
+from folderlib.utilities.index import ExtensionIndex
+from folderlib.utilities.stats import WorkerStats
+from folderlib.__version__ import __version__
 from folderlib.data import supported, excluded
 
+logger = logging.getLogger(__name__)
+
+# cache folders already created by this process
+_cache_dirs = set()
+
 
 class BaseWorker(object):
 
@@ -29,80 +39,126 @@ class BaseWorker(object):
         )
 
         self.cache_dir = Path(self.dirs.user_cache_dir)
-        self.cache_dir.mkdir(exist_ok=True, parents=True)
+        if self.cache_dir not in _cache_dirs:
+            self.cache_dir.mkdir(exist_ok=True, parents=True)
+            _cache_dirs.add(self.cache_dir)
         self.cached_supported = self.cache_dir.joinpath(".fw_supported")
         self.cached_excluded = self.cache_dir.joinpath(".fw_excluded")
+        self.cached_index = self.cache_dir.joinpath(".fw_index")
+        self.journal_dir = self.cache_dir.joinpath("journal")
+        self.stats = WorkerStats(worker=self.__class__.__name__.lower())
 
     def get_files_supported(self, pool) -> Dict:
-        if self.cached_supported.exists():
-            if not pool:
-                return self.validate_json_file_and_get_data(self.cached_supported)
-            else:
-                # check what type is pool
-                if isinstance(pool, (str, Path)):
-                    # read data from pool file and update the cache
-                    data = self.validate_json_file_and_get_data(pool)
-                    return self.update_cached_file(data, mode="supported")
-                elif isinstance(pool, dict):
-                    return self.update_cached_file(pool, mode="supported")
-                else:
-                    raise TypeError(f"Invalid type for 'pool' option --> '{type(pool)}'")
-        else:
-            if not pool:
-                # just return the defaults without creating a file
-                return self.get_default_supported()
-            else:
-                # user provided custom values so create cache file
-                self.create_cache_file(items=pool, mode="supported")
-                return self.validate_json_file_and_get_data(self.cached_supported)
+        return self.get_pool(pool, mode="supported")
 
     def get_files_excluded(self, pool):
-        if self.cached_excluded.exists():
-            if not pool:
-                return self.validate_json_file_and_get_data(self.cached_excluded)
-            else:
-                # check what type is pool
-                if isinstance(pool, (str, Path)):
-                    # read data from pool file and update the cache
-                    data = self.validate_json_file_and_get_data(pool)
-                    return self.update_cached_file(data, mode="excluded")
-                elif isinstance(pool, dict):
-                    return self.update_cached_file(pool, mode="excluded")
-                else:
-                    raise TypeError(f"Invalid type for 'pool' option --> '{type(pool)}'")
-        else:
+        return self.get_pool(pool, mode="excluded")
+
+    def get_pool(self, pool, mode: str) -> Dict:
+        """Resolve a supported or excluded pool against its cache file
+
+        Cache files are read through the process-wide config cache, so they are parsed again only when
+        they changed on disk.
+        """
+        if pool and not isinstance(pool, (str, Path, dict)):
+            raise TypeError(f"Invalid type for 'pool' option --> '{type(pool)}'")
+        try:
+            cached_data = config.load_json(self.supported_or_excluded_mode(choice=mode))
+        except MissingJsonFile:
             if not pool:
                 # just return the defaults without creating a file
-                return self.get_default_excluded()
+                return self.get_default_supported() if mode == "supported" else self.get_default_excluded()
+            # user provided custom values so create cache file
+            data = self.validate_json_file_and_get_data(pool) if isinstance(pool, (str, Path)) else pool
+            self.create_cache_file(items=data, mode=mode)
+            return config.load_json(self.supported_or_excluded_mode(choice=mode))
+
+        if not pool:
+            return cached_data
+        # read data from pool file (or take the dictionary) and update the cache
+        data = self.validate_json_file_and_get_data(pool) if isinstance(pool, (str, Path)) else pool
+        return self.update_cached_file(data, mode=mode, cached_data=cached_data)
+
+    def load_config(
+        self,
+        files_supported: Optional[SUP_EXC_TYPES] = None,
+        files_excluded: Optional[SUP_EXC_TYPES] = None,
+    ) -> Tuple[Dict, Dict, ExtensionIndex]:
+        """Resolve the supported and excluded pools and compile them into an extension index
+
+        When no pool is given the compiled snapshot stored next to the cache files is loaded directly, as long
+        as the cache files did not change since it was written, so neither JSON parsing nor compiling happens.
+        Otherwise the pools are resolved (and merged into the cache files) and the snapshot is refreshed.
+
+        :return: (files_supported, files_excluded, index)
+        """
+        source = self.config_source()
+        if not files_supported and not files_excluded:
+            snapshot = index.read_snapshot(self.cached_index, source)
+            if snapshot is not None:
+                return snapshot
+
+        supported_pool = self.get_files_supported(pool=files_supported)
+        excluded_pool = self.get_files_excluded(pool=files_excluded)
+        compiled = self.build_index(supported_pool, excluded_pool)
+        if files_supported or files_excluded:
+            # the pools may have been merged into the cache files
+            source = self.config_source()
+        try:
+            index.write_snapshot(self.cached_index, source, supported_pool, excluded_pool, compiled)
+        except OSError as error:
+            # the snapshot is an optimisation, a read-only cache folder must not stop the worker
+            logger.debug(f"Cannot write the index snapshot {self.cached_index} ({error})")
+        return supported_pool, excluded_pool, compiled
+
+    def config_source(self) -> str:
+        """Key of the configuration a snapshot is built from: the package version and the (mtime, size) of the
+        modules of the default pools, which an editable install changes without a new version, then the
+        (mtime, size, inode) of the cache files. "-" stands for a missing file"""
+        keys = [__version__]
+        for module in (supported, excluded):
+            try:
+                stat = os.stat(module.__file__)
+            except (OSError, TypeError):
+                keys.append("-")
+            else:
+                keys.append(f"{stat.st_mtime_ns}.{stat.st_size}")
+        for file in (self.cached_supported, self.cached_excluded):
+            try:
+                stat = os.stat(file)
+            except FileNotFoundError:
+                keys.append("-")
             else:
-                # user provided custom values so create cache file
-                self.create_cache_file(items=pool, mode="excluded")
-                return self.validate_json_file_and_get_data(self.cached_excluded)
+                keys.append(f"{stat.st_mtime_ns}.{stat.st_size}.{stat.st_ino}")
+        return ":".join(keys)
+
+    @staticmethod
+    def build_index(files_supported: Optional[Dict] = None, files_excluded: Optional[Dict] = None) -> ExtensionIndex:
+        """Compile the supported and excluded pools into a single extension index
+
+        The index is meant to be built once per configuration and then queried for every file.
+        """
+        return ExtensionIndex(supported=files_supported, excluded=files_excluded)
 
     def create_cache_file(self, items, mode: str):
-        cache_dir = Path(self.dirs.user_cache_dir)
-        cache_dir.mkdir(exist_ok=True, parents=True)
         file_to_process: Path = self.supported_or_excluded_mode(choice=mode)
-        with file_to_process.open("w") as f:
-            json.dump(obj=items, fp=f, sort_keys=True, indent=4)
+        config.write_json(file_to_process, items)
 
-    def update_cached_file(self, data: Dict, mode: str):
+    def update_cached_file(self, data: Dict, mode: str, cached_data: Optional[Dict] = None):
+        """Merge data into a cache file, which is only rewritten if data adds something to it"""
         file_to_process: Path = self.supported_or_excluded_mode(choice=mode)
 
-        if not file_to_process.exists():
-            raise MissingCacheFile(file=file_to_process)
-        else:
-            cached_data = self.validate_json_file_and_get_data(file_to_process)
-            for files_category, filetypes in data.items():
-                if files_category not in cached_data:
-                    cached_data[files_category] = filetypes
-                else:
-                    for filetype in filetypes:
-                        if filetype not in cached_data[files_category]:
-                            cached_data[files_category].append(filetype)
-            with file_to_process.open("w") as f:
-                json.dump(obj=cached_data, fp=f, sort_keys=True, indent=4)
-        return self.validate_json_file_and_get_data(file_to_process)
+        if cached_data is None:
+            try:
+                cached_data = config.load_json(file_to_process)
+            except MissingJsonFile:
+                raise MissingCacheFile(file=file_to_process)
+        merged, changed = config.merge_pools(cached_data, data)
+        if not changed:
+            return merged
+        config.write_json(file_to_process, merged)
+        # served from the config cache, ordered like the file
+        return config.load_json(file_to_process)
 
     def supported_or_excluded_mode(self, choice: str):
         file_to_process: Path
@@ -149,14 +205,4 @@ class BaseWorker(object):
 
     @staticmethod
     def validate_json_file_and_get_data(file: Union[str, Path]):
-        file = Path(file).expanduser()
-
-        if not file.exists():
-            raise MissingJsonFile(file)
-
-        with file.open(mode="r") as f:
-            try:
-                data = json.load(f)
-            except json.decoder.JSONDecodeError:
-                raise InvalidJsonFile(file)
-            return data
+        return config.load_json(file)
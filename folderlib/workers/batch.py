@@ -0,0 +1,305 @@
+"""
+Clean many folders (roots) in a single run.
+
+The roots are sharded over a process pool. Every root is first planned by one process: small plans are
+applied right away, large ones are split into chunks of operations that any idle process picks up next, so
+one huge folder keeps every process busy instead of a single one while the others wait. The pools of
+supported and excluded files are resolved once, by the parent, and handed to every process of the pool.
+"""
+
+# Standard library imports
+import glob
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# Local application imports
+from folderlib.utilities.logging import get_console_logger
+from folderlib.utilities.typing import SUP_EXC_TYPES, PATH_TYPES, strtobool
+from folderlib.utilities.plan import LINK, Operation, read_plan, write_plan
+from folderlib.utilities.stats import WorkerStats
+from folderlib.exceptions import EmptyPath
+from folderlib.workers.cleaner import Cleaner
+
+logger = get_console_logger(name="BatchCleaner")
+
+
+class RootResult(NamedTuple):
+    """Outcome of the cleanup of one root"""
+    root: str
+    scanned: int = 0
+    moved: int = 0
+    seconds: float = 0.0  # time the processes of the pool spent on the root
+    error: str = ""
+
+
+class _Outcome(NamedTuple):
+    """What a task of the pool sends back to the parent"""
+    root: str
+    scanned: int
+    moved: int
+    seconds: float
+    error: str
+    stats: WorkerStats
+    chunks: List[str]  # plan files of the operations left to apply, in any order and by any process
+    links: str  # plan file of the hard links, applied once every chunk of the root is done
+
+
+# state of the processes of the pool, set once per process by _init_process
+_config: Optional[Tuple[Dict, Dict, Any]] = None
+_options: Dict[str, Any] = dict()
+_spool: str = ""
+_chunk_size: int = 0
+
+
+def _init_process(config: Tuple[Dict, Dict, Any], options: Dict[str, Any], spool: str, chunk_size: int) -> None:
+    global _config, _options, _spool, _chunk_size
+    _config, _options, _spool, _chunk_size = config, options, spool, chunk_size
+
+
+def _spill(operations: Iterable[Operation]) -> str:
+    descriptor, file = tempfile.mkstemp(dir=_spool, suffix=".jsonl")
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+        write_plan(operations, f)
+    return file
+
+
+def _clean_root(root: str) -> _Outcome:
+    """Plan a root, apply the plan if it is small and split it into chunks otherwise"""
+    started = time.perf_counter()
+    stats = WorkerStats(worker="cleaner")
+    scanned = moved = 0
+    chunks: List[str] = list()
+    links = ""
+    try:
+        cleaner = Cleaner(path=root, config=_config, **_options)
+        stats = cleaner.stats
+        moves: List[Operation] = list()
+        hard_links: List[Operation] = list()
+        for operation in cleaner.plan():
+            if operation.action == LINK:
+                hard_links.append(operation)
+                continue
+            moves.append(operation)
+            if len(moves) == _chunk_size:
+                chunks.append(_spill(moves))
+                moves = list()
+        scanned = cleaner.scanned
+
+        if not chunks:
+            moved = cleaner.execute(moves + hard_links)
+        else:
+            if moves:
+                chunks.append(_spill(moves))
+            if hard_links:
+                links = _spill(hard_links)
+            logger.info(f"{root}: {scanned} files scanned, moves split into {len(chunks)} chunks")
+    except Exception as error:
+        logger.error(f"Cannot clean {root} ({error})")
+        return _Outcome(root, scanned, moved, time.perf_counter() - started, f"{type(error).__name__}: {error}",
+                        stats, list(), "")
+    return _Outcome(root, scanned, moved, time.perf_counter() - started, "", stats, chunks, links)
+
+
+def _apply_chunk(root: str, file: str) -> _Outcome:
+    """Apply a chunk of the plan of a root"""
+    started = time.perf_counter()
+    stats = WorkerStats(worker="cleaner")
+    moved = 0
+    try:
+        # the seen files of the root were already handled when it was planned
+        cleaner = Cleaner(path=root, config=_config, **dict(_options, incremental=False))
+        stats = cleaner.stats
+        moved = cleaner.execute(read_plan(file))
+        os.unlink(file)
+    except Exception as error:
+        logger.error(f"Cannot apply {file} to {root} ({error})")
+        return _Outcome(root, 0, moved, time.perf_counter() - started, f"{type(error).__name__}: {error}",
+                        stats, list(), "")
+    return _Outcome(root, 0, moved, time.perf_counter() - started, "", stats, list(), "")
+
+
+def resolve_roots(
+    roots: Iterable[PATH_TYPES] = (),
+    pattern: Optional[str] = None,
+    roots_file: Optional[PATH_TYPES] = None,
+) -> List[Path]:
+    """Collect the folders to clean, each one once and in the order they were given
+
+    :param roots: folders to clean
+    :param pattern: glob pattern of folders to clean, '**' matches any amount of sub-folders
+    :param roots_file: text file with one folder per line, empty lines and lines starting with '#' are skipped
+    :return: the folders that exist, the others are logged and left out
+    """
+    candidates: List[str] = [os.fspath(root) for root in roots]
+    if pattern:
+        candidates.extend(sorted(glob.glob(os.path.expanduser(pattern), recursive=True)))
+    if roots_file:
+        with Path(roots_file).expanduser().open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    candidates.append(line)
+
+    resolved: List[Path] = list()
+    known = set()
+    for candidate in candidates:
+        path = Path(candidate).expanduser()
+        if not path.is_dir():
+            logger.warning(f"{candidate} is not a folder. Skipping root..")
+            continue
+        key = os.path.realpath(path)
+        if key not in known:
+            known.add(key)
+            resolved.append(path)
+    return resolved
+
+
+class BatchCleaner(object):
+
+    def __init__(
+        self,
+        roots: Iterable[PATH_TYPES],
+        save_to: Union[str, Path] = "clean-folder",
+        files_supported: Optional[SUP_EXC_TYPES] = None,
+        files_excluded: Optional[SUP_EXC_TYPES] = None,
+        processes: Optional[int] = None,
+        chunk_size: int = 5000,
+        **options: Any,
+    ) -> None:
+        """
+        :param roots: folders to clean
+        :param save_to: folder the files of each root are saved to, relative to the root unless it is a Path
+        :param files_supported: pool of supported files, shared by every root
+        :param files_excluded: pool of excluded files, shared by every root
+        :param processes: size of the process pool, 1 cleans the roots in this process. Default: cpu count
+        :param chunk_size: plans with more operations are split into chunks of this size, applied by any
+                           process of the pool
+        :param options: other options of the Cleaner (max_depth, workers, verify, sniff, ...)
+        """
+        self.roots = [Path(root) for root in roots]
+        if not self.roots:
+            raise EmptyPath("No folder to clean.")
+        if strtobool(str(options.get("journal", False))):
+            raise ValueError("Journaled runs clean a single folder, see Cleaner.execute_journaled")
+
+        # a first Cleaner checks the options and resolves the pools once for every root
+        template = Cleaner(path=self.roots[0], save_to=save_to, files_supported=files_supported,
+                           files_excluded=files_excluded, **dict(options, incremental=False))
+        self.config = (template.files_supported, template.files_excluded, template.index)
+        self.options = dict(options, save_to=save_to)
+        self.processes = max(1, int(processes or os.cpu_count() or 1))
+        self.chunk_size = max(1, int(chunk_size))
+
+        self.stats = WorkerStats(worker="cleaner").merge(template.stats)
+        self.results: Dict[str, RootResult] = dict()
+
+    def __call__(self) -> int:
+        """Clean every root
+
+        :return: amount of files moved, over every root
+        """
+        logger.info(f"Cleanup of {len(self.roots)} folders started with {self.processes} processes")
+        self.results = {os.fspath(root): RootResult(root=os.fspath(root)) for root in self.roots}
+        spool = tempfile.mkdtemp(prefix="folderlib-batch-")
+        initargs = (self.config, self.options, spool, self.chunk_size)
+        try:
+            if self.processes == 1:
+                _init_process(*initargs)
+                self.run(lambda function, *args: function(*args))
+            else:
+                with ProcessPoolExecutor(max_workers=self.processes, initializer=_init_process,
+                                         initargs=initargs) as executor:
+                    self.run(executor.submit)
+        finally:
+            shutil.rmtree(spool, ignore_errors=True)
+
+        moved = sum(result.moved for result in self.results.values())
+        failed = sum(1 for result in self.results.values() if result.error)
+        logger.info(f"Cleanup of {len(self.roots)} folders finished. {self.scanned} files processed, "
+                    f"{moved} files moved, {failed} folders failed")
+        return moved
+
+    def run(self, submit: Callable[..., Any]) -> None:
+        """Feed the tasks to the pool, at most one per process so new chunks jump ahead of the next roots
+
+        :param submit: executor.submit, or a function running the task right away
+        """
+        tasks: Deque[Tuple[Callable[..., _Outcome], ...]] = deque((_clean_root, os.fspath(root))
+                                                                  for root in self.roots)
+        chunks_left: Dict[str, int] = dict()
+        links: Dict[str, str] = dict()
+        running: Dict[Future, Tuple] = dict()
+        while tasks or running:
+            while tasks and len(running) < self.processes:
+                task = tasks.popleft()
+                result = submit(*task)
+                if isinstance(result, Future):
+                    running[result] = task
+                    continue
+                outcome = result
+                self.collect(outcome, tasks, chunks_left, links)
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    self.collect(future.result(), tasks, chunks_left, links)
+
+    def collect(
+        self,
+        outcome: _Outcome,
+        tasks: Deque[Tuple],
+        chunks_left: Dict[str, int],
+        links: Dict[str, str],
+    ) -> None:
+        """Add the outcome of a task to the result of its root and queue the work it left"""
+        self.stats.merge(outcome.stats)
+        result = self.results[outcome.root]
+        self.results[outcome.root] = result._replace(
+            scanned=result.scanned + outcome.scanned,
+            moved=result.moved + outcome.moved,
+            seconds=result.seconds + outcome.seconds,
+            error="; ".join(error for error in [result.error, outcome.error] if error),
+        )
+
+        if outcome.chunks:
+            chunks_left[outcome.root] = len(outcome.chunks)
+            if outcome.links:
+                links[outcome.root] = outcome.links
+            tasks.extendleft((_apply_chunk, outcome.root, chunk) for chunk in reversed(outcome.chunks))
+        elif outcome.root in chunks_left:
+            chunks_left[outcome.root] -= 1
+            if not chunks_left[outcome.root]:
+                del chunks_left[outcome.root]
+                if outcome.root in links and not self.results[outcome.root].error:
+                    # hard links point at files moved by the chunks, so they go last
+                    tasks.appendleft((_apply_chunk, outcome.root, links.pop(outcome.root)))
+
+    @property
+    def scanned(self) -> int:
+        return sum(result.scanned for result in self.results.values())
+
+    def report(self) -> Dict[str, Any]:
+        """Results of every root and the stats of the whole run, ready to be dumped as JSON"""
+        results = list(self.results.values())
+        return {
+            "roots": [result._asdict() for result in results],
+            "scanned": self.scanned,
+            "moved": sum(result.moved for result in results),
+            "failed": sum(1 for result in results if result.error),
+            "stats": self.stats.as_dict(),
+        }
+
+    def format_report(self) -> str:
+        """Human readable table of the roots, one line per root"""
+        width = max([len("root")] + [len(root) for root in self.results])
+        lines = [f"{'root':<{width}}{'scanned':>10}{'moved':>10}{'seconds':>10}  error"]
+        for result in self.results.values():
+            lines.append(f"{result.root:<{width}}{result.scanned:>10}{result.moved:>10}{result.seconds:>10.3f}"
+                         f"  {result.error}")
+        return "\n".join(lines)
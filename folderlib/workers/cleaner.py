@@ -6,23 +6,43 @@ To use, simply 'import cleaner' and clean away!
 
 # Standard library imports
 import os
-import shutil
-from distutils.util import strtobool
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import partial
 from pathlib import Path
-from typing import Dict, Union, Optional, List
-
-# Third party imports
-import numpy
+from concurrent.futures import Executor
+from typing import AsyncIterator, Dict, Union, Optional, Iterator, Iterable, NamedTuple, Tuple
 
 # Local application imports
-from folderlib.utilities.logging import get_console_logger
-from folderlib.utilities.typing import BOOL_TYPES, SUP_EXC_TYPES, PATH_TYPES
-from folderlib.exceptions import EmptyDirectory, EmptyPath, CleanedMatch
+from folderlib.utilities.logging import EventLog, get_console_logger
+from folderlib.utilities.typing import BOOL_TYPES, SUP_EXC_TYPES, PATH_TYPES, strtobool
+from folderlib.utilities.index import EXCLUDED, ExtensionIndex
+from folderlib.utilities.scanner import scan_tree, PathEntry
+from folderlib.utilities.watch import get_watcher
+from folderlib.utilities.executor import BoundedExecutor
+from folderlib.utilities.transfer import VERIFY_MODES, move_file
+from folderlib.utilities.plan import LINK, Operation, batch_by_directory
+from folderlib.utilities.dedup import DUPLICATES_POLICIES, find_duplicates
+from folderlib.utilities.seen import SeenFiles
+from folderlib.utilities.naming import COLLISION_POLICIES, TIMESTAMPS, DestinationNames, bucket_template, date_bucket
+from folderlib.utilities.journal import FINISHED, PLANNED, Journal, find_run, prune
+from folderlib.utilities.sniffer import Sniffer
+from folderlib.exceptions import EmptyDirectory, EmptyPath, MissingJournal
 from folderlib.workers import BaseWorker
 
 logger = get_console_logger(name="Cleaner")
 
 
+class MoveEvent(NamedTuple):
+    """Progress event of the async API, one per applied operation"""
+    operation: Operation
+    destination: str
+    moved: int  # operations applied so far, this one included
+    scanned: int  # files scanned so far
+
+
 class Cleaner(BaseWorker):
 
     def __init__(
@@ -32,6 +52,20 @@ class Cleaner(BaseWorker):
         files_supported: Optional[SUP_EXC_TYPES] = None,
         files_excluded: Optional[SUP_EXC_TYPES] = None,
         group_unknowns: Optional[BOOL_TYPES] = False,
+        max_depth: Optional[int] = 0,
+        follow_symlinks: Optional[BOOL_TYPES] = False,
+        workers: int = 1,
+        verify: Optional[str] = None,
+        incremental: Optional[BOOL_TYPES] = False,
+        sniff: Optional[BOOL_TYPES] = False,
+        duplicates: Optional[str] = None,
+        config: Optional[Tuple[Dict, Dict, ExtensionIndex]] = None,
+        log_every: int = 1000,
+        journal: Optional[BOOL_TYPES] = False,
+        collisions: str = "suffix",
+        layout: Optional[str] = None,
+        timestamp: str = "mtime",
+        read_workers: Optional[int] = None,
     ) -> None:
         super().__init__(name=None, path=path)
 
@@ -42,66 +76,562 @@ class Cleaner(BaseWorker):
         else:
             raise TypeError(f"Wrong type for 'save_to' option --> {type(save_to)}")
 
-        self.files_supported = self.get_files_supported(pool=files_supported)
-        self.files_excluded = self.get_files_excluded(pool=files_excluded)
+        with self.stats.timer("config"):
+            if config is not None:
+                # already resolved by the caller, e.g. a batch run sharing its config with every root
+                self.files_supported, self.files_excluded, self.index = config
+            else:
+                self.files_supported, self.files_excluded, self.index = self.load_config(
+                    files_supported, files_excluded
+                )
         self.group_unknowns = strtobool(str(group_unknowns))
+        self.max_depth = max_depth if max_depth is None or max_depth >= 0 else None
+        self.follow_symlinks = strtobool(str(follow_symlinks))
 
-        self.analyzed = False
+        self.workers = max(1, int(workers))
+        # reading headers and hashing contents is I/O bound, it does not have to wait for parallel moves
+        self.read_workers = max(1, int(read_workers)) if read_workers else min(32, os.cpu_count() or 1)
+        self.directories: Dict[str, bool] = dict()
+        self.source_device: Optional[int] = None
+        self.scanned = 0
+        self.extensions: Counter = Counter()
+        self.sniffer: Optional[Sniffer] = Sniffer() if strtobool(str(sniff)) else None
+        self.seen: Optional[SeenFiles] = self.get_seen_files() if strtobool(str(incremental)) else None
 
-        self.FILES: List[Path] = list()
+        if verify and verify not in VERIFY_MODES:
+            raise ValueError(f"{verify} is not a verification mode. Try one of [{','.join(VERIFY_MODES)}]")
+        self.verify = verify or None
 
-    def analyze_path(self):
-        self.FILES = [entry for entry in self.path.iterdir() if entry.is_file()]
-        if not self.FILES:
-            raise EmptyDirectory()
+        if duplicates and duplicates not in DUPLICATES_POLICIES:
+            raise ValueError(f"{duplicates} is not a duplicates policy. Try one of [{','.join(DUPLICATES_POLICIES)}]")
+        self.duplicates = duplicates or None
 
-        extensions = list()
-        for file in self.FILES:
-            extension = file.suffix.replace('.', '')  # omit the '.' in suffix from e.g ".exe" to "exe"
-            extensions.append(extension)
-        extensions, extensions_counts = numpy.unique(extensions, return_counts=True)
-        logger.info(f"Found {len(extensions)} unique extensions")
-        for extension, count in zip(extensions, extensions_counts):
-            logger.info(f"{extension}: {count}")
+        if collisions not in COLLISION_POLICIES:
+            raise ValueError(f"{collisions} is not a collision policy. Try one of [{','.join(COLLISION_POLICIES)}]")
+        self.collisions = collisions
+        self.names = DestinationNames(collisions)
+
+        # <category>/<bucket> destinations, e.g. <category>/2024/05 for the "date" layout
+        self.layout = bucket_template(layout)
+        if timestamp not in TIMESTAMPS:
+            raise ValueError(f"{timestamp} is not a timestamp. Try one of [{','.join(TIMESTAMPS)}]")
+        self.timestamp = timestamp
+
+        # per-file messages are summed up every log_every files, 0 logs every file on its own
+        self.log_every = max(0, int(log_every))
+        self.events = EventLog(logger, "classify", every=self.log_every)
+        self.journal = strtobool(str(journal))
+        self.now = time.time()
 
-    def __call__(self):
+    def iter_files(self) -> Iterator[os.DirEntry]:
+        """Stream the files to be cleaned, never descending into the save_to folder"""
+        return scan_tree(
+            self.path,
+            max_depth=self.max_depth,
+            follow_symlinks=self.follow_symlinks,
+            exclude=[self.save_to],
+        )
+
+    def __call__(self) -> int:
         if not self.path:
             raise EmptyPath()
 
         logger.info("Cleanup operation started")
         logger.info("Cleanup directory: %s" % self.path.absolute())
-        logger.info("Creating %s directory" % self.save_to)
 
+        moved = self.run_plan(self.plan())
+
+        if not self.scanned:
+            raise EmptyDirectory(dir_name=str(self.path))
+        self.log_extensions()
+        logger.info(f"Cleanup operation finished. {self.scanned} files processed, {moved} files moved")
+        return moved
+
+    async def arun(self, executor: Optional[Executor] = None) -> int:
+        """Async counterpart of __call__, the filesystem work runs in an executor so the event loop never blocks
+
+        :param executor: executor running the scan and the moves. Default: the thread pool shared by the
+                         async API of every worker (folderlib.utilities.aio.get_executor)
+        :return: amount of files moved
+        """
+        if not self.path:
+            raise EmptyPath()
+
+        logger.info("Cleanup operation started")
+        logger.info("Cleanup directory: %s" % self.path.absolute())
+        moved = 0
+        async for event in self.aiter_moves(executor=executor):
+            moved = event.moved
+
+        if not self.scanned:
+            raise EmptyDirectory(dir_name=str(self.path))
+        self.log_extensions()
+        logger.info(f"Cleanup operation finished. {self.scanned} files processed, {moved} files moved")
+        return moved
+
+    async def aiter_moves(
+        self,
+        operations: Optional[Iterable[Operation]] = None,
+        executor: Optional[Executor] = None,
+        chunk_size: int = 256,
+    ) -> AsyncIterator[MoveEvent]:
+        """Apply a plan from the event loop, yielding a MoveEvent for every applied operation
+
+        At most `workers` operations are in flight and the plan is only read (scanned) as fast as the events
+        are consumed, so a slow consumer holds the whole job back instead of piling up work. Cancelling the
+        consumer (or leaving the loop early) cancels the operations that did not start and waits for the
+        running ones, the rest of the plan is left untouched. With journal=True the plan is journaled first,
+        like execute_journaled() does, and an interrupted run can be resumed with resume().
+
+        :param operations: plan to apply. Default: the plan of the folder (see plan())
+        :param executor: executor running the scan and the moves. Default: the shared thread pool
+        :param chunk_size: operations read from the plan at once
+        """
+        # asyncio takes longer to import than the rest of the package, only async callers pay for it
+        import asyncio
+        from folderlib.utilities.aio import aiter_blocking, bounded_map, get_executor
+
+        executor = executor or get_executor()
+        await asyncio.wrap_future(executor.submit(self.prepare))
+        journal = None
+        if self.journal:
+            journal = await asyncio.wrap_future(executor.submit(self.start_journal, operations))
+            operations = journal.pending(resuming=False)
+        operations = iter(self.plan() if operations is None else operations)
+        apply = partial(self.apply_to_directory, journal=journal)
+        links = list()
+
+        async def moves() -> AsyncIterator[Operation]:
+            async for operation in aiter_blocking(operations, executor=executor, chunk_size=chunk_size):
+                if operation.action == LINK:
+                    # the target is moved by another operation, links wait until every move is done
+                    links.append(operation)
+                else:
+                    yield operation
+
+        moved = 0
         try:
-            self.save_to.mkdir(exist_ok=False)
-        except FileExistsError:
-            logger.debug(f"Folder {self.save_to} already exists.")
+            async for operation, destination in bounded_map(apply, moves(), limit=self.workers, executor=executor):
+                moved += 1
+                yield MoveEvent(operation, destination, moved, self.scanned)
+            async for operation, destination in bounded_map(apply, links, limit=self.workers, executor=executor):
+                moved += 1
+                yield MoveEvent(operation, destination, moved, self.scanned)
+        finally:
+            if journal is not None:
+                journal.close()
+        if journal is not None:
+            journal.set_state(FINISHED, moved=moved)
+
+    def run_plan(self, operations: Iterable[Operation]) -> int:
+        """Apply a plan, in a journaled run of its own if the journal is enabled
+
+        :return: amount of files moved
+        """
+        if self.journal:
+            return self.execute_journaled(operations)
+        return self.execute(operations)
+
+    def execute_journaled(self, operations: Optional[Iterable[Operation]] = None, keep: int = 20) -> int:
+        """Record the plan in a new journal, then apply it
+
+        The whole plan is written to the journal before the first file is moved, so an interrupted run can
+        be resumed (see resume()) or undone (see folderlib.utilities.journal.undo) without scanning again.
+        That costs the streaming of the plan: no file is moved before the folder was fully scanned.
+
+        :param operations: plan to apply. Default: the plan of the folder (see plan())
+        :param keep: finished runs whose journal is kept
+        :return: amount of files moved
+        """
+        return self.apply_journal(self.start_journal(operations, keep=keep), resuming=False)
+
+    def start_journal(self, operations: Optional[Iterable[Operation]] = None, keep: int = 20) -> Journal:
+        """Create the journal of a new run and record its whole plan, see execute_journaled()"""
+        prune(self.journal_dir, keep=keep)
+        journal = Journal.create(self.journal_dir, self.path, self.save_to, stats=self.stats)
+        planned = journal.record_plan(self.plan() if operations is None else operations)
+        logger.info(f"Run {journal.run}: {planned} operations journaled")
+        return journal
+
+    def resume(self, run: Optional[str] = None) -> int:
+        """Apply what is left of an interrupted journaled run of this folder, the folder is not scanned again
 
-        self.analyze_path()
+        :param run: id of the run. Default: the latest interrupted run of the folder
+        :raises MissingJournal: if there is no such run
+        :return: amount of files moved
+        """
+        journal = find_run(self.journal_dir, run=run, path=self.path, states=[PLANNED])
+        if journal is None or journal.state != PLANNED:
+            raise MissingJournal(path=self.path.absolute(), msg="Nothing to resume.")
+        journal.stats = self.stats
+        logger.info(f"Resuming run {journal.run}")
+        return self.apply_journal(journal)
 
-        for filepath in self.FILES:
-            extension = filepath.suffix.replace('.', '')  # omit the '.' in suffix from e.g ".exe" to "exe"
-            # check if extension is blacklisted
+    def apply_journal(self, journal: Journal, resuming: bool = True) -> int:
+        with journal:
+            moved = self.execute(journal.pending(resuming=resuming), journal=journal)
+        if journal.resumed:
+            logger.info(f"Run {journal.run}: {journal.resumed} operations were already applied")
+        journal.set_state(FINISHED, moved=journal.resumed + moved)
+        return moved
+
+    def apply_to_directory(self, operation: Operation, journal: Optional[Journal] = None) -> str:
+        """Apply a single operation, creating its destination folder first if needed
+
+        :param journal: journal the applied operation is recorded in
+        """
+        same_device = self.prepare_directory(operation.directory)
+        if journal is not None:
+            return self.apply_journaled(journal, operation, same_device)
+        return self.apply(operation, same_device)
+
+    def plan(self, entries: Optional[Iterable[os.DirEntry]] = None) -> Iterator[Operation]:
+        """Scan and classify the folder without touching the filesystem (dry run)
+
+        The operations are produced while the folder is scanned, so a plan can be previewed, written to disk
+        with folderlib.utilities.plan.write_plan or executed straight away.
+
+        :param entries: files to classify instead of scanning the folder (DirEntry or PathEntry objects)
+        """
+        self.scanned = 0
+        self.extensions = Counter()
+        # ages of the rules are measured from the start of the plan, the same way for every file
+        self.now = time.time()
+        self.events = EventLog(logger, "classify", every=self.log_every)
+        # destination folders are listed again only if they changed since the previous plan
+        self.names.refresh()
+        seen = self.seen
+        candidates = self.unseen(self.stats.timed("scan", self.iter_files()) if entries is None else entries)
+        if self.sniffer is not None:
+            sniffed = self.sniffer.sniff_many(candidates, workers=self.read_workers, predicate=self.needs_sniffing,
+                                              stats=self.stats)
+        else:
+            sniffed = ((entry, None) for entry in candidates)
+
+        planned = self.plan_entries(sniffed)
+        if self.duplicates is not None:
+            planned = self.deduplicate(planned)
+        for _, operation in planned:
+            yield operation
+        self.events.flush()
+
+        if seen is not None:
+            logger.debug("%d files left in place are recorded as seen", len(seen))
+            # the keys of files outside a list of entries (e.g. a watch batch) are still valid
+            seen.save(complete=entries is None)
+
+    def plan_entries(
+        self,
+        sniffed: Iterable[Tuple[os.DirEntry, Optional[str]]],
+    ) -> Iterator[Tuple[os.DirEntry, Operation]]:
+        save_to = os.fspath(self.save_to)
+        seen = self.seen
+        if seen is not None and self.index.rules is not None and self.index.rules.uses_age:
+            # a file left in place today may match an age rule tomorrow, so no decision is final
+            seen = None
+        layout = self.layout
+        extensions = self.extensions
+        for entry, content_type in sniffed:
+            started = time.perf_counter()
+            extensions[self.index.normalize(os.path.splitext(entry.name)[1])] += 1
+            category_name = self.classify(entry, content_type=content_type)
+            if category_name is None:
+                if seen is not None:
+                    seen.add(seen.key(entry))
+                self.stats.record("classify", time.perf_counter() - started)
+                continue
             try:
-                for _, filetypes in self.files_excluded.items():
-                    if any(name == extension for name in filetypes):
-                        logger.debug(f"'.{extension}' recognized as excluded type. Skipping file..")
-                        raise CleanedMatch()
-
-                # check if extension exists in any category supported
-                for category_name, filetypes in self.files_supported.items():
-                    if any(name == extension for name in filetypes):
-                        logger.debug(f"'.{extension}' recognized as supported type. Moving now...")
-                        category_path = self.save_to.joinpath(category_name)
-                        category_path.mkdir(parents=True, exist_ok=True)
-                        shutil.move(str(filepath), str(category_path))
-                        raise CleanedMatch()
-
-                # the file is unrecognized at this point
-                if self.group_unknowns:
-                    logger.debug(f"'.{extension}' is not recognized. Moving to unknowns now...")
-                    unknowns_path = self.save_to.joinpath("unknowns")
-                    unknowns_path.mkdir(parents=True, exist_ok=True)
-                    shutil.move(str(filepath), str(unknowns_path))
-            except CleanedMatch:
+                # one stat syscall per file on POSIX (only Windows fills it in during the scan), cached by the
+                # DirEntry so the rules, the seen files and the moves that follow reuse it
+                stat = entry.stat()
+            except OSError as error:
+                # the file vanished since it was scanned
+                logger.debug("Cannot stat '%s' (%s). Skipping file..", entry.name, error)
+                self.stats.error("classify")
+                continue
+            directory = os.path.join(save_to, category_name)
+            if layout is not None:
+                directory = os.path.join(directory, date_bucket(layout, stat, self.timestamp))
+            destination = self.names.resolve(directory, entry.name, entry)
+            self.stats.record("classify", time.perf_counter() - started)
+            if destination is None:
+                logger.debug("'%s' is already in %s. Skipping file..", entry.name, category_name)
                 continue
+            yield entry, Operation(
+                source=entry.path,
+                category=category_name,
+                destination=destination,
+                size=stat.st_size,
+            )
+
+    def deduplicate(
+        self,
+        planned: Iterable[Tuple[os.DirEntry, Operation]],
+    ) -> Iterator[Tuple[os.DirEntry, Operation]]:
+        """Apply the duplicates policy to the files about to be moved
+
+        Finding duplicates needs every candidate, so unlike the rest of the plan this step holds the planned
+        operations in memory. Originals are planned first and the operations of their duplicates afterwards.
+        """
+        planned = list(planned)
+        operations = {entry.path: operation for entry, operation in planned}
+        originals = dict()
+        with self.stats.timer("dedup"):
+            groups = find_duplicates([entry for entry, _ in planned], workers=self.read_workers)
+        for group in groups:
+            for duplicate in group[1:]:
+                originals[duplicate.path] = group[0].path
+        logger.info(f"Found {len(originals)} duplicate files")
+
+        duplicates = list()
+        for entry, operation in planned:
+            if entry.path in originals:
+                duplicates.append((entry, operation))
+            else:
+                yield entry, operation
+
+        buckets = os.path.join(os.fspath(self.save_to), "duplicates")
+        for entry, operation in duplicates:
+            if self.duplicates == "skip":
+                logger.debug("'%s' is a duplicate. Skipping file..", entry.name)
+            elif self.duplicates == "move":
+                destination = self.names.resolve(buckets, entry.name, entry)
+                if destination is None:
+                    logger.debug("'%s' is a duplicate already in duplicates. Skipping file..", entry.name)
+                    continue
+                logger.debug("'%s' is a duplicate. Moving to duplicates now...", entry.name)
+                yield entry, operation._replace(category="duplicates", destination=destination)
+            else:
+                logger.debug("'%s' is a duplicate. Replacing it with a hard link...", entry.name)
+                target = operations[originals[entry.path]].destination
+                yield entry, operation._replace(action=LINK, target=target)
+
+    def watch(
+        self,
+        interval: float = 1.0,
+        debounce: float = 0.5,
+        polling: bool = False,
+        stop: Optional[threading.Event] = None,
+    ) -> None:
+        """Keep cleaning the folder as new files show up, until stop is set (or KeyboardInterrupt)
+
+        The files already in the folder are cleaned first. After that, new or changed files reported by the
+        watcher are collected until no event arrived for `debounce` seconds, and a file is only cleaned once
+        its size and mtime did not change between two such quiet periods, so files that are still being
+        written are left alone. With journal=True the first pass and every batch are journaled runs of their own.
+
+        :param interval: maximum time between two checks of the pending files, also the polling period when
+                         inotify is not available. Default: 1.0
+        :param debounce: quiet time that ends a batch of events. Default: 0.5
+        :param polling: always use the scandir/mtime polling watcher. Default: False
+        :param stop: event that ends the watch loop
+        """
+        stop = stop or threading.Event()
+        logger.info(f"Watching {self.path.absolute()} for new files")
+
+        pending: Dict[str, Optional[Tuple[int, int]]] = dict()
+        # the watcher starts before the first pass, so files created while it runs are reported too
+        with get_watcher(self.path, max_depth=self.max_depth, exclude=[self.save_to], polling=polling) as watcher:
+            self.run_plan(self.plan())
+            last_check = time.monotonic()
+            while not stop.is_set():
+                changed = watcher.poll(timeout=debounce if pending else interval)
+                for path in changed:
+                    pending[path] = None
+                if not pending or (changed and time.monotonic() - last_check < interval):
+                    continue
+
+                last_check = time.monotonic()
+                ready = list()
+                for path, previous in list(pending.items()):
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        del pending[path]
+                        continue
+                    current = (stat.st_size, stat.st_mtime_ns)
+                    if current == previous:
+                        ready.append(PathEntry(path))
+                        del pending[path]
+                    else:
+                        pending[path] = current
+
+                if ready:
+                    moved = self.run_plan(self.plan(entries=ready))
+                    logger.info(f"{len(ready)} new files processed, {moved} files moved")
+
+    def get_seen_files(self) -> SeenFiles:
+        """Open the seen-files index of this folder, tied to the current classification settings"""
+        folders = f"{self.path.absolute()}\0{self.save_to.absolute()}\0{self.max_depth}"
+        name = hashlib.blake2b(folders.encode("utf-8"), digest_size=16).hexdigest()
+        fingerprint = f"{self.index.fingerprint()}:{int(self.group_unknowns)}:{int(self.sniffer is not None)}"
+        return SeenFiles(self.cache_dir.joinpath("seen", name), fingerprint=fingerprint)
+
+    def log_extensions(self) -> None:
+        """Log the extensions of the files classified by the last plan"""
+        logger.info(f"Found {len(self.extensions)} unique extensions")
+        for extension, count in sorted(self.extensions.items()):
+            logger.info(f"{extension}: {count}")
+
+    def unseen(self, entries: Iterable[os.DirEntry]) -> Iterator[os.DirEntry]:
+        """Count the scanned files and drop the ones a previous incremental run already decided"""
+        seen = self.seen
+        for entry in entries:
+            self.scanned += 1
+            if seen is not None:
+                key = seen.key(entry)
+                if key in seen:
+                    seen.add(key)
+                    continue
+            yield entry
+
+    def needs_sniffing(self, entry: os.DirEntry) -> bool:
+        """Files excluded by their extension are never moved, so their content does not matter"""
+        match = self.index.lookup(entry.name)
+        return match is None or match[0] != EXCLUDED
+
+    def classify(self, entry: os.DirEntry, content_type: Optional[str] = None) -> Optional[str]:
+        """Classify a single scanned file
+
+        :param content_type: extension matching the content of the file, if it was sniffed. It classifies files
+                             whose name is not recognized, and overrides a recognized extension only when
+                             its signature is strong and the name is not a specialisation of it
+                             (e.g. a .docx file is a ZIP archive), see Sniffer.overrides()
+        :return: the category the file must be moved to, or None if it stays in place
+        """
+        rules = self.index.rules
+        if rules is not None:
+            ruled = rules.match(entry, now=self.now)
+            if ruled is not None:
+                excluded, category_name = ruled
+                if excluded:
+                    self.events("excluded", "'%s' matches an exclusion rule. Skipping file..", entry.name)
+                    return None
+                self.events(category_name, "'%s' matches a rule of '%s'. Moving now...", entry.name, category_name)
+                return category_name
+
+        suffix = os.path.splitext(entry.name)[1]
+        match = self.index.lookup(entry.name)
+        if content_type is not None and (match is None or match[0] != EXCLUDED):
+            sniffed = self.index.lookup_extension(content_type)
+            if sniffed is not None and sniffed != match and (
+                match is None or self.sniffer.overrides(content_type, entry.name)
+            ):
+                logger.debug("'%s' content is recognized as '.%s'", entry.name, content_type)
+                suffix = f".{content_type}"
+                match = sniffed
+        if match is None:
+            # the file is unrecognized at this point
+            if self.group_unknowns:
+                self.events("unknowns", "'%s' is not recognized. Moving to unknowns now...", suffix)
+                return "unknowns"
+            self.events("unrecognized")
+            return None
+
+        kind, category_name = match
+        if kind == EXCLUDED:
+            self.events("excluded", "'%s' recognized as excluded type. Skipping file..", suffix)
+            return None
+
+        self.events(category_name, "'%s' recognized as supported type. Moving now...", suffix)
+        return category_name
+
+    def execute(self, operations: Iterable[Operation], sort: bool = False, journal: Optional[Journal] = None) -> int:
+        """Apply a plan, possibly one created by another process
+
+        :param operations: the operations to apply
+        :param sort: sort the plan by destination folder before applying it. This improves locality for
+                     plans read from disk, but it has to hold the whole plan in memory. Default: False
+        :param journal: journal the applied operations are recorded in
+        :return: amount of files moved
+        """
+        self.prepare()
+        apply = self.apply if journal is None else partial(self.apply_journaled, journal)
+        executor = BoundedExecutor(max_workers=self.workers, name="Cleaner") if self.workers > 1 else None
+
+        moved = 0
+        links = list()
+        try:
+            for batch in batch_by_directory(operations, sort=sort):
+                same_device = self.prepare_directory(batch[0].directory)
+                for operation in batch:
+                    if operation.action == LINK:
+                        # the target is moved by another operation, links wait until every move is done
+                        links.append(operation)
+                        continue
+                    if executor is None:
+                        apply(operation, same_device)
+                    else:
+                        executor.submit(apply, operation, same_device)
+                    moved += 1
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        if executor is not None:
+            executor.raise_errors()
+
+        for operation in links:
+            apply(operation, self.prepare_directory(operation.directory))
+            moved += 1
+        return moved
+
+    def prepare(self) -> None:
+        """Create the save_to folder and reset the destination folders known from a previous run"""
+        logger.info("Creating %s directory" % self.save_to)
+        try:
+            self.save_to.mkdir(exist_ok=False, parents=True)
+        except FileExistsError:
+            logger.debug("Folder %s already exists.", self.save_to)
+
+        self.source_device = os.stat(self.path).st_dev
+        self.directories.clear()
+
+    def prepare_directory(self, directory: str) -> bool:
+        """Create a destination folder the first time it is used during a run
+
+        :return: True if the folder is on the same device as the cleaned folder
+        """
+        same_device = self.directories.get(directory)
+        if same_device is None:
+            with self.stats.timer("mkdir"):
+                os.makedirs(directory, exist_ok=True)
+                same_device = os.stat(directory).st_dev == self.source_device
+            if not same_device:
+                logger.debug("%s is on another device. Files will be copied.", directory)
+            self.directories[directory] = same_device
+        return same_device
+
+    def apply_journaled(self, journal: Journal, operation: Operation, same_device: bool = True) -> str:
+        destination = self.apply(operation, same_device)
+        journal.mark(operation)
+        return destination
+
+    def apply(self, operation: Operation, same_device: bool = True) -> str:
+        if operation.action == LINK:
+            with self.stats.timer("link"):
+                try:
+                    os.link(operation.target, operation.destination)
+                except OSError as error:
+                    # hard links are not possible here (e.g. another device), keep a real copy instead
+                    logger.debug("Cannot link %s to %s (%s). Moving now...", operation.destination, operation.target,
+                                 error)
+                else:
+                    os.unlink(operation.source)
+                    return operation.destination
+        with self.stats.timer("move", size=operation.size):
+            try:
+                return move_file(operation.source, operation.destination, same_device=same_device, verify=self.verify)
+            except FileExistsError:
+                # the planned name was taken since, only overwrite-if-newer may replace the file holding it
+                if self.names.policy != "overwrite-if-newer" or not self.is_newer(operation):
+                    raise
+            return move_file(operation.source, operation.destination, same_device=same_device, verify=self.verify,
+                             replace=True)
+
+    @staticmethod
+    def is_newer(operation: Operation) -> bool:
+        """Check if the source of an operation was modified after the file holding its destination"""
+        try:
+            return os.stat(operation.source).st_mtime_ns > os.stat(operation.destination).st_mtime_ns
+        except OSError:
+            return False
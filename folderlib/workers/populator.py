@@ -1,19 +1,168 @@
 # Standard library imports
 import os
 import sys
-import distutils.util
-from random import choice, getrandbits
+import time
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import repeat
 from pathlib import Path
-from typing import Optional, Any, Union, Dict, List, Tuple
+from typing import Optional, Any, Union, Dict, List, Tuple, NamedTuple, Iterator, AsyncIterator
+
+# Third party imports
+import numpy
 
 # Local application imports
 from folderlib.utilities.logging import get_console_logger
 from folderlib.utilities.typing import SUP_EXC_TYPES, FILTER_TYPES
+from folderlib.utilities.sizes import SizeDistribution
+from folderlib.utilities.rules import split_rules
+from folderlib.data import magic
 from folderlib.workers.base import BaseWorker
 
 
 logger = get_console_logger(name=__name__ if __name__ != "__main__" else "populator")
 
+EXECUTOR_TYPES = ["thread", "process"]
+CONTENT_TYPES = ["sparse", "allocate", "header"]
+SPREAD_TYPES = ["even", "zipf", "hot"]
+
+FILL_SIZE = 1024 * 1024
+
+_fill_buffer: Optional[memoryview] = None
+_headers: Dict[str, bytes] = dict()
+
+
+def get_fill_buffer() -> memoryview:
+    """Random bytes reused to fill the files of this process, allocated once
+
+    The bytes come from a fixed seed so the content of the files is as reproducible as their manifest.
+    """
+    global _fill_buffer
+    if _fill_buffer is None:
+        _fill_buffer = memoryview(numpy.random.default_rng(FILL_SIZE).bytes(FILL_SIZE))
+    return _fill_buffer
+
+
+def get_header(extension: str) -> bytes:
+    """Build the smallest header the magic numbers of an extension recognise, b"" if it has none"""
+    extension = extension.lower()
+    if extension not in _headers:
+        parts = next((parts for name, parts in magic.signatures if name == extension), ())
+        header = bytearray(max((offset + len(data) for offset, data in parts), default=0))
+        for offset, data in parts:
+            header[offset:offset + len(data)] = data
+        _headers[extension] = bytes(header)
+    return _headers[extension]
+
+
+def write_content(fd: int, size: int, content: str, extension: str, offset: int = 0) -> None:
+    """Give an open, empty file its size
+
+    :param content: "sparse" only sets the size (no data blocks), "allocate" reserves the blocks with
+                    posix_fallocate and "header" writes a valid header for the extension followed by data
+                    streamed from a reusable buffer
+    :param offset: where to start reading the fill buffer, so files of the same size differ
+    """
+    if not size:
+        return
+    if content == "allocate" and hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return
+        except OSError:
+            # not supported by this filesystem, a sparse file still has the right size
+            pass
+    if content != "header":
+        os.ftruncate(fd, size)
+        return
+
+    written = os.write(fd, get_header(extension)[:size])
+    buffer = get_fill_buffer()
+    offset %= len(buffer)
+    while written < size:
+        chunk = buffer[offset:offset + size - written]
+        written += os.write(fd, chunk)
+        offset = 0
+
+
+class CategoryManifest(NamedTuple):
+    """What the files of a category will be, computed before any file is created
+
+    hashes are the random part of the file names, extensions are indices in the extension list of the
+    category, sizes are the sizes in bytes (None for empty files) and directories are indices in the
+    folders of the tree (None for a flat population).
+    """
+    hashes: numpy.ndarray
+    extensions: numpy.ndarray
+    sizes: Optional[numpy.ndarray]
+    directories: Optional[numpy.ndarray] = None
+
+
+class Shard(NamedTuple):
+    directory: str
+    pop_name: str
+    pop_list: List[str]
+    start: int
+    manifest: CategoryManifest
+    content: str = "sparse"
+    folders: Tuple[str, ...] = ()
+
+    @property
+    def stop(self) -> int:
+        return self.start + len(self.manifest.hashes)
+
+
+class ShardEvent(NamedTuple):
+    """Progress event of the async API, one per finished shard"""
+    category: str
+    start: int
+    stop: int
+    created: int  # files created by this shard
+    size: int  # bytes written by this shard
+    total: int  # files created so far, this shard included
+
+
+def create_shard(shard: Shard) -> Tuple[int, int, array]:
+    """Create the files of a shard
+
+    Module level function so it can run in a process pool. Files are created with a bare
+    os.open(O_CREAT | O_EXCL) and files that already exist are left untouched.
+
+    :return: amount of files and bytes created, and the time each created file took
+    """
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_CLOEXEC", 0)
+    directory, pop_name, pop_list, content = shard.directory, shard.pop_name, shard.pop_list, shard.content
+    hashes = shard.manifest.hashes.tolist()
+    extensions = shard.manifest.extensions.tolist()
+    sizes = shard.manifest.sizes.tolist() if shard.manifest.sizes is not None else repeat(None)
+    if shard.manifest.directories is not None:
+        folders = [os.path.join(directory, folder) for folder in shard.folders]
+        directories = [folders[index] for index in shard.manifest.directories.tolist()]
+    else:
+        directories = repeat(directory)
+
+    created = 0
+    total_size = 0
+    latencies = array("d")
+    perf_counter = time.perf_counter
+    for n, rand_hash, extension_index, size, folder in zip(
+            range(shard.start, shard.stop), hashes, extensions, sizes, directories):
+        extn = pop_list[extension_index]
+        started = perf_counter()
+        try:
+            fd = os.open(os.path.join(folder, f"{pop_name}_%016x_{n}.{extn}" % rand_hash), flags, 0o644)
+        except FileExistsError:
+            continue
+        try:
+            if size is not None:
+                write_content(fd, size, content, extn, offset=rand_hash)
+                total_size += size
+        finally:
+            os.close(fd)
+        latencies.append(perf_counter() - started)
+        created += 1
+    return created, total_size, latencies
+
 
 class Populator(BaseWorker):
 
@@ -22,42 +171,244 @@ class Populator(BaseWorker):
         path: Union[str, Path] = None,
         amount: Optional[int] = 50,
         supported_files: Optional[SUP_EXC_TYPES] = None,
-        filters: Optional[FILTER_TYPES] = None
+        filters: Optional[FILTER_TYPES] = None,
+        workers: int = 1,
+        executor: str = "thread",
+        shard_size: int = 10000,
+        size: Optional[Union[str, int, SizeDistribution]] = None,
+        content: str = "sparse",
+        seed: Optional[int] = None,
+        depth: int = 0,
+        fanout: int = 2,
+        files_per_directory: str = "even",
     ) -> None:
         super().__init__(name=None, path=path)
         self.amount = amount
-        self.pool = self.get_files_supported(supported_files)
-        self.filters = self.validate_filters(filters)
+        with self.stats.timer("config"):
+            # rules only classify files, there is nothing to produce for them
+            self.pool, _ = split_rules(self.get_files_supported(supported_files))
+            self.filters = self.validate_filters(filters)
 
-        self.special_keyword = True if self.filters == "all" else False
-        if not self.special_keyword and self.filters:
-            self.pool = dict(filter(lambda elem: elem[0] in self.filters, self.pool.items()))
+            self.special_keyword = True if self.filters == "all" else False
+            if not self.special_keyword and self.filters:
+                self.pool = dict(filter(lambda elem: elem[0] in self.filters, self.pool.items()))
 
         self.to_produce = len(self.pool.keys()) * self.amount
 
+        if executor not in EXECUTOR_TYPES:
+            raise ValueError(f"{executor} is not an executor type. Try one of [{','.join(EXECUTOR_TYPES)}]")
+        self.workers = max(1, int(workers))
+        self.executor = executor
+        self.shard_size = max(1, int(shard_size))
+        self.created = 0
+        self.created_size = 0
+        self.elapsed = 0.0
+
+        if content not in CONTENT_TYPES:
+            raise ValueError(f"{content} is not a content type. Try one of [{','.join(CONTENT_TYPES)}]")
+        self.sizes = SizeDistribution.parse(size)
+        if content == "header" and self.sizes is None:
+            raise ValueError("Files with a header need a size e.g '4k', empty files have no content")
+        self.content = content
+
+        if files_per_directory not in SPREAD_TYPES:
+            raise ValueError(
+                f"{files_per_directory} is not a files per directory spread. Try one of [{','.join(SPREAD_TYPES)}]"
+            )
+        self.depth = max(0, int(depth))
+        self.fanout = max(1, int(fanout))
+        self.files_per_directory = files_per_directory
+
+        # an unseeded run draws its own seed and logs it, so any run can be reproduced
+        self.seed = int(seed) if seed is not None else int(numpy.random.SeedSequence().entropy % 2 ** 63)
+
+    def manifest(self) -> Dict[str, CategoryManifest]:
+        """Compute names, extensions and sizes of every file to produce, without any I/O
+
+        Every category draws from its own numpy Generator seeded with (seed, category position), so the same
+        seed, pool and amount produce exactly the same manifest on any machine and with any amount of workers.
+        """
+        manifest = dict()
+        for position, (pop_name, pop_list) in enumerate(self.pool.items()):
+            rng = numpy.random.default_rng([self.seed, position])
+            manifest[pop_name] = CategoryManifest(
+                hashes=rng.integers(0, 2 ** 64, size=self.amount, dtype=numpy.uint64),
+                extensions=rng.integers(0, len(pop_list), size=self.amount),
+                sizes=self.sizes.sample_many(self.amount, rng) if self.sizes is not None else None,
+                directories=self.spread(rng) if self.depth else None,
+            )
+        return manifest
+
+    def folders(self) -> List[str]:
+        """Relative paths of the folders of the tree, breadth first, the population folder itself ("") first
+
+        Every folder above the last level has `fanout` sub-folders, so a tree has
+        1 + fanout + fanout^2 + ... + fanout^depth folders.
+        """
+        folders = [""]
+        level = [""]
+        for _ in range(self.depth):
+            level = [os.path.join(parent, f"dir_{index:03d}") for parent in level for index in range(self.fanout)]
+            folders.extend(level)
+        return folders
+
+    def spread(self, rng: numpy.random.Generator) -> numpy.ndarray:
+        """Draw the folder (index in folders()) of every file of a category
+
+        "even" spreads the files uniformly, "zipf" gives a few folders most of the files and a long tail of
+        tiny folders, and "hot" puts half of the files in a single leaf folder next to many small ones.
+        """
+        count = len(self.folders())
+        if self.files_per_directory == "zipf":
+            return (rng.zipf(1.5, size=self.amount) - 1) % count
+        directories = rng.integers(0, count, size=self.amount)
+        if self.files_per_directory == "hot":
+            directories[rng.random(self.amount) < 0.5] = count - 1
+        return directories
+
+    def file_names(self, manifest: Optional[Dict[str, CategoryManifest]] = None) -> Iterator[str]:
+        """Paths, relative to the population folder, of the files the population consists of in creation order"""
+        manifest = manifest or self.manifest()
+        folders = self.folders()
+        for pop_name, pop_list in self.pool.items():
+            category = manifest[pop_name]
+            directories = category.directories.tolist() if category.directories is not None else repeat(0)
+            for n, (rand_hash, extension_index, directory) in enumerate(
+                    zip(category.hashes.tolist(), category.extensions.tolist(), directories)):
+                yield os.path.join(folders[directory], f"{pop_name}_%016x_{n}.{pop_list[extension_index]}" % rand_hash)
+
+    def shards(self, manifest: Optional[Dict[str, CategoryManifest]] = None) -> List[Shard]:
+        """Split the work in index ranges of at most shard_size files of a category"""
+        manifest = manifest or self.manifest()
+        directory = os.fspath(self.path)
+        folders = tuple(self.folders()) if self.depth else ()
+        shards = list()
+        for pop_name, pop_list in self.pool.items():
+            category = manifest[pop_name]
+            for start in range(0, self.amount, self.shard_size):
+                stop = min(start + self.shard_size, self.amount)
+                shards.append(Shard(
+                    directory=directory,
+                    pop_name=pop_name,
+                    pop_list=list(pop_list),
+                    start=start,
+                    manifest=CategoryManifest(
+                        hashes=category.hashes[start:stop],
+                        extensions=category.extensions[start:stop],
+                        sizes=category.sizes[start:stop] if category.sizes is not None else None,
+                        directories=category.directories[start:stop] if category.directories is not None else None,
+                    ),
+                    content=self.content,
+                    folders=folders,
+                ))
+        return shards
+
     def __call__(self):
+        self.log_start()
+        self.prepare()
+
+        started = time.perf_counter()
+        self.created = 0
+        self.created_size = 0
+        shards = self.shards()
+        if self.workers == 1:
+            for shard in shards:
+                self.created += self.shard_done(shard, create_shard(shard))
+        else:
+            pool_class = ProcessPoolExecutor if self.executor == "process" else ThreadPoolExecutor
+            with pool_class(max_workers=self.workers) as pool:
+                futures = {pool.submit(create_shard, shard): shard for shard in shards}
+                for future in as_completed(futures):
+                    self.created += self.shard_done(futures[future], future.result())
+        self.elapsed = time.perf_counter() - started
+        self.log_finish()
+
+    async def arun(self, executor: Optional[Executor] = None) -> int:
+        """Async counterpart of __call__, the files are created in an executor so the event loop never blocks
+
+        :param executor: executor creating the files, a ProcessPoolExecutor works too. Default: the thread
+                         pool shared by the async API of every worker (folderlib.utilities.aio.get_executor)
+        :return: amount of files created
+        """
+        async for _ in self.aiter_shards(executor=executor):
+            pass
+        return self.created
+
+    async def aiter_shards(self, executor: Optional[Executor] = None) -> AsyncIterator[ShardEvent]:
+        """Populate the folder from the event loop, yielding a ShardEvent for every finished shard
+
+        At most `workers` shards are in flight. Cancelling the consumer (or leaving the loop early) cancels
+        the shards that did not start and waits for the running ones.
+
+        :param executor: executor creating the files. Default: the shared thread pool
+        """
+        # asyncio takes longer to import than the rest of the package, only async callers pay for it
+        import asyncio
+        from folderlib.utilities.aio import bounded_map, get_executor
+
+        self.log_start()
+        executor = executor or get_executor()
+        await asyncio.wrap_future(executor.submit(self.prepare))
+
+        started = time.perf_counter()
+        self.created = 0
+        self.created_size = 0
+        shards = await asyncio.wrap_future(executor.submit(self.shards))
+        async for shard, result in bounded_map(create_shard, shards, limit=self.workers, executor=executor):
+            self.created += self.shard_done(shard, result)
+            yield ShardEvent(shard.pop_name, shard.start, shard.stop, result[0], result[1], self.created)
+        self.elapsed = time.perf_counter() - started
+        self.log_finish()
+
+    def log_start(self) -> None:
         logger.info(f"Current directory:    {Path.cwd()}")
         logger.info(f"Population directory: {self.path.absolute()}")
         logger.info(f"Population amount:    {self.amount}")
         logger.info(f"Population types:     {','.join(self.pool.keys())}")
         logger.info(f"Population total to produce: {self.to_produce}")
+        if self.sizes is not None:
+            logger.info(f"Population sizes:     {self.sizes}")
+        logger.info(f"Population seed:      {self.seed}")
 
-        if not self.path.exists():
-            logger.debug(f"Directory {self.path} does not exist. Creating now...")
-            self.path.mkdir()
-
-        for pop_name, pop_list in self.pool.items():
-            for n in range(self.amount):
-                rand_hash = getrandbits(64)
-                extn = choice(pop_list)
-                f = self.path.joinpath(f"{pop_name}_%016x_{n}.{extn}" % rand_hash)
-                f.touch(exist_ok=True)
-                logger.debug(f"Created file: {f}")
-
+    def log_finish(self) -> None:
         logger.info("Populate operation finished.")
         logger.info(
-            f"{self.to_produce} files created from "
+            f"{self.created} files created from "
             f"{len(self.pool)} different categories"
         )
+        if self.sizes is not None:
+            logger.info(f"Population size: {self.created_size} bytes ({self.content} content)")
+        logger.info(f"Population rate: {self.created / max(self.elapsed, 1e-9):.0f} files/sec in {self.elapsed:.2f}s")
+
+    def prepare(self) -> None:
+        """Create the population folder and its tree"""
+        if not self.path.exists():
+            logger.debug("Directory %s does not exist. Creating now...", self.path)
+            self.path.mkdir(parents=True)
+        if self.depth:
+            self.create_folders()
+
+    def create_folders(self) -> int:
+        """Create the whole folder tree up front, parents first, so the shards only create files
 
+        :return: amount of folders created
+        """
+        created = 0
+        directory = os.fspath(self.path)
+        for folder in self.folders()[1:]:
+            started = time.perf_counter()
+            try:
+                os.mkdir(os.path.join(directory, folder))
+            except FileExistsError:
+                continue
+            self.stats.record("mkdir", time.perf_counter() - started)
+            created += 1
+        logger.debug("Created %d folders (%d levels, fanout %d)", created, self.depth, self.fanout)
+        return created
 
+    def shard_done(self, shard: Shard, result: Tuple[int, int, array]) -> int:
+        created, created_size, latencies = result
+        logger.debug("Created %d '%s' files [%d, %d)", created, shard.pop_name, shard.start, shard.stop)
+        self.created_size += created_size
+        self.stats.record_many("create", latencies, size=created_size)
+        return created